@@ -0,0 +1,245 @@
+from collections import Counter, OrderedDict, namedtuple
+
+from knowledge_graph_parser import parse_knowledge_graph
+from logger import logger
+
+CRAFT_ACTION = "craft"
+GATHER_ACTION = "gather"
+GATHERABLE_TYPES = ("resource", "raw")
+# Most memoized sub-plans a planner keeps before dropping the least recently used
+DEFAULT_MAX_CACHE_ENTRIES = 4096
+
+PlanStep = namedtuple("PlanStep", ["action", "item", "sources"])
+CraftingPlan = namedtuple("CraftingPlan", ["steps", "cost"])
+
+# A solved sub-goal: its cost, the steps taken and the inventory it consumed
+_SubPlan = namedtuple("_SubPlan", ["cost", "steps", "consumed"])
+
+
+def _fits(consumed, inventory):
+    return all(inventory.get(item, 0) >= count for item, count in consumed.items())
+
+
+def _pareto(sub_plans):
+    """Drop the sub-plans that cost no less and consume no less than another, cheapest first."""
+    kept = []
+    for sub_plan in sorted(sub_plans, key=lambda sub_plan: sub_plan.cost):
+        if not any(_fits(other.consumed, sub_plan.consumed) for other in kept):
+            kept.append(sub_plan)
+    return kept
+
+
+class CraftingPlanner:
+    """
+    Plans the cheapest sequence of gathers and crafts needed to obtain an item.
+
+    Items are planned recursively over the recipe graph: every ``craft`` edge
+    into an item is an ingredient it needs, and every other edge (``chop``,
+    ``mine``, ...) is a way to gather it from a raw source. Solved sub-goals
+    are memoized on the item and the slice of the inventory that can affect
+    it, so repeated queries from players with similar inventories are served
+    from the cache. Every distinct inventory slice adds an entry, so the
+    cache is bounded and drops the least recently used sub-plans when full.
+    """
+
+    def __init__(
+        self, nx_graph, action_costs=None, max_cache_entries=DEFAULT_MAX_CACHE_ENTRIES
+    ):
+        """
+        Initialize the CraftingPlanner with a knowledge graph.
+
+        Args:
+            nx_graph (nx.DiGraph or KnowledgeGraph): The knowledge graph holding the recipes.
+            action_costs (dict): Cost of each action name. Actions not listed cost 1.
+                An edge ``cost`` attribute overrides the cost of its gather action.
+            max_cache_entries (int): Most memoized sub-plans to keep. Defaults to
+                ``DEFAULT_MAX_CACHE_ENTRIES``.
+        """
+        logger.debug("Initializing CraftingPlanner")
+        self.graph = nx_graph
+        self.action_costs = action_costs or {}
+        self._relevant_items = {}
+        self.max_cache_entries = max_cache_entries
+        self._cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cycle_cuts = 0
+
+    def clear_cache(self):
+        """Drop all memoized sub-plans, e.g. after the recipe graph changes."""
+        logger.debug("Clearing crafting planner cache")
+        self._relevant_items.clear()
+        self._cache.clear()
+
+    def plan(self, goal, inventory=None, quantity=1):
+        """
+        Find the cheapest plan to obtain an item from the given inventory.
+
+        Items already in the inventory can be used instead of being gathered
+        or crafted. The inventory is shared by everything the plan needs, so
+        every way of splitting it between ingredients is considered.
+
+        Args:
+            goal (str): The ID of the item to obtain.
+            inventory (dict): Item counts the player already holds. Defaults to empty.
+            quantity (int): How many of the item to obtain. Defaults to 1.
+
+        Returns:
+            CraftingPlan or None: The ordered steps and their total cost, or None
+            if the item cannot be obtained.
+        """
+        logger.debug(f"Planning how to obtain {quantity} x {goal}")
+        if goal not in self.graph:
+            logger.debug(f"Cannot plan for unknown item: {goal}")
+            return None
+
+        sub_plans = self._combine(
+            [goal] * quantity, Counter(inventory or {}), frozenset()
+        )
+        if not sub_plans:
+            logger.debug(f"No plan found for {goal}")
+            return None
+        best = sub_plans[0]
+        logger.debug(f"Planned {len(best.steps)} steps for {goal} at cost {best.cost}")
+        return CraftingPlan(list(best.steps), best.cost)
+
+    def _relevant(self, item):
+        """Get the items whose inventory counts can change the plan for an item."""
+        if item not in self._relevant_items:
+            relevant = {item}
+            stack = [item]
+            while stack:
+                for predecessor in self.graph.predecessors(stack.pop()):
+                    if predecessor not in relevant:
+                        relevant.add(predecessor)
+                        stack.append(predecessor)
+            self._relevant_items[item] = frozenset(relevant)
+        return self._relevant_items[item]
+
+    def _inventory_slice(self, item, inventory):
+        return tuple(
+            sorted(
+                (relevant, inventory[relevant])
+                for relevant in self._relevant(item)
+                if inventory.get(relevant, 0) > 0
+            )
+        )
+
+    def _plan_item(self, item, inventory, visiting):
+        """
+        Solve the sub-goal of obtaining one unit of an item.
+
+        Args:
+            item (str): The ID of the item to obtain.
+            inventory (Counter): Item counts available to this sub-goal.
+            visiting (frozenset): Items being planned further up, used to break cycles.
+
+        Returns:
+            list: Every _SubPlan not beaten by another that costs no more and
+            consumes no more of the inventory, cheapest first. Empty if the
+            item cannot be obtained.
+        """
+        held = (
+            [_SubPlan(0, (), Counter({item: 1}))] if inventory.get(item, 0) > 0 else []
+        )
+        if item in visiting:
+            self._cycle_cuts += 1
+            return held
+
+        key = (item, self._inventory_slice(item, inventory))
+        if key in self._cache:
+            self.cache_hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        self.cache_misses += 1
+        cycle_cuts = self._cycle_cuts
+
+        visiting = visiting | {item}
+        gathers = []
+        ingredients = []
+        for source, _, data in self.graph.in_edges(item, data=True):
+            attributes = data.get("attributes", {})
+            action = attributes.get("action", GATHER_ACTION)
+            if action == CRAFT_ACTION:
+                ingredients.extend([source] * attributes.get("quantity", 1))
+            else:
+                cost = attributes.get("cost", self.action_costs.get(action, 1))
+                step = PlanStep(action, item, (source,))
+                gathers.append(_SubPlan(cost, (step,), Counter()))
+
+        options = held + gathers
+        if ingredients:
+            options.extend(self._plan_craft(item, ingredients, inventory, visiting))
+        elif not gathers and self._is_gatherable(item):
+            cost = self.action_costs.get(GATHER_ACTION, 1)
+            step = PlanStep(GATHER_ACTION, item, ())
+            options.append(_SubPlan(cost, (step,), Counter()))
+
+        best = _pareto(options)
+        # A result pruned by a cycle depends on the path taken, so don't reuse it
+        if self._cycle_cuts == cycle_cuts:
+            self._cache[key] = best
+            if len(self._cache) > self.max_cache_entries:
+                self._cache.popitem(last=False)
+        return best
+
+    def _plan_craft(self, item, ingredients, inventory, visiting):
+        cost = self.action_costs.get(CRAFT_ACTION, 1)
+        step = PlanStep(CRAFT_ACTION, item, tuple(ingredients))
+        sub_plans = self._combine(ingredients, inventory, visiting)
+        if not sub_plans:
+            logger.debug(f"Cannot obtain the ingredients to craft {item}")
+        return [
+            _SubPlan(sub_plan.cost + cost, sub_plan.steps + (step,), sub_plan.consumed)
+            for sub_plan in sub_plans
+        ]
+
+    def _combine(self, items, inventory, visiting):
+        """
+        Plan several items that draw on one shared inventory.
+
+        Each item's sub-plans are solved against the whole inventory and
+        joined one item at a time, keeping every split of the inventory that
+        fits it and is not beaten on both cost and inventory consumed.
+
+        Args:
+            items (list): The IDs of the items to obtain, one entry per unit.
+            inventory (Counter): Item counts shared by all of them.
+            visiting (frozenset): Items being planned further up, used to break cycles.
+
+        Returns:
+            list: The joined _SubPlans, cheapest first. Empty if any item cannot be obtained.
+        """
+        joined = [_SubPlan(0, (), Counter())]
+        for item in items:
+            options = self._plan_item(item, inventory, visiting)
+            joined = _pareto(
+                [
+                    _SubPlan(
+                        plan.cost + option.cost,
+                        plan.steps + option.steps,
+                        plan.consumed + option.consumed,
+                    )
+                    for plan in joined
+                    for option in options
+                    if _fits(plan.consumed + option.consumed, inventory)
+                ]
+            )
+            if not joined:
+                break
+        return joined
+
+    def _is_gatherable(self, item):
+        attributes = self.graph.nodes[item].get("attributes", {})
+        return attributes.get("type") in GATHERABLE_TYPES
+
+
+if __name__ == "__main__":
+    try:
+        # Example usage
+        graph = parse_knowledge_graph("data/knowledge_graph.json")
+        planner = CraftingPlanner(graph)
+        crafting_plan = planner.plan("iron_pickaxe", {"wood": 1})
+        logger.debug(f"Plan for iron_pickaxe: {crafting_plan}")
+    except Exception as e:
+        logger.debug(f"An error occurred: {str(e)}")
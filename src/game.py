@@ -1,6 +1,15 @@
+import argparse
+import json
+import math
+import sys
+
 from logger import logger
 from resource_manager import ResourceManager
 
+# Number of result lines buffered before a batch run writes them out
+BATCH_FLUSH_LINES = 1000
+GATHER_NEAREST_USAGE = "expected gather nearest <resource id> <x> <y>"
+
 
 class GameInterface:
     def __init__(self, knowledge_graph_path):
@@ -14,22 +23,85 @@ class GameInterface:
     def display_available_resources(self):
         logger.debug("Displaying available resources")
         resources = self.resource_manager.get_available_resource_nodes()
-        print("Available resources:")
-        for i, resource in enumerate(resources, 1):
-            print(f"{i}. {resource}")
+        lines = [f"{i}. {resource}" for i, resource in enumerate(resources, 1)]
+        print("\n".join(["Available resources:", *lines]))
+        return resources
+
+    def collect(self, resource_id):
+        """
+        Gather a resource and add it to the inventory.
+
+        This is the game logic shared by the interactive loop and batch mode.
+
+        Args:
+            resource_id (str): The ID of the resource to gather.
+
+        Returns:
+            bool: True if the resource was gathered, False otherwise.
+        """
+        gathered = self.resource_manager.gather_resource(resource_id)
+        if not gathered:
+            logger.debug(f"Failed to gather resource: {resource_id}")
+            return False
+        self.inventory[resource_id] = self.inventory.get(resource_id, 0) + 1
+        logger.debug(f"Resource gathered successfully: {resource_id}")
+        return True
+
+    def collect_nearest(self, resource_id, x, y):
+        """
+        Gather the nearest node of a resource in the world and add it to the inventory.
 
-    def gather_resource(self, choice):
+        Args:
+            resource_id (str): The ID of the resource to gather.
+            x (float): The x coordinate of the player.
+            y (float): The y coordinate of the player.
+
+        Returns:
+            ResourceNode or None: The gathered node, or None if none was available in reach.
+        """
+        node = self.resource_manager.gather_nearest_resource(resource_id, x, y)
+        if node is None:
+            logger.debug(f"Failed to gather nearest resource: {resource_id}")
+            return None
+        self.inventory[resource_id] = self.inventory.get(resource_id, 0) + 1
+        logger.debug(f"Nearest resource gathered successfully: {resource_id}")
+        return node
+
+    def craft(self, item_id):
+        """
+        Craft an item from ingredients in the inventory.
+
+        Args:
+            item_id (str): The ID of the item to craft.
+
+        Returns:
+            bool: True if the item was crafted, False if it has no recipe or
+            the inventory lacks an ingredient.
+        """
+        recipe = self.resource_manager.get_recipe(item_id)
+        if not recipe:
+            logger.debug(f"No recipe for item: {item_id}")
+            return False
+        if any(self.inventory.get(item, 0) < count for item, count in recipe.items()):
+            logger.debug(f"Missing ingredients to craft: {item_id}")
+            return False
+        for item, count in recipe.items():
+            self.inventory[item] -= count
+            if not self.inventory[item]:
+                del self.inventory[item]
+        self.inventory[item_id] = self.inventory.get(item_id, 0) + 1
+        logger.debug(f"Item crafted successfully: {item_id}")
+        return True
+
+    def gather_resource(self, choice, resources=None):
         logger.debug(f"Attempting to gather resource at index: {choice}")
-        resources = self.resource_manager.get_available_resource_nodes()
+        if resources is None:
+            resources = self.resource_manager.get_available_resource_nodes()
         if 1 <= choice <= len(resources):
             resource = resources[choice - 1]
-            gathered = self.resource_manager.gather_resource(resource)
-            if gathered:
-                self.inventory[resource] = self.inventory.get(resource, 0) + 1
-                logger.debug(f"Resource gathered successfully: {resource}")
+            if self.collect(resource):
                 print(f"You gathered {resource}!")
             else:
-                logger.debug(f"Failed to gather resource: {resource}")
                 print("Failed to gather resource.")
         else:
             logger.debug(f"Invalid resource choice: {choice}")
@@ -37,9 +109,98 @@ class GameInterface:
 
     def display_inventory(self):
         logger.debug("Displaying player inventory")
-        print("Inventory:")
-        for item, count in self.inventory.items():
-            print(f"{item}: {count}")
+        lines = [f"{item}: {count}" for item, count in self.inventory.items()]
+        print("\n".join(["Inventory:", *lines]))
+
+    def execute_command(self, line):
+        """
+        Execute one batch command and describe its outcome.
+
+        Supported commands are ``resources``, ``gather <resource id or number>``,
+        ``gather nearest <resource id> <x> <y>``, ``craft <item id>`` and
+        ``inventory``. Numbers refer to positions in the resource list, as in
+        the interactive menu.
+
+        Args:
+            line (str): The command line, e.g. "gather wood".
+
+        Returns:
+            dict: The command name, whether it succeeded and its result.
+        """
+        command, _, argument = line.strip().partition(" ")
+        argument = argument.strip()
+        if command == "resources":
+            resources = self.resource_manager.get_available_resource_nodes()
+            return {"command": command, "ok": True, "resources": resources}
+        if command == "inventory":
+            return {"command": command, "ok": True, "inventory": dict(self.inventory)}
+        if command == "gather" and argument.split()[:1] == ["nearest"]:
+            return self._gather_nearest_command(argument.split()[1:])
+        if command == "gather":
+            resource = argument
+            if argument.isdigit():
+                resources = self.resource_manager.get_available_resource_nodes()
+                index = int(argument)
+                if not 1 <= index <= len(resources):
+                    return {"command": command, "ok": False, "error": "invalid choice"}
+                resource = resources[index - 1]
+            return {
+                "command": command,
+                "ok": self.collect(resource),
+                "resource": resource,
+            }
+        if command == "craft":
+            return {"command": command, "ok": self.craft(argument), "item": argument}
+        logger.debug(f"Unknown batch command: {line.strip()}")
+        return {"command": command, "ok": False, "error": "unknown command"}
+
+    def _gather_nearest_command(self, arguments):
+        try:
+            resource, x, y = arguments
+            x, y = float(x), float(y)
+            if not (math.isfinite(x) and math.isfinite(y)):
+                raise ValueError(f"Position is not finite: {x}, {y}")
+        except ValueError:
+            return {"command": "gather", "ok": False, "error": GATHER_NEAREST_USAGE}
+        node = self.collect_nearest(resource, x, y)
+        result = {"command": "gather", "ok": node is not None, "resource": resource}
+        if node is not None:
+            result["position"] = [node.x, node.y]
+        return result
+
+    def run_script(self, commands, output):
+        """
+        Run a stream of commands without the interactive menu.
+
+        Each command produces one JSON line on the output. Lines are buffered
+        and written in blocks of ``BATCH_FLUSH_LINES``. Blank lines and lines
+        starting with "#" are skipped, and "quit" stops the run.
+
+        Args:
+            commands (iterable): Command lines, e.g. an open file or sys.stdin.
+            output (file): Where to write the JSON result lines.
+
+        Returns:
+            int: The number of commands executed.
+        """
+        logger.debug("Starting batch command run")
+        buffer = []
+        executed = 0
+        for line in commands:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line == "quit":
+                break
+            buffer.append(json.dumps(self.execute_command(line)) + "\n")
+            executed += 1
+            if len(buffer) >= BATCH_FLUSH_LINES:
+                output.writelines(buffer)
+                buffer.clear()
+        output.writelines(buffer)
+        output.flush()
+        logger.debug(f"Batch command run finished after {executed} commands")
+        return executed
 
     def run(self):
         logger.debug("Starting the main game loop")
@@ -54,12 +215,12 @@ class GameInterface:
             if choice == "1":
                 self.display_available_resources()
             elif choice == "2":
-                self.display_available_resources()
+                resources = self.display_available_resources()
                 try:
                     resource_choice = int(
                         input("Enter the number of the resource to gather: ")
                     )
-                    self.gather_resource(resource_choice)
+                    self.gather_resource(resource_choice, resources)
                 except ValueError:
                     logger.debug("Invalid input for resource gathering")
                     print("Invalid input. Please enter a number.")
@@ -75,6 +236,27 @@ class GameInterface:
         logger.debug("Game loop ended")
 
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play CraftGraph.")
+    parser.add_argument(
+        "--graph",
+        default="data/knowledge_graph.json",
+        help="knowledge graph file or shard manifest",
+    )
+    parser.add_argument(
+        "--script", help="run commands from this file instead of the menu, - for stdin"
+    )
+    args = parser.parse_args(argv)
+
+    game = GameInterface(args.graph)
+    if args.script is None:
+        game.run()
+    elif args.script == "-":
+        game.run_script(sys.stdin, sys.stdout)
+    else:
+        with open(args.script, "r") as commands:
+            game.run_script(commands, sys.stdout)
+
+
 if __name__ == "__main__":
-    game = GameInterface("data/knowledge_graph.json")
-    game.run()
+    main()
@@ -0,0 +1,461 @@
+import base64
+import hashlib
+import json
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from game import GameInterface
+from logger import logger
+
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OPCODE_CONTINUATION = 0x0
+OPCODE_TEXT = 0x1
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+CLOSE_PROTOCOL_ERROR = 1002
+CLOSE_TOO_BIG = 1009
+# Largest command batch accepted over HTTP or as one WebSocket message
+MAX_MESSAGE_SIZE = 1 << 20
+BATCH_ERROR = 'expected {"commands": [...]}'
+# Commands whose success can change the shared resource pool
+POOL_COMMANDS = ("gather",)
+
+
+def _encode_frame(payload, opcode=OPCODE_TEXT, mask=None):
+    """
+    Encode a single unfragmented WebSocket frame.
+
+    Args:
+        payload (bytes): The frame payload.
+        opcode (int): The frame opcode. Defaults to a text frame.
+        mask (bytes): Four byte masking key. Clients must mask, servers must not.
+
+    Returns:
+        bytes: The encoded frame.
+    """
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 1 << 16:
+        header.append(mask_bit | 126)
+        header += struct.pack("!H", length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack("!Q", length)
+    if mask:
+        header += mask
+        payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    return bytes(header) + payload
+
+
+class WebSocketProtocolError(Exception):
+    """A WebSocket peer broke the protocol; the connection is closed with ``code``."""
+
+    def __init__(self, code, reason):
+        super().__init__(reason)
+        self.code = code
+
+
+def _read_exact(rfile, size):
+    data = rfile.read(size)
+    if len(data) < size:
+        raise EOFError("WebSocket connection closed mid-frame")
+    return data
+
+
+def _read_frame(rfile, max_size=MAX_MESSAGE_SIZE, require_mask=True):
+    """
+    Read a single WebSocket frame.
+
+    Args:
+        rfile (file): A binary file reading from the socket.
+        max_size (int): The largest payload accepted, in bytes.
+        require_mask (bool): Reject unmasked frames, as a server must. Defaults to True.
+
+    Returns:
+        tuple: Whether the frame ends a message, its opcode and its unmasked
+        payload, or (True, OPCODE_CLOSE, b"") if the connection closed.
+
+    Raises:
+        WebSocketProtocolError: If the frame is malformed, unmasked or too large.
+    """
+    try:
+        header = _read_exact(rfile, 2)
+        fin = bool(header[0] & 0x80)
+        opcode = header[0] & 0x0F
+        if header[0] & 0x70:
+            raise WebSocketProtocolError(CLOSE_PROTOCOL_ERROR, "reserved bits set")
+        if require_mask and not header[1] & 0x80:
+            raise WebSocketProtocolError(
+                CLOSE_PROTOCOL_ERROR, "client frames must be masked"
+            )
+        length = header[1] & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", _read_exact(rfile, 2))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", _read_exact(rfile, 8))
+        if length > max_size:
+            raise WebSocketProtocolError(CLOSE_TOO_BIG, f"frame of {length} bytes")
+        mask = _read_exact(rfile, 4) if header[1] & 0x80 else None
+        payload = _read_exact(rfile, length)
+    except EOFError:
+        return True, OPCODE_CLOSE, b""
+    if mask:
+        payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    return fin, opcode, payload
+
+
+def _read_messages(rfile, max_size=MAX_MESSAGE_SIZE):
+    """
+    Read WebSocket messages, joining fragmented ones.
+
+    Control frames may arrive between the fragments of a message and are
+    yielded as soon as they are read.
+
+    Args:
+        rfile (file): A binary file reading from the socket.
+        max_size (int): The largest message accepted, in bytes.
+
+    Yields:
+        tuple: The opcode and payload of each control frame and whole message,
+        ending after a close frame.
+
+    Raises:
+        WebSocketProtocolError: If the frames break the protocol or a message is too large.
+    """
+    opcode = None
+    fragments = []
+    size = 0
+    while True:
+        # Control frames may still arrive when a message has used up the limit
+        fin, frame_opcode, payload = _read_frame(rfile, max(max_size - size, 125))
+        if frame_opcode & 0x8:
+            if not fin or len(payload) > 125:
+                raise WebSocketProtocolError(
+                    CLOSE_PROTOCOL_ERROR, "control frames must be short and whole"
+                )
+            yield frame_opcode, payload
+            if frame_opcode == OPCODE_CLOSE:
+                return
+            continue
+        if (frame_opcode == OPCODE_CONTINUATION) != (opcode is not None):
+            raise WebSocketProtocolError(
+                CLOSE_PROTOCOL_ERROR, "unexpected continuation or data frame"
+            )
+        opcode = opcode if opcode is not None else frame_opcode
+        fragments.append(payload)
+        size += len(payload)
+        if size > max_size:
+            raise WebSocketProtocolError(
+                CLOSE_TOO_BIG, f"message over {max_size} bytes"
+            )
+        if fin:
+            yield opcode, b"".join(fragments)
+            opcode, fragments, size = None, [], 0
+
+
+def _parse_commands(body):
+    """
+    Read the command list out of a request body.
+
+    Raises:
+        ValueError: If the body is not JSON of the form ``{"commands": [...]}``.
+    """
+    try:
+        commands = json.loads(body)["commands"]
+    except (KeyError, TypeError) as error:
+        raise ValueError(f"missing command list: {str(error)}")
+    if not isinstance(commands, list):
+        raise ValueError(f"commands must be a list, not {type(commands).__name__}")
+    return commands
+
+
+def _is_local(url):
+    """Check that an Origin URL, or a bare Host ``name:port``, names the loopback interface."""
+    if "//" not in url:
+        url = f"//{url}"
+    try:
+        return urlsplit(url).hostname in LOCAL_HOSTS
+    except ValueError:
+        return False
+
+
+class _GameRequestHandler(BaseHTTPRequestHandler):
+    """Serves the game API over keep-alive HTTP/1.1 and WebSocket."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+    def _send_json(self, body, status=200):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _check_local(self):
+        """
+        Reject requests that do not come from a page or client on this machine.
+
+        The Host header must name the loopback interface, so a DNS
+        rebinding attack cannot reach the server, and a browser Origin, when
+        sent, must be local too.
+        """
+        origin = self.headers.get("Origin")
+        if _is_local(self.headers.get("Host", "")) and (
+            origin is None or _is_local(origin)
+        ):
+            return True
+        logger.debug(
+            f"Rejecting non-local request: Host={self.headers.get('Host')} Origin={origin}"
+        )
+        self._send_json({"error": "only local clients may use this server"}, 403)
+        return False
+
+    def do_GET(self):
+        if not self._check_local():
+            return
+        if self.path == "/resources":
+            self._send_json(self.server.run_batch(["resources"])[0])
+        elif self.path == "/inventory":
+            self._send_json(self.server.run_batch(["inventory"])[0])
+        elif self.path == "/ws":
+            self._serve_websocket()
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        if not self._check_local():
+            return
+        if self.path != "/commands":
+            self._send_json({"error": "not found"}, 404)
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_MESSAGE_SIZE:
+            logger.debug(f"Rejecting command batch of length: {length}")
+            self.close_connection = True
+            self._send_json({"error": "command batch too large"}, 413)
+            return
+        try:
+            commands = _parse_commands(self.rfile.read(length))
+        except ValueError as error:
+            logger.debug(f"Invalid command batch: {str(error)}")
+            self._send_json({"error": BATCH_ERROR}, 400)
+            return
+        self._send_json({"results": self.server.run_batch(commands)})
+
+    def _serve_websocket(self):
+        key = self.headers.get("Sec-WebSocket-Key")
+        if self.headers.get("Upgrade", "").lower() != "websocket" or not key:
+            self._send_json({"error": "expected a WebSocket upgrade"}, 400)
+            return
+        accept = base64.b64encode(
+            hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()
+        ).decode()
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+
+        connection = _WebSocketConnection(self.wfile)
+        self.server.subscribe(connection)
+        try:
+            for opcode, payload in _read_messages(self.rfile):
+                if opcode == OPCODE_CLOSE:
+                    connection.send(b"", OPCODE_CLOSE)
+                elif opcode == OPCODE_PING:
+                    connection.send(payload, OPCODE_PONG)
+                elif opcode == OPCODE_TEXT:
+                    connection.send_json(self._websocket_reply(payload))
+        except WebSocketProtocolError as error:
+            logger.debug(f"Closing WebSocket after protocol error: {str(error)}")
+            connection.send(
+                struct.pack("!H", error.code) + str(error).encode(), OPCODE_CLOSE
+            )
+        except OSError as error:
+            logger.debug(f"WebSocket connection lost: {str(error)}")
+        finally:
+            self.server.unsubscribe(connection)
+
+    def _websocket_reply(self, payload):
+        try:
+            commands = _parse_commands(payload)
+        except ValueError as error:
+            logger.debug(f"Invalid command batch: {str(error)}")
+            return {"error": BATCH_ERROR}
+        return {"results": self.server.run_batch(commands)}
+
+
+class _WebSocketConnection:
+    """A subscribed WebSocket that may be written to from several threads."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.lock = threading.Lock()
+
+    def send(self, payload, opcode=OPCODE_TEXT):
+        with self.lock:
+            self.wfile.write(_encode_frame(payload, opcode))
+            self.wfile.flush()
+
+    def send_json(self, body):
+        self.send(json.dumps(body).encode())
+
+
+class GameServer(ThreadingHTTPServer):
+    """
+    A local network API in front of a shared GameInterface.
+
+    ``POST /commands`` runs a batch of game commands, as understood by
+    ``GameInterface.execute_command``, in one round trip. ``GET /resources``
+    and ``GET /inventory`` are shortcuts for single commands. Connections are
+    kept alive between requests. ``GET /ws`` upgrades to a WebSocket that
+    accepts the same command batches and pushes the resource pool to every
+    subscriber whenever a batch or a respawn changes it. Pushes may arrive
+    out of order, so each carries a ``sequence`` number that increases with
+    every snapshot; clients should drop a push older than one they have
+    already shown. Requests whose Host or Origin is not this machine are
+    refused, and batches and WebSocket messages are limited to
+    ``MAX_MESSAGE_SIZE`` bytes.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, game, host="127.0.0.1", port=0):
+        """
+        Initialize the GameServer and bind it to a local port.
+
+        Args:
+            game (GameInterface): The game the API operates on.
+            host (str): A loopback address to bind to. Defaults to "127.0.0.1".
+            port (int): The port to listen on. Defaults to a free port.
+
+        Raises:
+            ValueError: If the host is not a loopback address.
+        """
+        if host not in LOCAL_HOSTS:
+            logger.debug(f"Refusing to serve on non-local host: {host}")
+            raise ValueError(f"GameServer only serves on localhost, not {host}")
+        self.game = game
+        self._game_lock = threading.Lock()
+        self._subscribers = set()
+        self._subscribers_lock = threading.Lock()
+        self._pool_sequence = 0
+        for resource_id in game.resource_manager.regeneration.intervals:
+            game.resource_manager.on_respawn(resource_id, self._watch_respawns)
+        super().__init__((host, port), _GameRequestHandler)
+        logger.debug(f"GameServer listening on {self.server_address}")
+
+    def run_batch(self, commands):
+        """
+        Run a batch of commands against the game and notify subscribers.
+
+        Args:
+            commands (list): Command lines, e.g. ["gather wood", "inventory"].
+
+        Returns:
+            list: One result per command.
+
+        Raises:
+            TypeError: If the commands are not a list.
+        """
+        if not isinstance(commands, list):
+            raise TypeError(f"commands must be a list, not {type(commands).__name__}")
+        with self._game_lock:
+            results = [self.game.execute_command(str(command)) for command in commands]
+            changed = any(
+                result["command"] in POOL_COMMANDS and result["ok"]
+                for result in results
+            )
+            if changed:
+                event = self._pool_event()
+        if changed:
+            self.broadcast(event)
+        return results
+
+    def process_respawns(self, blocking=True):
+        """
+        Settle respawns and push the pool to subscribers if any happened.
+
+        ``serve_forever`` calls this between requests through ``service_actions``.
+
+        Args:
+            blocking (bool): Wait for a running batch to finish. If False and a
+                batch is running, nothing is done. Defaults to True.
+
+        Returns:
+            int: The number of respawn events that fired.
+        """
+        if not self._game_lock.acquire(blocking):
+            return 0
+        try:
+            fired = self.game.resource_manager.process_respawn_events()
+            if fired:
+                event = self._pool_event()
+        finally:
+            self._game_lock.release()
+        if fired:
+            self.broadcast(event)
+        return fired
+
+    def service_actions(self):
+        # Waiting for a batch here would stop new connections being accepted
+        self.process_respawns(blocking=False)
+
+    def _watch_respawns(self, resource_id):
+        # Respawn callbacks fire once, so watch for the next one
+        self.game.resource_manager.on_respawn(resource_id, self._watch_respawns)
+
+    def _pool_event(self):
+        """Snapshot the pool as a push message. Call with the game lock held."""
+        self._pool_sequence += 1
+        return {
+            "event": "pool",
+            "sequence": self._pool_sequence,
+            "resources": self.game.resource_manager.get_available_resource_nodes(),
+        }
+
+    def subscribe(self, connection):
+        with self._subscribers_lock:
+            self._subscribers.add(connection)
+
+    def unsubscribe(self, connection):
+        with self._subscribers_lock:
+            self._subscribers.discard(connection)
+
+    def broadcast(self, body):
+        """Push a JSON message to every subscribed WebSocket."""
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        for connection in subscribers:
+            try:
+                connection.send_json(body)
+            except OSError as error:
+                logger.debug(f"Dropping WebSocket subscriber: {str(error)}")
+                self.unsubscribe(connection)
+
+
+if __name__ == "__main__":
+    server = GameServer(GameInterface("data/knowledge_graph.json"), port=8765)
+    print(f"Serving CraftGraph on http://{server.server_address[0]}:8765")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.debug("GameServer stopped")
+    finally:
+        server.server_close()
@@ -0,0 +1,529 @@
+import sys
+from array import array
+from collections import Counter
+from collections.abc import Mapping
+from itertools import accumulate, chain, compress
+from operator import itemgetter
+
+from logger import logger
+
+# Marks a node or edge that does not have an attribute
+MISSING = object()
+
+
+def _build_column(values):
+    """
+    Store one attribute's values in the most compact form that fits them.
+
+    Whole numbers go in a signed 64-bit array when they fit and other
+    numbers in a double array. Strings are interned and stored as small
+    integer codes into a shared list of distinct values. Anything else
+    stays in a plain list.
+
+    Args:
+        values (list): The value of every row, MISSING where a row has none.
+
+    Returns:
+        _Column: The packed column.
+    """
+    present = [value for value in values if value is not MISSING]
+    value_types = {type(value) for value in present}
+    missing = len(present) < len(values)
+    if value_types == {int} and not missing:
+        try:
+            return _Column(array("q", values))
+        except OverflowError:
+            # Python ints are unbounded; keep ones outside 64 bits as they are
+            return _Column(values)
+    if value_types == {float} and not missing:
+        return _Column(array("d", values))
+    if value_types <= {str}:
+        categories = [MISSING]
+        codes = {MISSING: 0}
+        for value in present:
+            if value not in codes:
+                codes[value] = len(categories)
+                categories.append(sys.intern(value))
+        typecode = "B" if len(categories) <= 1 << 8 else "I"
+        return _Column(array(typecode, [codes[value] for value in values]), categories)
+    return _Column(values)
+
+
+class _Column:
+    """A packed attribute column, optionally coded against a list of categories."""
+
+    __slots__ = ("values", "categories")
+
+    def __init__(self, values, categories=None):
+        self.values = values
+        self.categories = categories
+
+    def get(self, row):
+        value = self.values[row]
+        if self.categories is not None:
+            return self.categories[value]
+        return value
+
+
+class AttributeView(Mapping):
+    """
+    A read-only view of one node's or edge's attributes.
+
+    The values live in the graph's attribute columns; the view only records
+    which row it reads from, so no per-row dict is ever stored.
+    """
+
+    __slots__ = ("_columns", "_row")
+
+    def __init__(self, columns, row):
+        self._columns = columns
+        self._row = row
+
+    def __getitem__(self, key):
+        value = self._columns[key].get(self._row)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        return (
+            key
+            for key, column in self._columns.items()
+            if column.get(self._row) is not MISSING
+        )
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"AttributeView({dict(self)!r})"
+
+
+class FrozenAttributes(Mapping):
+    """
+    A read-only attribute dict that many nodes or edges can share.
+
+    Copying one, shallow or deep, returns the same object, so NetworkX
+    operations that copy attribute data keep sharing it.
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, attributes):
+        self._data = dict(attributes)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __repr__(self):
+        return f"FrozenAttributes({self._data!r})"
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return FrozenAttributes, (self._data,)
+
+
+class AttributeInterner:
+    """
+    Hands out one shared FrozenAttributes for each distinct attribute dict.
+
+    Dicts are equal when they hold the same keys with values of the same
+    type, so ``1``, ``True`` and ``1.0`` are kept apart, while key order
+    does not matter. Attribute dicts with unhashable values, such as lists,
+    are frozen but not shared.
+    """
+
+    def __init__(self):
+        self._shared = {}
+
+    def __len__(self):
+        return len(self._shared)
+
+    def intern(self, attributes):
+        """
+        Get the shared read-only copy of an attribute dict.
+
+        Args:
+            attributes (dict): The attributes of a node or edge.
+
+        Returns:
+            FrozenAttributes: A copy shared with every equal dict interned so far.
+        """
+        try:
+            key = tuple(
+                (name, type(value), value)
+                for name, value in sorted(attributes.items(), key=itemgetter(0))
+            )
+            shared = self._shared.get(key)
+        except TypeError:
+            return FrozenAttributes(attributes)
+        if shared is None:
+            shared = self._shared[key] = FrozenAttributes(attributes)
+        return shared
+
+
+class _NodeView:
+    """Node access shaped like ``nx.DiGraph.nodes``."""
+
+    __slots__ = ("_graph",)
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __call__(self, data=False):
+        if not data:
+            return iter(self._graph.node_ids)
+        return (
+            (node, {"attributes": AttributeView(self._graph._node_columns, row)})
+            for row, node in enumerate(self._graph.node_ids)
+        )
+
+    def __getitem__(self, node):
+        row = self._graph.node_index[node]
+        return {"attributes": AttributeView(self._graph._node_columns, row)}
+
+    def __iter__(self):
+        return iter(self._graph.node_ids)
+
+    def __len__(self):
+        return len(self._graph.node_ids)
+
+    def __contains__(self, node):
+        return node in self._graph.node_index
+
+
+class _EdgeView:
+    """Edge access shaped like ``nx.DiGraph.edges``."""
+
+    __slots__ = ("_graph",)
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __call__(self, data=False):
+        graph = self._graph
+        return graph._iter_edges(range(len(graph.node_ids)), graph._out, data)
+
+    def __getitem__(self, edge):
+        row = self._graph._edge_row(*edge)
+        return {"attributes": AttributeView(self._graph._edge_columns, row)}
+
+    def __iter__(self):
+        return self()
+
+    def __len__(self):
+        return len(self._graph._edge_sources)
+
+    def __contains__(self, edge):
+        return self._graph.has_edge(*edge)
+
+
+class KnowledgeGraph:
+    """
+    A compact, read-only directed graph for the game runtime.
+
+    Node IDs are interned to consecutive integers. Adjacency is stored in
+    both directions as offset and target arrays, and attributes are stored
+    per key in typed columns instead of a dict per node and edge. The
+    subset of the ``nx.DiGraph`` API the runtime uses is provided, so the
+    game never has to import NetworkX; ``to_networkx`` converts the graph
+    for code that needs the full library, such as the renderers.
+    """
+
+    def __init__(self, node_ids, node_attributes, sources, targets, edge_attributes):
+        """
+        Initialize the KnowledgeGraph.
+
+        Args:
+            node_ids (list): The node IDs, in order.
+            node_attributes (list): The attribute dict of each node, in the same order.
+            sources (list): The source row of each edge, indexing into ``node_ids``.
+            targets (list): The target row of each edge.
+            edge_attributes (list): The attribute dict of each edge.
+        """
+        self.node_ids = node_ids
+        self.node_index = {node: row for row, node in enumerate(node_ids)}
+        self._node_columns = self._pack(node_attributes)
+
+        # Edges are numbered source-first so each node's out-edges are contiguous
+        by_source = sorted(range(len(sources)), key=sources.__getitem__)
+        self._edge_sources = array("q", [sources[edge] for edge in by_source])
+        self._edge_targets = array("q", [targets[edge] for edge in by_source])
+        self._edge_columns = self._pack([edge_attributes[edge] for edge in by_source])
+        self._out = self._adjacency(self._edge_sources, range(len(by_source)))
+        self._in = self._adjacency(
+            self._edge_targets,
+            sorted(range(len(by_source)), key=self._edge_targets.__getitem__),
+        )
+        self.nodes = _NodeView(self)
+        self.edges = _EdgeView(self)
+
+    @classmethod
+    def from_records(cls, nodes, edges=()):
+        """
+        Build a KnowledgeGraph from node and edge records as stored in JSON.
+
+        As in NetworkX, a repeated node or edge keeps its first position and
+        its last attributes, and nodes only named by an edge are added
+        without attributes.
+
+        Args:
+            nodes (list): Dicts with an ``id`` and optional ``attributes``.
+            edges (list): Dicts with a ``source``, a ``target`` and optional ``attributes``.
+
+        Returns:
+            KnowledgeGraph: The built graph.
+
+        Raises:
+            KeyError: If a record is missing its ``id``, ``source`` or ``target``.
+        """
+        node_attributes = {node["id"]: node.get("attributes", {}) for node in nodes}
+        source_ids = [edge["source"] for edge in edges]
+        target_ids = [edge["target"] for edge in edges]
+        if not node_attributes.keys() >= {*source_ids, *target_ids}:
+            for node in chain.from_iterable(zip(source_ids, target_ids)):
+                node_attributes.setdefault(node, {})
+        node_ids = list(node_attributes)
+        node_index = {node: row for row, node in enumerate(node_ids)}
+        sources = list(map(node_index.__getitem__, source_ids))
+        targets = list(map(node_index.__getitem__, target_ids))
+        edge_attributes = [edge.get("attributes", {}) for edge in edges]
+
+        # Keep the last record of each repeated edge, at its first position
+        count = len(node_ids)
+        keys = [source * count + target for source, target in zip(sources, targets)]
+        last_record = dict(zip(keys, range(len(keys))))
+        if len(last_record) < len(keys):
+            first_record = {}
+            for record, key in enumerate(keys):
+                first_record.setdefault(key, record)
+            kept = sorted(last_record, key=first_record.__getitem__)
+            sources = [sources[last_record[key]] for key in kept]
+            targets = [targets[last_record[key]] for key in kept]
+            edge_attributes = [edge_attributes[last_record[key]] for key in kept]
+
+        return cls(
+            node_ids, list(node_attributes.values()), sources, targets, edge_attributes
+        )
+
+    @staticmethod
+    def _pack(rows):
+        keys = dict.fromkeys(chain.from_iterable(rows))
+        return {
+            key: _build_column([attributes.get(key, MISSING) for attributes in rows])
+            for key in keys
+        }
+
+    def _adjacency(self, endpoints, edge_rows):
+        """
+        Build compressed adjacency: the edges of node ``n`` are
+        ``edges[offsets[n]:offsets[n + 1]]``.
+        """
+        degrees = Counter(endpoints)
+        offsets = array(
+            "q",
+            accumulate(map(degrees.__getitem__, range(len(self.node_ids))), initial=0),
+        )
+        return offsets, array("q", edge_rows)
+
+    def _edge_rows(self, adjacency, row):
+        offsets, edge_rows = adjacency
+        return edge_rows[offsets[row] : offsets[row + 1]]
+
+    def _iter_edges(self, rows, adjacency, data):
+        for row in rows:
+            for edge_row in self._edge_rows(adjacency, row):
+                source = self.node_ids[self._edge_sources[edge_row]]
+                target = self.node_ids[self._edge_targets[edge_row]]
+                if data:
+                    attributes = AttributeView(self._edge_columns, edge_row)
+                    yield source, target, {"attributes": attributes}
+                else:
+                    yield source, target
+
+    def _edge_row(self, source, target):
+        target_row = self.node_index[target]
+        for edge_row in self._edge_rows(self._out, self.node_index[source]):
+            if self._edge_targets[edge_row] == target_row:
+                return edge_row
+        raise KeyError((source, target))
+
+    def __contains__(self, node):
+        return node in self.node_index
+
+    def __iter__(self):
+        return iter(self.node_ids)
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def number_of_nodes(self):
+        return len(self.node_ids)
+
+    def number_of_edges(self):
+        return len(self._edge_sources)
+
+    def has_node(self, node):
+        return node in self.node_index
+
+    def has_edge(self, source, target):
+        try:
+            self._edge_row(source, target)
+            return True
+        except KeyError:
+            return False
+
+    def successors(self, node):
+        """Iterate over the nodes an edge leads to from a node."""
+        for edge_row in self._edge_rows(self._out, self.node_index[node]):
+            yield self.node_ids[self._edge_targets[edge_row]]
+
+    def predecessors(self, node):
+        """Iterate over the nodes with an edge into a node."""
+        for edge_row in self._edge_rows(self._in, self.node_index[node]):
+            yield self.node_ids[self._edge_sources[edge_row]]
+
+    def out_edges(self, node, data=False):
+        return self._iter_edges([self.node_index[node]], self._out, data)
+
+    def in_edges(self, node, data=False):
+        return self._iter_edges([self.node_index[node]], self._in, data)
+
+    def node_groups(self, key):
+        """
+        Group the nodes that have an attribute by its value.
+
+        Values are read straight from the attribute column, without an
+        attribute view per node. A string column with few distinct values
+        is split one category code at a time.
+
+        Args:
+            key (str): The attribute to group by.
+
+        Returns:
+            dict: Sets of node IDs keyed by value. Unhashable values are skipped.
+        """
+        column = self._node_columns.get(key)
+        if column is None:
+            return {}
+        categories = column.categories
+        if categories is not None and len(categories) <= 16:
+            return {
+                categories[code]: set(
+                    compress(self.node_ids, map(code.__eq__, column.values))
+                )
+                for code in range(1, len(categories))
+            }
+        groups = {}
+        for row, node in enumerate(self.node_ids):
+            value = column.get(row)
+            if value is MISSING:
+                continue
+            try:
+                groups.setdefault(value, set()).add(node)
+            except TypeError:
+                continue
+        return groups
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("KnowledgeGraph is read-only, edit a to_networkx() copy")
+
+    add_node = add_edge = remove_edge = _read_only
+
+    def to_networkx(self):
+        """
+        Convert the graph to a NetworkX directed graph.
+
+        NetworkX is only imported when this is called.
+
+        Returns:
+            nx.DiGraph: A graph with the same nodes, edges and attributes, with
+            equal attribute dicts shared as read-only FrozenAttributes.
+        """
+        import networkx as nx
+
+        logger.debug("Converting KnowledgeGraph to NetworkX")
+        nx_graph = nx.DiGraph()
+        interner = AttributeInterner()
+        for node, data in self.nodes(data=True):
+            nx_graph.add_node(node, attributes=interner.intern(data["attributes"]))
+        for source, target, data in self.edges(data=True):
+            nx_graph.add_edge(
+                source, target, attributes=interner.intern(data["attributes"])
+            )
+        return nx_graph
+
+
+def as_networkx(graph):
+    """
+    Get a NetworkX version of a graph, converting a KnowledgeGraph if needed.
+
+    Args:
+        graph (KnowledgeGraph or nx.DiGraph): The graph to convert.
+
+    Returns:
+        nx.DiGraph: The graph itself if it already is one, otherwise a converted copy.
+    """
+    if isinstance(graph, KnowledgeGraph):
+        return graph.to_networkx()
+    return graph
+
+
+def graph_version(graph):
+    """
+    Get the mutation version of a graph.
+
+    Args:
+        graph (KnowledgeGraph or nx.DiGraph): The graph to check.
+
+    Returns:
+        int: A number that changes whenever the graph is changed through
+        ``mark_changed``. Always 0 for read-only graphs.
+    """
+    return getattr(graph, "graph", {}).get("version", 0)
+
+
+def graph_signature(graph):
+    """
+    Get a cheap fingerprint that changes when a graph is edited.
+
+    The mutation version is combined with the node count, so nodes added
+    directly without ``mark_changed`` are still noticed. Both are O(1); the
+    edge count is left out because NetworkX sums every node's degree to get
+    it. Edges added or removed directly need ``mark_changed``.
+
+    Args:
+        graph (KnowledgeGraph or nx.DiGraph): The graph to check.
+
+    Returns:
+        tuple: The graph's mutation version and node count.
+    """
+    return graph_version(graph), graph.number_of_nodes()
+
+
+def mark_changed(graph):
+    """
+    Record that a graph has changed, so indexes built over it are refreshed.
+
+    Everything that edits a NetworkX graph in place, such as the query and
+    reachability indexes, calls this after each change. Code that edits a
+    graph directly should call it too.
+
+    Args:
+        graph (nx.DiGraph): The graph that was changed.
+    """
+    graph.graph["version"] = graph_version(graph) + 1
@@ -0,0 +1,411 @@
+from itertools import chain
+
+import numpy as np
+
+from logger import logger
+
+# Ratio between the ideal edge length of a coarse level and the next finer one
+LEVEL_SCALE = np.sqrt(7 / 4)
+# Coarsening stops once a level has this few nodes
+COARSEST_SIZE = 32
+# Graphs this small are laid out with exact pairwise repulsion
+EXACT_REPULSION_SIZE = 256
+# Finest level of the Barnes-Hut grid pyramid, a 512 x 512 grid
+MAX_GRID_LEVEL = 9
+# Pull towards the centre that keeps disconnected parts from drifting apart
+GRAVITY = 0.05
+
+
+def _index_edges(graph):
+    """
+    Read a graph's nodes and edges into arrays.
+
+    Args:
+        graph (nx.Graph or KnowledgeGraph): The graph to read.
+
+    Returns:
+        tuple: The node list and an (m, 2) array of edges as node rows.
+    """
+    nodes = list(graph.nodes())
+    node_index = {node: row for row, node in enumerate(nodes)}
+    ends = np.fromiter(
+        map(node_index.__getitem__, chain.from_iterable(graph.edges())),
+        dtype=np.int64,
+    )
+    return nodes, ends.reshape(-1, 2)
+
+
+def _undirected_edges(edges, weights, n):
+    """Drop self-loops and merge parallel and reversed edges, summing their weights."""
+    keep = edges[:, 0] != edges[:, 1]
+    edges = np.sort(edges[keep], axis=1)
+    weights = weights[keep]
+    keys, inverse = np.unique(edges[:, 0] * n + edges[:, 1], return_inverse=True)
+    merged = np.bincount(inverse, weights=weights, minlength=len(keys))
+    return np.stack([keys // n, keys % n], axis=1), merged
+
+
+def _coarsen(edges, weights, mass, rng):
+    """
+    Merge each node with a neighbour to build the next coarser level.
+
+    Every node picks its heaviest edge, with ties broken at random. Edges
+    picked by both of their ends form a matching and merge their ends; nodes
+    left unmatched join the node across their picked edge, so hubs with many
+    leaves still shrink quickly.
+
+    Returns:
+        tuple: The coarse node of each node, and the coarse edges, weights and masses.
+    """
+    n = len(mass)
+    order = np.lexsort((rng.random(len(edges)), weights))
+    priority = np.empty(len(edges), dtype=np.int64)
+    priority[order] = np.arange(len(edges))
+    best = np.full(n, -1, dtype=np.int64)
+    np.maximum.at(best, edges[:, 0], priority)
+    np.maximum.at(best, edges[:, 1], priority)
+
+    clusters = np.arange(n)
+    mutual = (best[edges[:, 0]] == priority) & (best[edges[:, 1]] == priority)
+    matched = edges[mutual]
+    clusters[matched.ravel()] = np.repeat(matched.min(axis=1), 2)
+    is_matched = np.zeros(n, dtype=bool)
+    is_matched[matched.ravel()] = True
+
+    lonely = np.flatnonzero(~is_matched & (best >= 0))
+    picked = edges[order[best[lonely]]]
+    partners = np.where(picked[:, 0] == lonely, picked[:, 1], picked[:, 0])
+    clusters[lonely] = clusters[partners]
+
+    _, coarse_of = np.unique(clusters, return_inverse=True)
+    coarse_n = coarse_of.max() + 1
+    coarse_edges, coarse_weights = _undirected_edges(
+        coarse_of[edges], weights, coarse_n
+    )
+    coarse_mass = np.bincount(coarse_of, weights=mass, minlength=coarse_n)
+    return coarse_of, coarse_edges, coarse_weights, coarse_mass
+
+
+def _exact_repulsion(pos, mass, k):
+    diff = pos[:, None, :] - pos[None, :, :]
+    dist2 = np.einsum("ijk,ijk->ij", diff, diff) + 1e-9
+    return np.einsum("ijk,ij->ik", diff, k * k * mass[None, :] / dist2)
+
+
+def _cell_force(target, source_mass, source, k):
+    """Repulsion on points at ``target`` from point masses at ``source``."""
+    diff = target - source
+    dist2 = diff[..., 0] ** 2 + diff[..., 1] ** 2 + 1e-9
+    return diff * (k * k * source_mass / dist2)[..., None]
+
+
+def _grid_repulsion(pos, mass, k):
+    """
+    Approximate repulsion with a Barnes-Hut style grid pyramid.
+
+    Nodes are binned into a square grid, and coarser grids are built by
+    merging 2 x 2 blocks of cells. At every level a cell is pushed by the
+    centre of mass of each cell that is a child of its parent's neighbours
+    but not one of its own neighbours, and the push is handed down to every
+    node inside it. Only the 3 x 3 cells around a node at the finest level
+    are left, and those act on the node directly.
+    """
+    n = len(pos)
+    levels = int(np.clip(np.ceil(np.log2(n / 2) / 2), 2, MAX_GRID_LEVEL))
+    size = 2**levels
+    low = pos.min(axis=0)
+    span = max(np.ptp(pos, axis=0).max(), 1e-9) * (1 + 1e-9)
+    cells = np.minimum(((pos - low) / span * size).astype(np.int64), size - 1)
+    flat = cells[:, 0] * size + cells[:, 1]
+
+    mass_grids = [np.bincount(flat, weights=mass, minlength=size * size)]
+    moment_grids = [
+        np.stack(
+            [
+                np.bincount(flat, weights=mass * pos[:, axis], minlength=size * size)
+                for axis in (0, 1)
+            ],
+            axis=-1,
+        ).reshape(size, size, 2)
+    ]
+    mass_grids[0] = mass_grids[0].reshape(size, size)
+    for _ in range(levels - 2):
+        half = mass_grids[-1].shape[0] // 2
+        mass_grids.append(mass_grids[-1].reshape(half, 2, half, 2).sum(axis=(1, 3)))
+        moment_grids.append(
+            moment_grids[-1].reshape(half, 2, half, 2, 2).sum(axis=(1, 3))
+        )
+
+    # Far field, handed down from the coarsest level to the finest
+    far = np.zeros((4, 4, 2))
+    for level_mass, level_moment in zip(reversed(mass_grids), reversed(moment_grids)):
+        width = level_mass.shape[0]
+        if far.shape[0] < width:
+            far = far.repeat(2, axis=0).repeat(2, axis=1)
+        filled = level_mass > 0
+        centres = np.where(
+            filled[..., None],
+            level_moment / np.where(filled, level_mass, 1)[..., None],
+            0.0,
+        )
+        padded_mass = np.pad(level_mass, 3)
+        padded_centres = np.pad(centres, ((3, 3), (3, 3), (0, 0)))
+        half = width // 2
+        for a in (0, 1):
+            for b in (0, 1):
+                target = centres[a::2, b::2]
+                for dx in range(-2 - a, 4 - a):
+                    for dy in range(-2 - b, 4 - b):
+                        if abs(dx) <= 1 and abs(dy) <= 1:
+                            continue
+                        x = a + dx + 3
+                        y = b + dy + 3
+                        far[a::2, b::2] += _cell_force(
+                            target,
+                            padded_mass[x : x + 2 * half : 2, y : y + 2 * half : 2],
+                            padded_centres[x : x + 2 * half : 2, y : y + 2 * half : 2],
+                            k,
+                        )
+    force = far[cells[:, 0], cells[:, 1]]
+
+    # Near field: the node's own cell without the node, and the cells around it
+    padded_mass = np.pad(mass_grids[0], 1)
+    padded_moment = np.pad(moment_grids[0], ((1, 1), (1, 1), (0, 0)))
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            x = cells[:, 0] + dx + 1
+            y = cells[:, 1] + dy + 1
+            cell_mass = padded_mass[x, y]
+            cell_moment = padded_moment[x, y]
+            if dx == 0 and dy == 0:
+                cell_mass = cell_mass - mass
+                cell_moment = cell_moment - mass[:, None] * pos
+            filled = cell_mass > 1e-9
+            centre = cell_moment / np.where(filled, cell_mass, 1)[:, None]
+            force += np.where(
+                filled[:, None], _cell_force(pos, cell_mass, centre, k), 0.0
+            )
+    return force
+
+
+def _repulsion(pos, mass, k):
+    if len(pos) <= EXACT_REPULSION_SIZE:
+        return _exact_repulsion(pos, mass, k)
+    return _grid_repulsion(pos, mass, k)
+
+
+def _attraction(pos, edges, weights, k):
+    delta = pos[edges[:, 1]] - pos[edges[:, 0]]
+    pull = delta * (weights * np.hypot(delta[:, 0], delta[:, 1]) / k)[:, None]
+    n = len(pos)
+    return np.stack(
+        [
+            np.bincount(edges[:, 0], weights=pull[:, axis], minlength=n)
+            - np.bincount(edges[:, 1], weights=pull[:, axis], minlength=n)
+            for axis in (0, 1)
+        ],
+        axis=1,
+    )
+
+
+def _refine(pos, edges, weights, mass, k, iterations, temperature):
+    """Run Fruchterman-Reingold steps with a linearly cooling step limit."""
+    for step in range(iterations):
+        force = _repulsion(pos, mass, k) + _attraction(pos, edges, weights, k)
+        force -= GRAVITY * mass[:, None] * (pos - pos.mean(axis=0))
+        length = np.maximum(np.hypot(force[:, 0], force[:, 1]), 1e-12)
+        limit = temperature * (1 - step / iterations)
+        pos += force * (np.minimum(length, limit) / length)[:, None]
+    return pos
+
+
+def _normalize(pos):
+    """Centre a layout on the origin and scale it to fit in [-1, 1]."""
+    pos = pos - pos.mean(axis=0)
+    extent = np.abs(pos).max()
+    return pos / extent if extent > 0 else pos
+
+
+def force_directed_layout(graph, iterations=50, seed=0):
+    """
+    Lay out a graph with a multilevel, Barnes-Hut style force-directed method.
+
+    The graph is repeatedly coarsened by merging neighbouring nodes, the
+    coarsest level is laid out from random positions, and each finer level
+    starts from the positions of its coarse nodes and is refined with a few
+    short steps. Repulsion is exact on small levels and approximated with a
+    grid pyramid on large ones, so each step costs O(n + m). Edge direction
+    is ignored.
+
+    Args:
+        graph (nx.Graph or KnowledgeGraph): The graph to lay out.
+        iterations (int): Steps on the coarsest level. Finer levels take a
+            quarter as many, but at least 10. Defaults to 50.
+        seed (int): Seed for the random start and tie-breaking. Defaults to 0.
+
+    Returns:
+        dict: An array of x and y coordinates in [-1, 1], keyed by node.
+    """
+    nodes, edges = _index_edges(graph)
+    n = len(nodes)
+    logger.debug(f"Creating force-directed layout for {n} nodes and {len(edges)} edges")
+    if n <= 1:
+        return {node: np.zeros(2) for node in nodes}
+    rng = np.random.default_rng(seed)
+
+    edges, weights = _undirected_edges(edges, np.ones(len(edges)), n)
+    levels = [(edges, weights, np.ones(n))]
+    mappings = []
+    while len(levels[-1][2]) > COARSEST_SIZE and len(levels[-1][0]):
+        coarse_of, *coarse = _coarsen(*levels[-1], rng)
+        if len(coarse[2]) > 0.9 * len(levels[-1][2]):
+            break
+        mappings.append(coarse_of)
+        levels.append(tuple(coarse))
+    logger.debug(f"Coarsened the graph into {len(levels)} levels")
+
+    k = LEVEL_SCALE ** (len(levels) - 1)
+    coarse_edges, coarse_weights, coarse_mass = levels[-1]
+    side = np.sqrt(coarse_mass.sum()) * k
+    pos = rng.random((len(coarse_mass), 2)) * side
+    pos = _refine(
+        pos, coarse_edges, coarse_weights, coarse_mass, k, iterations, side / 4
+    )
+    for coarse_of, (level_edges, level_weights, level_mass) in zip(
+        reversed(mappings), reversed(levels[:-1])
+    ):
+        k /= LEVEL_SCALE
+        pos = pos[coarse_of] + rng.normal(scale=0.1 * k, size=(len(coarse_of), 2))
+        pos = _refine(
+            pos,
+            level_edges,
+            level_weights,
+            level_mass,
+            k,
+            max(iterations // 4, 10),
+            2 * k,
+        )
+    return dict(zip(nodes, _normalize(pos)))
+
+
+def crafting_depth(graph):
+    """
+    Rank every node by how many crafting steps it is from a raw source.
+
+    Nodes with no incoming edges have depth 0, and every other node sits
+    one step below its deepest predecessor, so recipe graphs rank as raw,
+    then resource, then tool. A cycle is broken where it is entered from
+    ranked nodes, at the nodes with the fewest unranked predecessors.
+
+    Args:
+        graph (nx.DiGraph or KnowledgeGraph): The recipe graph.
+
+    Returns:
+        dict: The depth of each node.
+    """
+    nodes, edges = _index_edges(graph)
+    return dict(zip(nodes, _depths(len(nodes), edges).tolist()))
+
+
+def _depths(n, edges):
+    """Peel the graph in layers of nodes whose predecessors are all ranked."""
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    sources, targets = edges[:, 0], edges[:, 1]
+    by_source = np.argsort(sources, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(sources, minlength=n))])
+    unranked = np.bincount(targets, minlength=n)
+    depth = np.full(n, -1, dtype=np.int64)
+    entered = np.zeros(n, dtype=bool)
+    frontier = np.flatnonzero(unranked == 0)
+    level = 0
+    remaining = n
+    while remaining:
+        if frontier.size == 0:
+            left = np.flatnonzero(depth < 0)
+            if entered[left].any():
+                left = left[entered[left]]
+            frontier = left[unranked[left] == unranked[left].min()]
+        depth[frontier] = level
+        remaining -= frontier.size
+        counts = offsets[frontier + 1] - offsets[frontier]
+        starts = np.repeat(offsets[frontier] - np.cumsum(counts) + counts, counts)
+        reached = targets[by_source[starts + np.arange(counts.sum())]]
+        unranked -= np.bincount(reached, minlength=n)
+        entered[reached] = True
+        frontier = np.unique(reached[(unranked[reached] == 0) & (depth[reached] < 0)])
+        level += 1
+    return depth
+
+
+def hierarchical_layout(graph, sweeps=4):
+    """
+    Lay out a recipe graph in columns by crafting depth.
+
+    Nodes are placed left to right by ``crafting_depth``. Each column in
+    turn is ordered by the average position of its nodes' neighbours,
+    sweeping forwards over predecessors and backwards over successors, to
+    reduce edge crossings.
+
+    Args:
+        graph (nx.DiGraph or KnowledgeGraph): The recipe graph.
+        sweeps (int): Ordering passes over the columns. Defaults to 4.
+
+    Returns:
+        dict: An array of x and y coordinates in [-1, 1], keyed by node.
+    """
+    nodes, edges = _index_edges(graph)
+    n = len(nodes)
+    logger.debug(f"Creating hierarchical layout for {n} nodes")
+    if n == 0:
+        return {}
+    depth = _depths(n, edges)
+    rank_sizes = np.bincount(depth)
+    rank_starts = np.concatenate([[0], np.cumsum(rank_sizes)])
+    order = np.argsort(depth, kind="stable")
+    slot = np.empty(n, dtype=np.int64)
+    slot[order] = np.arange(n) - rank_starts[depth[order]]
+
+    # Edges grouped by the column of their target, and of their source
+    groups = []
+    for end in (1, 0):
+        grouped = edges[np.argsort(depth[edges[:, end]], kind="stable")]
+        bounds = np.searchsorted(depth[grouped[:, end]], np.arange(len(rank_sizes) + 1))
+        groups.append((grouped, bounds, end))
+
+    for sweep in range(sweeps):
+        grouped, bounds, end = groups[sweep % 2]
+        ranks = range(len(rank_sizes))
+        for rank in ranks if sweep % 2 == 0 else reversed(ranks):
+            group = grouped[bounds[rank] : bounds[rank + 1]]
+            if not len(group):
+                continue
+            members = order[rank_starts[rank] : rank_starts[rank + 1]]
+            local = slot[group[:, end]]
+            neighbour_y = (
+                slot[group[:, 1 - end]] - (rank_sizes[depth[group[:, 1 - end]]] - 1) / 2
+            )
+            total = np.bincount(local, weights=neighbour_y, minlength=len(members))
+            count = np.bincount(local, minlength=len(members))
+            own_y = np.arange(len(members)) - (len(members) - 1) / 2
+            barycentre = np.where(count > 0, total / np.maximum(count, 1), own_y)
+            members = members[np.argsort(barycentre, kind="stable")]
+            order[rank_starts[rank] : rank_starts[rank + 1]] = members
+            slot[members] = np.arange(len(members))
+
+    y = slot - (rank_sizes[depth] - 1) / 2
+    x = depth / depth.max() * 2 - 1 if depth.max() else np.zeros(n)
+    y = y / max(np.abs(y).max(), 1)
+    return dict(zip(nodes, np.stack([x, y], axis=1)))
+
+
+if __name__ == "__main__":
+    from knowledge_graph_parser import load_knowledge_graph
+
+    try:
+        # Example usage
+        graph = load_knowledge_graph("data/knowledge_graph.json")
+        logger.debug(f"Crafting depths: {crafting_depth(graph)}")
+        logger.debug(f"Force-directed layout: {force_directed_layout(graph)}")
+        logger.debug(f"Hierarchical layout: {hierarchical_layout(graph)}")
+    except Exception as e:
+        logger.debug(f"An error occurred: {str(e)}")
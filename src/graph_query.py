@@ -0,0 +1,507 @@
+import functools
+import operator
+import re
+import weakref
+from collections import namedtuple
+
+from graph_core import graph_signature, mark_changed
+from logger import logger
+
+# Comparison operators, longest first so "<=" is not read as "<"
+OPERATORS = {
+    "<=": operator.le,
+    ">=": operator.ge,
+    "!=": operator.ne,
+    "=": operator.eq,
+    "<": operator.lt,
+    ">": operator.gt,
+}
+
+Condition = namedtuple("Condition", ["key", "op", "value"])
+# A compiled query: a disjunction of conjunctions of conditions
+Query = namedtuple("Query", ["text", "clauses"])
+
+_CONDITION_PATTERN = re.compile(
+    r"^\s*([\w.]+)\s*("
+    + "|".join(map(re.escape, OPERATORS))
+    + r")\s*([^<>=!\s].*?)\s*$"
+)
+_OR_PATTERN = re.compile(r"\s+OR\s+", re.IGNORECASE)
+_AND_PATTERN = re.compile(r"\s+AND\s+", re.IGNORECASE)
+
+_MISSING = object()
+
+# Indexes of graphs queried through the module-level helpers
+_indexes = weakref.WeakKeyDictionary()
+
+
+def _parse_value(text):
+    """Read a condition value as a number or boolean, falling back to a string."""
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "'\"":
+        return text[1:-1]
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    lowered = text.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    return text
+
+
+@functools.lru_cache(maxsize=256)
+def compile_query(text):
+    """
+    Compile an attribute query such as ``"type=tool AND tier<=2"``.
+
+    A query is one or more ``key op value`` conditions joined with ``AND``
+    and ``OR``, where ``AND`` binds tighter. The operators are ``=``, ``!=``,
+    ``<``, ``<=``, ``>`` and ``>=``. Values are read as numbers or booleans
+    where possible and may be quoted to keep them as strings. Compiled
+    queries are cached, so the same text is only parsed once.
+
+    Args:
+        text (str): The query to compile.
+
+    Returns:
+        Query: The compiled query.
+
+    Raises:
+        ValueError: If the query is empty or a condition cannot be parsed.
+    """
+    logger.debug(f"Compiling attribute query: {text}")
+    clauses = []
+    for disjunct in _OR_PATTERN.split(text.strip()):
+        conditions = []
+        for term in _AND_PATTERN.split(disjunct):
+            match = _CONDITION_PATTERN.match(term)
+            if not match:
+                logger.debug(f"Invalid condition in attribute query: {term!r}")
+                raise ValueError(f"Invalid condition {term!r} in query {text!r}")
+            key, op, value = match.groups()
+            conditions.append(Condition(key, op, _parse_value(value)))
+        clauses.append(tuple(conditions))
+    return Query(text, tuple(clauses))
+
+
+def _add_to_index(index, key_values, item):
+    for key, value in key_values.items():
+        try:
+            index.setdefault(key, {}).setdefault(value, set()).add(item)
+        except TypeError:
+            # Unhashable values such as lists cannot be compared against a query
+            continue
+
+
+def _satisfies(query, attributes):
+    """Check one item's attributes against a compiled query, as the index would."""
+    return any(
+        all(_satisfies_condition(condition, attributes) for condition in conditions)
+        for conditions in query.clauses
+    )
+
+
+def _satisfies_condition(condition, attributes):
+    value = attributes.get(condition.key, _MISSING)
+    try:
+        hash(value)
+    except TypeError:
+        # Unhashable values are never indexed, so only ``!=`` matches them
+        return condition.op == "!="
+    if value is _MISSING:
+        return condition.op == "!="
+    try:
+        return bool(OPERATORS[condition.op](value, condition.value))
+    except TypeError:
+        return False
+
+
+def _pick(key_values, key):
+    return {key: key_values[key]} if key in key_values else {}
+
+
+def _remove_from_index(index, key_values, item):
+    for key, value in key_values.items():
+        try:
+            index.get(key, {}).get(value, set()).discard(item)
+        except TypeError:
+            continue
+
+
+class GraphQueryIndex:
+    """
+    Attribute indexes over a knowledge graph that answer compiled queries.
+
+    Every node and edge attribute is indexed by key and value, so an equality
+    condition is a single lookup and a range condition only walks the
+    distinct values of its key. Conditions joined with ``AND`` intersect
+    their matches starting from the smallest. Results are memoized until the
+    graph's mutation version changes, which the index, the reachability
+    index and ``graph_core.mark_changed`` bump on every edit, or nodes are
+    added directly. Call ``invalidate`` after adding or removing edges or
+    editing attributes in place without marking the graph as changed.
+
+    The index only holds a weak reference to the graph, so caching it per
+    graph does not keep the graph alive.
+    """
+
+    def __init__(self, nx_graph):
+        """
+        Initialize the GraphQueryIndex and index a graph's attributes.
+
+        Args:
+            nx_graph (nx.DiGraph): The knowledge graph to index.
+        """
+        self._graph = weakref.ref(nx_graph)
+        self._results = {}
+        self.invalidate()
+
+    @property
+    def graph(self):
+        """nx.DiGraph: The indexed graph."""
+        graph = self._graph()
+        if graph is None:
+            raise ReferenceError("The indexed graph no longer exists")
+        return graph
+
+    def invalidate(self):
+        """
+        Drop the attribute indexes and all memoized results.
+
+        The node and edge indexes are rebuilt separately, each on the first
+        query that needs it, so a graph only ever queried for nodes never
+        pays for indexing its edges.
+        """
+        logger.debug("Invalidating attribute query index")
+        self._results.clear()
+        self._node_order = None
+        self._node_index = None
+        self._edge_order = None
+        self._edge_index = None
+        self._edges_into = None
+        self._edges_from = None
+        self._signature = graph_signature(self.graph)
+
+    def _build_node_order(self):
+        if self._node_order is None:
+            graph = self.graph
+            # Compact graphs already number their nodes in graph order
+            self._node_order = getattr(graph, "node_index", None)
+            if self._node_order is None:
+                self._node_order = {node: order for order, node in enumerate(graph)}
+            self._node_index = {}
+
+    def _node_values(self, key):
+        """Get the nodes grouped by one attribute's value, indexing the key on first use."""
+        if key not in self._node_index:
+            graph = self.graph
+            if hasattr(graph, "node_groups"):
+                # Compact and sharded graphs group a key without a dict per node
+                self._node_index[key] = graph.node_groups(key)
+            else:
+                self._node_index[key] = {}
+                for node, data in graph.nodes(data=True):
+                    attributes = _pick(data.get("attributes", {}), key)
+                    _add_to_index(self._node_index, attributes, node)
+            logger.debug(f"Indexed node attribute: {key}")
+        return self._node_index[key]
+
+    def _build_edge_index(self):
+        if self._edge_order is None:
+            self._edge_order = {}
+            self._edge_index = {}
+            self._edges_into = {}
+            self._edges_from = {}
+            for source, target, data in self.graph.edges(data=True):
+                self._index_edge(source, target, data.get("attributes", {}))
+            logger.debug(f"Indexed {len(self._edge_order)} edges")
+
+    def _index_node(self, node, attributes):
+        """Add a node to the node order and to every attribute key indexed so far."""
+        self._node_order.setdefault(node, len(self._node_order))
+        for key in self._node_index:
+            _add_to_index(self._node_index, _pick(attributes, key), node)
+
+    def _index_edge(self, source, target, attributes):
+        edge = (source, target)
+        self._edge_order.setdefault(edge, len(self._edge_order))
+        _add_to_index(self._edge_index, attributes, edge)
+        self._edges_into.setdefault(target, set()).add(edge)
+        self._edges_from.setdefault(source, set()).add(edge)
+
+    def _check_fresh(self):
+        """Re-index if the graph was changed since it was indexed."""
+        if graph_signature(self.graph) != self._signature:
+            logger.debug("Graph changed outside the query index, re-indexing")
+            self.invalidate()
+
+    def nodes(self, query):
+        """
+        Find the nodes whose attributes match a query.
+
+        Args:
+            query (str or Query): The query, e.g. ``"type=tool AND tier<=2"``.
+
+        Returns:
+            list: The matching node IDs, in graph order.
+
+        Raises:
+            ValueError: If the query cannot be compiled.
+        """
+        query = compile_query(query) if isinstance(query, str) else query
+        self._check_fresh()
+        key = ("nodes", query)
+        if key not in self._results:
+            self._build_node_order()
+            matches = self._evaluate(query, self._node_values, self._node_order.keys())
+            self._results[key] = sorted(matches, key=self._node_order.__getitem__)
+        return list(self._results[key])
+
+    def edges(self, query=None, source=None, target=None):
+        """
+        Find the edges whose attributes match a query.
+
+        Args:
+            query (str or Query): The query, e.g. ``"action=craft"``. Defaults to any edge.
+            source (str): Only match edges out of this node.
+            target (str): Only match edges into this node.
+
+        Returns:
+            list: The matching edges as (source, target) tuples, in graph order.
+
+        Raises:
+            ValueError: If the query cannot be compiled.
+        """
+        if isinstance(query, str):
+            query = compile_query(query)
+        self._check_fresh()
+        key = ("edges", query, source, target)
+        if key in self._results:
+            return list(self._results[key])
+        if self._edge_order is None and (source is not None or target is not None):
+            # Edges at one node are cheaper to check than indexing every edge
+            self._results[key] = self._adjacent_edges(query, source, target)
+        else:
+            self._build_edge_index()
+            candidates = None
+            if source is not None:
+                candidates = self._edges_from.get(source, set())
+            if target is not None:
+                into = self._edges_into.get(target, set())
+                candidates = into if candidates is None else candidates & into
+            if query is not None:
+                matches = self._evaluate(
+                    query,
+                    lambda key: self._edge_index.get(key, {}),
+                    self._edge_order.keys(),
+                    candidates,
+                )
+            elif candidates is not None:
+                matches = candidates
+            else:
+                matches = self._edge_order.keys()
+            self._results[key] = sorted(matches, key=self._edge_order.__getitem__)
+        return list(self._results[key])
+
+    def _adjacent_edges(self, query, source, target):
+        """
+        Match a query against the edges out of ``source`` or into ``target`` only.
+
+        Returns:
+            list: The matching edges, in graph order.
+        """
+        graph = self.graph
+        if source is not None:
+            edges = graph.out_edges(source, data=True) if source in graph else ()
+        else:
+            edges = graph.in_edges(target, data=True) if target in graph else ()
+        matches = [
+            (edge_source, edge_target)
+            for edge_source, edge_target, data in edges
+            if target in (None, edge_target)
+            and (query is None or _satisfies(query, data.get("attributes", {})))
+        ]
+        if source is None:
+            # Graph order is by source first, and each source has one edge to target
+            self._build_node_order()
+            matches.sort(key=lambda edge: self._node_order[edge[0]])
+        return matches
+
+    def _evaluate(self, query, values_of, everything, candidates=None):
+        """
+        Match a compiled query against an attribute index.
+
+        Args:
+            query (Query): The compiled query.
+            values_of (callable): Get the item sets keyed by value of an attribute key.
+            everything (set-like): Every indexed item, used to negate ``!=``.
+            candidates (set): Only match these items. Defaults to everything.
+
+        Returns:
+            set: The matching items.
+        """
+        matches = set()
+        for conditions in query.clauses:
+            matched = sorted(
+                (
+                    self._match(condition, values_of(condition.key), everything)
+                    for condition in conditions
+                ),
+                key=len,
+            )
+            if candidates is not None:
+                matched.insert(0, candidates)
+            matches |= set(matched[0]).intersection(*matched[1:])
+        return matches
+
+    def _match(self, condition, values, everything):
+        if condition.op == "=":
+            try:
+                return values.get(condition.value, set())
+            except TypeError:
+                return set()
+        if condition.op == "!=":
+            try:
+                return everything - values.get(condition.value, set())
+            except TypeError:
+                return set(everything)
+        compare = OPERATORS[condition.op]
+        matches = set()
+        for value, items in values.items():
+            try:
+                if compare(value, condition.value):
+                    matches |= items
+            except TypeError:
+                # Values of another type, e.g. strings in a numeric range
+                continue
+        return matches
+
+    def add_node(self, node, attributes=None):
+        """
+        Add a node to the graph, or replace the attributes of an existing one.
+
+        Args:
+            node (str): The ID of the node.
+            attributes (dict): The node's attributes. Defaults to empty.
+        """
+        logger.debug(f"Adding node to query index: {node}")
+        self._check_fresh()
+        previous = (
+            self.graph.nodes[node].get("attributes", {}) if node in self.graph else {}
+        )
+        self.graph.add_node(node, attributes=attributes or {})
+        if self._node_order is not None:
+            _remove_from_index(self._node_index, previous, node)
+            self._index_node(node, attributes or {})
+        self._mutated()
+
+    def add_edge(self, source, target, attributes=None):
+        """
+        Add an edge to the graph, or replace the attributes of an existing one.
+
+        Args:
+            source (str): The ID of the source node. Added to the graph if missing.
+            target (str): The ID of the target node. Added to the graph if missing.
+            attributes (dict): The edge's attributes. Defaults to empty.
+        """
+        logger.debug(f"Adding edge to query index: {source} -> {target}")
+        self._check_fresh()
+        for node in (source, target):
+            if node not in self.graph:
+                self.graph.add_node(node, attributes={})
+                if self._node_order is not None:
+                    self._index_node(node, {})
+        previous = {}
+        if self.graph.has_edge(source, target):
+            previous = self.graph.edges[source, target].get("attributes", {})
+        self.graph.add_edge(source, target, attributes=attributes or {})
+        if self._edge_order is not None:
+            _remove_from_index(self._edge_index, previous, (source, target))
+            self._index_edge(source, target, attributes or {})
+        self._mutated()
+
+    def remove_edge(self, source, target):
+        """
+        Remove an edge from the graph.
+
+        Raises:
+            nx.NetworkXError: If the edge is not in the graph.
+        """
+        logger.debug(f"Removing edge from query index: {source} -> {target}")
+        self._check_fresh()
+        attributes = self.graph.edges[source, target].get("attributes", {})
+        self.graph.remove_edge(source, target)
+        if self._edge_order is not None:
+            edge = (source, target)
+            _remove_from_index(self._edge_index, attributes, edge)
+            del self._edge_order[edge]
+            self._edges_into[target].discard(edge)
+            self._edges_from[source].discard(edge)
+        self._mutated()
+
+    def _mutated(self):
+        self._results.clear()
+        mark_changed(self.graph)
+        self._signature = graph_signature(self.graph)
+
+
+def query_index(nx_graph):
+    """
+    Get the shared query index of a graph, building it on first use.
+
+    Args:
+        nx_graph (nx.DiGraph): The knowledge graph to query.
+
+    Returns:
+        GraphQueryIndex: The index, kept for as long as the graph is alive.
+    """
+    index = _indexes.get(nx_graph)
+    if index is None:
+        index = GraphQueryIndex(nx_graph)
+        _indexes[nx_graph] = index
+    return index
+
+
+def query_nodes(nx_graph, query):
+    """
+    Find the nodes of a graph whose attributes match a query.
+
+    Args:
+        nx_graph (nx.DiGraph): The knowledge graph to query.
+        query (str): The query, e.g. ``"type=tool AND tier<=2"``.
+
+    Returns:
+        list: The matching node IDs, in graph order.
+    """
+    return query_index(nx_graph).nodes(query)
+
+
+def query_edges(nx_graph, query=None, source=None, target=None):
+    """
+    Find the edges of a graph whose attributes match a query.
+
+    Args:
+        nx_graph (nx.DiGraph): The knowledge graph to query.
+        query (str): The query, e.g. ``"action=craft"``. Defaults to any edge.
+        source (str): Only match edges out of this node.
+        target (str): Only match edges into this node.
+
+    Returns:
+        list: The matching edges as (source, target) tuples, in graph order.
+    """
+    return query_index(nx_graph).edges(query, source=source, target=target)
+
+
+if __name__ == "__main__":
+    from knowledge_graph_parser import parse_knowledge_graph
+
+    try:
+        # Example usage
+        graph = parse_knowledge_graph("data/knowledge_graph.json")
+        logger.debug(f"Early tools: {query_nodes(graph, 'type=tool AND tier<=1')}")
+        logger.debug(
+            f"Iron axe ingredients: {query_edges(graph, 'action=craft', target='iron_axe')}"
+        )
+    except Exception as e:
+        logger.debug(f"An error occurred: {str(e)}")
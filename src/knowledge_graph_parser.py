@@ -1,63 +1,29 @@
 import json
 
-import networkx as nx
-
+from graph_core import AttributeInterner, KnowledgeGraph
+from graph_query import query_nodes
 from logger import logger
 
 
-def parse_knowledge_graph(file_path):
+def _read_graph_data(file_path):
     """
-    Parse a JSON file to create a knowledge graph using NetworkX.
-
-    This function reads a JSON file containing node and edge data,
-    and constructs a directed graph representation of the knowledge graph.
-
-    Args:
-        file_path (str): Path to the JSON file containing the knowledge graph data.
-
-    Returns:
-        nx.DiGraph: A NetworkX directed graph representing the knowledge graph.
+    Read and validate the JSON data of a knowledge graph.
 
     Raises:
         FileNotFoundError: If the specified JSON file is not found.
         json.JSONDecodeError: If the JSON file is not properly formatted.
         KeyError: If the JSON file is missing the required "nodes" key.
     """
-    logger.debug(f"Parsing knowledge graph from file: {file_path}")
     try:
         # Read the JSON file
         with open(file_path, "r") as file:
             data = json.load(file)
 
-        # Create a new directed graph
-        nx_graph = nx.DiGraph()
-
         # Check for the presence of the "nodes" key
         if "nodes" not in data:
             logger.debug("Missing required 'nodes' key in JSON data")
             raise KeyError("Missing required 'nodes' key in JSON data")
-
-        # Add nodes from JSON data
-        for node in data["nodes"]:
-            # Add node with its attributes
-            nx_graph.add_node(node["id"], attributes=node.get("attributes", {}))
-        logger.debug(f"Added {len(data['nodes'])} nodes to the graph")
-
-        # Add edges from JSON data if present
-        if "edges" in data:
-            for edge in data["edges"]:
-                # Add edge with its attributes
-                nx_graph.add_edge(
-                    edge["source"],
-                    edge["target"],
-                    attributes=edge.get("attributes", {}),
-                )
-            logger.debug(f"Added {len(data['edges'])} edges to the graph")
-        else:
-            logger.debug("No 'edges' key found in JSON data, skipping edge creation")
-
-        logger.debug("Knowledge graph parsed successfully")
-        return nx_graph
+        return data
 
     except FileNotFoundError:
         logger.debug(f"Knowledge graph file not found at {file_path}")
@@ -70,14 +36,115 @@ def parse_knowledge_graph(file_path):
         raise
 
 
+def parse_knowledge_graph(file_path, interner=None, reachability=False):
+    """
+    Parse a JSON file to create a knowledge graph using NetworkX.
+
+    This function reads a JSON file containing node and edge data,
+    and constructs a directed graph representation of the knowledge graph.
+    Equal attribute dicts are stored once and shared as read-only
+    FrozenAttributes. NetworkX is only imported when this is called; the
+    game runtime uses ``load_knowledge_graph`` instead.
+
+    Args:
+        file_path (str): Path to the JSON file containing the knowledge graph data.
+        interner (AttributeInterner): Shares attribute dicts with other graphs
+            parsed with the same interner. Defaults to a new one.
+        reachability (bool): Build the graph's shared reachability index now
+            instead of on the first focused lookup. Defaults to False.
+
+    Returns:
+        nx.DiGraph: A NetworkX directed graph representing the knowledge graph.
+
+    Raises:
+        FileNotFoundError: If the specified JSON file is not found.
+        json.JSONDecodeError: If the JSON file is not properly formatted.
+        KeyError: If the JSON file is missing the required "nodes" key.
+    """
+    import networkx as nx
+
+    logger.debug(f"Parsing knowledge graph from file: {file_path}")
+    data = _read_graph_data(file_path)
+
+    # Create a new directed graph
+    nx_graph = nx.DiGraph()
+    if interner is None:
+        interner = AttributeInterner()
+
+    # Add nodes from JSON data
+    for node in data["nodes"]:
+        # Add node with its attributes
+        nx_graph.add_node(
+            node["id"], attributes=interner.intern(node.get("attributes", {}))
+        )
+    logger.debug(f"Added {len(data['nodes'])} nodes to the graph")
+
+    # Add edges from JSON data if present
+    if "edges" in data:
+        for edge in data["edges"]:
+            # Add edge with its attributes
+            nx_graph.add_edge(
+                edge["source"],
+                edge["target"],
+                attributes=interner.intern(edge.get("attributes", {})),
+            )
+        logger.debug(f"Added {len(data['edges'])} edges to the graph")
+    else:
+        logger.debug("No 'edges' key found in JSON data, skipping edge creation")
+
+    logger.debug(f"Knowledge graph parsed with {len(interner)} distinct attribute sets")
+    if reachability:
+        # Imported here because the reachability module imports this one
+        from reachability import reachability_index
+
+        reachability_index(nx_graph)
+    return nx_graph
+
+
+def load_knowledge_graph(file_path, reachability=False):
+    """
+    Load a JSON knowledge graph into a compact, read-only KnowledgeGraph.
+
+    This is the loader used by the game runtime. It builds the same nodes,
+    edges and attributes as ``parse_knowledge_graph`` without importing NetworkX.
+
+    Args:
+        file_path (str): Path to the JSON file containing the knowledge graph data.
+        reachability (bool): Build the graph's shared reachability index now
+            instead of on the first focused lookup. Defaults to False.
+
+    Returns:
+        KnowledgeGraph: The loaded knowledge graph.
+
+    Raises:
+        FileNotFoundError: If the specified JSON file is not found.
+        json.JSONDecodeError: If the JSON file is not properly formatted.
+        KeyError: If the JSON file is missing the required "nodes" key.
+    """
+    logger.debug(f"Loading knowledge graph from file: {file_path}")
+    data = _read_graph_data(file_path)
+
+    graph = KnowledgeGraph.from_records(data["nodes"], data.get("edges", []))
+    logger.debug(
+        f"Loaded {graph.number_of_nodes()} nodes and {graph.number_of_edges()} edges"
+    )
+    if reachability:
+        # Imported here because the reachability module imports this one
+        from reachability import reachability_index
+
+        reachability_index(graph)
+    return graph
+
+
 def get_available_resources(nx_graph):
     """
     Get all available resources and tools from the knowledge graph.
 
     This function identifies all nodes in the graph that are marked as resources or tools.
+    The lookup is served from the graph's shared attribute query index.
 
     Args:
-        nx_graph (nx.DiGraph): A NetworkX directed graph representing the knowledge graph.
+        nx_graph (nx.DiGraph or KnowledgeGraph): The knowledge graph to search.
 
     Returns:
         list: A list of resource and tool node IDs.
@@ -85,11 +152,7 @@ def get_available_resources(nx_graph):
     logger.debug("Retrieving available resources and tools from the knowledge graph")
     try:
         # Filter nodes to include those with type 'resource' or 'tool'
-        resources_and_tools = [
-            node
-            for node, attr in nx_graph.nodes(data=True)
-            if attr["attributes"].get("type") in ["resource", "tool"]
-        ]
+        resources_and_tools = query_nodes(nx_graph, "type=resource OR type=tool")
         logger.debug(f"Found {len(resources_and_tools)} available resources and tools")
         return resources_and_tools
     except Exception as error:
@@ -0,0 +1,488 @@
+import json
+import os
+import re
+from collections import defaultdict
+
+from graph_core import AttributeInterner
+from knowledge_graph_parser import load_knowledge_graph
+from logger import logger
+
+MANIFEST_FILE = "manifest.json"
+DEFAULT_SHARD = "default"
+NAMESPACE_KEY = "namespace"
+# Node attributes the game looks up across the whole graph at startup
+GROUP_KEYS = ("type", "regen_interval", "max_nodes")
+
+
+def _shard_for_node(node, shard_key):
+    """
+    Determine which shard a node belongs to.
+
+    Nodes are grouped by the value of the ``shard_key`` attribute (for example
+    ``tier`` or ``biome``). The special ``namespace`` key groups nodes by the
+    prefix of a ``namespace:item`` style ID instead.
+
+    Args:
+        node (dict): A node entry from the knowledge graph JSON data.
+        shard_key (str): The attribute used to group nodes into shards.
+
+    Returns:
+        str: The name of the shard the node belongs to.
+    """
+    if shard_key == NAMESPACE_KEY:
+        namespace, separator, _ = node["id"].partition(":")
+        return namespace if separator else DEFAULT_SHARD
+    value = node.get("attributes", {}).get(shard_key)
+    return DEFAULT_SHARD if value is None else str(value)
+
+
+def _shard_file_name(shard_key, shard, used):
+    """
+    Build a safe, unique file name for a shard.
+
+    Shard names come from attribute values, so anything other than letters,
+    digits, ``-`` and ``_`` is replaced to keep the file inside the output
+    directory. A numeric suffix keeps names that collide after this apart.
+    """
+    stem = re.sub(r"[^\w-]+", "_", f"{shard_key}_{shard}")
+    name = f"{stem}.json"
+    suffix = 1
+    while name in used:
+        suffix += 1
+        name = f"{stem}_{suffix}.json"
+    used.add(name)
+    return name
+
+
+def _group_nodes(nodes, key):
+    """
+    Group node IDs by the value of one attribute, for storing in a manifest.
+
+    Returns:
+        list: ``[value, node_ids]`` pairs, since JSON object keys must be
+        strings. Unhashable values are skipped.
+    """
+    groups = {}
+    for node_id, node in nodes.items():
+        attributes = node.get("attributes", {})
+        if key not in attributes:
+            continue
+        try:
+            groups.setdefault(attributes[key], []).append(node_id)
+        except TypeError:
+            continue
+    return [[value, node_ids] for value, node_ids in groups.items()]
+
+
+def shard_knowledge_graph(
+    file_path, output_dir, shard_key="tier", group_keys=GROUP_KEYS
+):
+    """
+    Split a knowledge graph JSON file into shards and a manifest.
+
+    Each shard is written as a standalone knowledge graph file holding its
+    nodes and the edges between them, so it can be loaded with
+    ``load_knowledge_graph``. Edges that cross shards are kept in the
+    manifest together with the node-to-shard index. Nodes only named by an
+    edge are placed as if they had no attributes. The nodes are also
+    grouped by each of ``group_keys`` in the manifest, so looking up every
+    node with a given value of those keys loads no shard.
+
+    Args:
+        file_path (str): Path to the JSON file containing the knowledge graph data.
+        output_dir (str): Directory to write the shard files and manifest to.
+        shard_key (str): Node attribute to shard by, or ``namespace``. Defaults to "tier".
+        group_keys (tuple): Node attributes to group in the manifest. Defaults to
+            the keys the game needs at startup.
+
+    Returns:
+        str: Path to the written manifest file.
+
+    Raises:
+        FileNotFoundError: If the specified JSON file is not found.
+        json.JSONDecodeError: If the JSON file is not properly formatted.
+        KeyError: If the JSON file is missing the required "nodes" key.
+    """
+    logger.debug(f"Sharding knowledge graph {file_path} by '{shard_key}'")
+    with open(file_path, "r") as file:
+        data = json.load(file)
+
+    if "nodes" not in data:
+        logger.debug("Missing required 'nodes' key in JSON data")
+        raise KeyError("Missing required 'nodes' key in JSON data")
+
+    # As when loading, a repeated node or edge keeps its first position and last record
+    nodes = {node["id"]: node for node in data["nodes"]}
+    edges = {(edge["source"], edge["target"]): edge for edge in data.get("edges", [])}
+    for source, target in edges:
+        for node in (source, target):
+            nodes.setdefault(node, {"id": node})
+
+    node_shards = {}
+    shards = defaultdict(lambda: {"nodes": [], "edges": []})
+    shard_values = {}
+    mixed_shards = set()
+    for node_id, node in nodes.items():
+        shard = _shard_for_node(node, shard_key)
+        node_shards[node_id] = shard
+        shards[shard]["nodes"].append(node)
+        value = node.get("attributes", {}).get(shard_key)
+        known = shard_values.setdefault(shard, value)
+        if type(known) is not type(value) or known != value:
+            mixed_shards.add(shard)
+
+    cross_edges = []
+    for (source, target), edge in edges.items():
+        source_shard = node_shards[source]
+        if source_shard == node_shards[target]:
+            shards[source_shard]["edges"].append(edge)
+        else:
+            cross_edges.append(edge)
+
+    os.makedirs(output_dir, exist_ok=True)
+    shard_files = {}
+    used = set()
+    for shard, shard_data in shards.items():
+        shard_files[shard] = _shard_file_name(shard_key, shard, used)
+        with open(os.path.join(output_dir, shard_files[shard]), "w") as file:
+            json.dump(shard_data, file)
+
+    manifest = {
+        "shard_key": shard_key,
+        "shards": shard_files,
+        "nodes": node_shards,
+        "edges": cross_edges,
+        "edge_count": len(edges),
+        "groups": {key: _group_nodes(nodes, key) for key in group_keys},
+    }
+    if shard_key != NAMESPACE_KEY:
+        # The attribute value shared by every node of a shard, where there is one
+        manifest["values"] = {
+            shard: value
+            for shard, value in shard_values.items()
+            if shard not in mixed_shards
+        }
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(manifest_path, "w") as file:
+        json.dump(manifest, file)
+
+    logger.debug(
+        f"Wrote {len(shard_files)} shards and {len(cross_edges)} cross-shard edges"
+    )
+    return manifest_path
+
+
+class _ShardedNodeView:
+    """Node access shaped like ``nx.DiGraph.nodes``, loading shards on demand."""
+
+    __slots__ = ("_graph",)
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __call__(self, data=False):
+        if not data:
+            return iter(self._graph)
+        return ((node, self[node]) for node in self._graph)
+
+    def __getitem__(self, node):
+        return {"attributes": self._graph.node_attributes(node)}
+
+    def __iter__(self):
+        return iter(self._graph)
+
+    def __len__(self):
+        return len(self._graph)
+
+    def __contains__(self, node):
+        return node in self._graph
+
+
+class _ShardedEdgeView:
+    """Edge access shaped like ``nx.DiGraph.edges``, loading shards on demand."""
+
+    __slots__ = ("_graph",)
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __call__(self, data=False):
+        return (
+            edge for node in self._graph for edge in self._graph.out_edges(node, data)
+        )
+
+    def __getitem__(self, edge):
+        return {"attributes": self._graph.edge_attributes(*edge)}
+
+    def __iter__(self):
+        return self()
+
+    def __len__(self):
+        return self._graph.number_of_edges()
+
+    def __contains__(self, edge):
+        return self._graph.has_edge(*edge)
+
+
+class ShardedKnowledgeGraph:
+    """
+    A knowledge graph split into shards that are loaded on first use.
+
+    Only the manifest is read up front. A shard is loaded the first time a
+    lookup reaches one of its nodes, so startup cost and resident memory scale
+    with the part of the graph a session actually touches. The read-only
+    subset of the ``nx.DiGraph`` API that ``KnowledgeGraph`` provides is
+    available here too, so the resource manager, crafting planner and
+    attribute queries can run on a sharded graph unchanged.
+    """
+
+    def __init__(self, manifest_path):
+        """
+        Initialize the ShardedKnowledgeGraph from a manifest.
+
+        Args:
+            manifest_path (str): Path to the manifest file, or the directory containing it.
+
+        Raises:
+            FileNotFoundError: If the manifest file is not found.
+            json.JSONDecodeError: If the manifest is not properly formatted.
+            KeyError: If the manifest is missing a required key.
+        """
+        if os.path.isdir(manifest_path):
+            manifest_path = os.path.join(manifest_path, MANIFEST_FILE)
+        logger.debug(f"Loading knowledge graph manifest: {manifest_path}")
+        try:
+            with open(manifest_path, "r") as file:
+                manifest = json.load(file)
+
+            self.shard_dir = os.path.dirname(manifest_path)
+            self.shard_key = manifest["shard_key"]
+            self.shard_files = manifest["shards"]
+            self.node_shards = manifest["nodes"]
+            self.node_index = {node: row for row, node in enumerate(self.node_shards)}
+            self._shard_values = manifest.get("values", {})
+            self._groups = manifest.get("groups", {})
+            self._edge_count = manifest.get("edge_count")
+            self._shards = {}
+            self._interner = AttributeInterner()
+            self._cross_successors = defaultdict(dict)
+            self._cross_predecessors = defaultdict(dict)
+            for edge in manifest.get("edges", []):
+                attributes = self._interner.intern(edge.get("attributes", {}))
+                self._cross_successors[edge["source"]][edge["target"]] = attributes
+                self._cross_predecessors[edge["target"]][edge["source"]] = attributes
+            self.nodes = _ShardedNodeView(self)
+            self.edges = _ShardedEdgeView(self)
+            logger.debug(
+                f"Manifest lists {len(self.node_shards)} nodes in {len(self.shard_files)} shards"
+            )
+        except (FileNotFoundError, json.JSONDecodeError, KeyError) as error:
+            logger.debug(f"Error loading knowledge graph manifest: {str(error)}")
+            raise
+
+    @property
+    def loaded_shards(self):
+        """list: Names of the shards that have been loaded so far."""
+        return sorted(self._shards)
+
+    def load_shard(self, shard):
+        """
+        Load a shard, reading its file only on first access.
+
+        Args:
+            shard (str): The name of the shard to load.
+
+        Returns:
+            KnowledgeGraph: The graph holding the shard's nodes and internal edges.
+
+        Raises:
+            KeyError: If the shard is not listed in the manifest.
+        """
+        if shard not in self._shards:
+            logger.debug(f"Loading shard: {shard}")
+            path = os.path.join(self.shard_dir, self.shard_files[shard])
+            self._shards[shard] = load_knowledge_graph(path)
+        return self._shards[shard]
+
+    def _shard_graph(self, node_id):
+        return self.load_shard(self.shard_of(node_id))
+
+    def shard_of(self, node_id):
+        """
+        Get the name of the shard holding a node without loading it.
+
+        Raises:
+            KeyError: If the node is not in the knowledge graph.
+        """
+        return self.node_shards[node_id]
+
+    def __contains__(self, node_id):
+        return node_id in self.node_shards
+
+    def __iter__(self):
+        return iter(self.node_shards)
+
+    def __len__(self):
+        return len(self.node_shards)
+
+    def has_node(self, node_id):
+        """Check whether a node exists without loading any shard."""
+        return node_id in self.node_shards
+
+    def has_edge(self, source, target):
+        if target in self._cross_successors.get(source, {}):
+            return True
+        return source in self and self._shard_graph(source).has_edge(source, target)
+
+    def number_of_nodes(self):
+        return len(self.node_shards)
+
+    def number_of_edges(self):
+        """Count the edges, loading every shard only for manifests that lack the count."""
+        if self._edge_count is None:
+            self._edge_count = sum(
+                self.load_shard(shard).number_of_edges() for shard in self.shard_files
+            ) + sum(map(len, self._cross_successors.values()))
+        return self._edge_count
+
+    def node_attributes(self, node_id):
+        """
+        Get the attributes of a node, loading its shard if needed.
+
+        Raises:
+            KeyError: If the node is not in the knowledge graph.
+        """
+        return self._shard_graph(node_id).nodes[node_id]["attributes"]
+
+    def edge_attributes(self, source, target):
+        """
+        Get the attributes of an edge, loading the source shard if needed.
+
+        Raises:
+            KeyError: If the edge is not in the knowledge graph.
+        """
+        if target in self._cross_successors.get(source, {}):
+            return self._cross_successors[source][target]
+        return self._shard_graph(source).edges[source, target]["attributes"]
+
+    def successors(self, node_id):
+        """
+        Get the nodes that a node leads to, loading only the node's own shard.
+
+        Returns:
+            list: IDs of the successor nodes, including those in other shards.
+        """
+        return list(self._shard_graph(node_id).successors(node_id)) + list(
+            self._cross_successors.get(node_id, {})
+        )
+
+    def predecessors(self, node_id):
+        """
+        Get the nodes that lead to a node, loading only the node's own shard.
+
+        Returns:
+            list: IDs of the predecessor nodes, including those in other shards.
+        """
+        return list(self._shard_graph(node_id).predecessors(node_id)) + list(
+            self._cross_predecessors.get(node_id, {})
+        )
+
+    def out_edges(self, node_id, data=False):
+        """Iterate over the edges out of a node, loading only the node's own shard."""
+        yield from self._shard_graph(node_id).out_edges(node_id, data)
+        for target, attributes in self._cross_successors.get(node_id, {}).items():
+            edge = (node_id, target)
+            yield (*edge, {"attributes": attributes}) if data else edge
+
+    def in_edges(self, node_id, data=False):
+        """Iterate over the edges into a node, loading only the node's own shard."""
+        yield from self._shard_graph(node_id).in_edges(node_id, data)
+        for source, attributes in self._cross_predecessors.get(node_id, {}).items():
+            edge = (source, node_id)
+            yield (*edge, {"attributes": attributes}) if data else edge
+
+    def node_groups(self, key):
+        """
+        Group the nodes that have an attribute by its value.
+
+        Grouping by the shard key, or by a key grouped in the manifest, is
+        answered without loading anything; any other key loads every shard.
+
+        Args:
+            key (str): The attribute to group by.
+
+        Returns:
+            dict: Sets of node IDs keyed by value.
+        """
+        if (
+            key == self.shard_key
+            and self._shard_values.keys() >= self.shard_files.keys()
+        ):
+            groups = {}
+            for node, shard in self.node_shards.items():
+                value = self._shard_values[shard]
+                if value is not None:
+                    groups.setdefault(value, set()).add(node)
+            return groups
+        if key in self._groups:
+            return {value: set(nodes) for value, nodes in self._groups[key]}
+        groups = {}
+        for shard in self.shard_files:
+            for value, nodes in self.load_shard(shard).node_groups(key).items():
+                groups.setdefault(value, set()).update(nodes)
+        return groups
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("ShardedKnowledgeGraph is read-only, edit a to_networkx() copy")
+
+    add_node = add_edge = remove_edge = _read_only
+
+    def to_networkx(self):
+        """
+        Load every shard and merge them into a single graph.
+
+        This is intended for tools such as the renderers that need the whole
+        graph at once. NetworkX is only imported when this is called.
+
+        Returns:
+            nx.DiGraph: A directed graph equivalent to the unsharded knowledge graph.
+        """
+        import networkx as nx
+
+        logger.debug("Merging all shards into a single graph")
+        merged = nx.DiGraph()
+        for node, data in self.nodes(data=True):
+            merged.add_node(node, attributes=self._interner.intern(data["attributes"]))
+        for source, target, data in self.edges(data=True):
+            merged.add_edge(
+                source, target, attributes=self._interner.intern(data["attributes"])
+            )
+        return merged
+
+
+def open_knowledge_graph(path):
+    """
+    Open a knowledge graph file, or a sharded knowledge graph from its manifest.
+
+    Args:
+        path (str): Path to a knowledge graph JSON file, a shard manifest, or
+            a directory holding a manifest.
+
+    Returns:
+        KnowledgeGraph or ShardedKnowledgeGraph: The opened graph. A sharded
+        graph loads its shards as lookups reach them.
+    """
+    if os.path.isdir(path) or os.path.basename(path) == MANIFEST_FILE:
+        return ShardedKnowledgeGraph(path)
+    return load_knowledge_graph(path)
+
+
+if __name__ == "__main__":
+    try:
+        # Example usage
+        path = shard_knowledge_graph("data/knowledge_graph.json", "data/shards")
+        graph = ShardedKnowledgeGraph(path)
+        logger.debug(f"Predecessors of iron_axe: {graph.predecessors('iron_axe')}")
+        logger.debug(f"Loaded shards: {graph.loaded_shards}")
+    except Exception as e:
+        logger.debug(f"An error occurred: {str(e)}")
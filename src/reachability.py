@@ -0,0 +1,351 @@
+import weakref
+
+from graph_core import graph_signature, mark_changed
+from knowledge_graph_parser import parse_knowledge_graph
+from logger import logger
+
+
+def _iter_bits(bitset):
+    """Yield the positions of the set bits in an integer bitset."""
+    while bitset:
+        lowest = bitset & -bitset
+        yield lowest.bit_length() - 1
+        bitset ^= lowest
+
+
+# Indexes of graphs focused on through select_subgraph and the renderers
+_indexes = weakref.WeakKeyDictionary()
+
+
+class ReachabilityIndex:
+    """
+    Precomputed ancestor and descendant closure of a knowledge graph.
+
+    Node IDs are interned to consecutive integers and each node's ancestors
+    and descendants are stored as integer bitsets over those IDs. Checking
+    whether one node leads to another is a single bit test, and listing a
+    closure only walks the bits that are set. Adding or removing an edge
+    through the index updates the graph and only the closures it affects.
+
+    The index only holds a weak reference to the graph, so caching it per
+    graph does not keep the graph alive.
+    """
+
+    def __init__(self, nx_graph):
+        """
+        Initialize the ReachabilityIndex and compute the closure of a graph.
+
+        Args:
+            nx_graph (nx.DiGraph): The knowledge graph to index.
+        """
+        logger.debug("Building reachability index")
+        self._graph = weakref.ref(nx_graph)
+        self.node_ids = []
+        self.node_index = {}
+        self._descendants = []
+        self._ancestors = []
+        self._type_masks = {}
+        for node, data in nx_graph.nodes(data=True):
+            self._intern(node, data)
+        self._rebuild()
+        self._signature = graph_signature(nx_graph)
+        logger.debug(f"Reachability index built for {len(self.node_ids)} nodes")
+
+    @property
+    def graph(self):
+        """nx.DiGraph: The indexed graph."""
+        graph = self._graph()
+        if graph is None:
+            raise ReferenceError("The indexed graph no longer exists")
+        return graph
+
+    def _intern(self, node, data=None):
+        if node in self.node_index:
+            return self.node_index[node]
+        index = len(self.node_ids)
+        self.node_ids.append(node)
+        self.node_index[node] = index
+        self._descendants.append(0)
+        self._ancestors.append(0)
+        node_type = (data or {}).get("attributes", {}).get("type")
+        self._type_masks[node_type] = self._type_masks.get(node_type, 0) | 1 << index
+        return index
+
+    def _rebuild(self):
+        """
+        Recompute every closure from scratch.
+
+        Strongly connected components are found with an iterative Tarjan
+        search, which emits them successors-first, so each component's
+        descendants can be built from closures that are already complete.
+        """
+        count = len(self.node_ids)
+        self._descendants = [0] * count
+        self._ancestors = [0] * count
+        successors = [
+            [self.node_index[target] for target in self.graph.successors(node)]
+            for node in self.node_ids
+        ]
+
+        order = [0] * count
+        low = [0] * count
+        visited = [False] * count
+        on_stack = [False] * count
+        stack = []
+        counter = 0
+        for root in range(count):
+            if visited[root]:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, position = work.pop()
+                if position == 0:
+                    visited[node] = True
+                    order[node] = low[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack[node] = True
+                recurse = False
+                for next_position in range(position, len(successors[node])):
+                    target = successors[node][next_position]
+                    if not visited[target]:
+                        work.append((node, next_position + 1))
+                        work.append((target, 0))
+                        recurse = True
+                        break
+                    if on_stack[target]:
+                        low[node] = min(low[node], order[target])
+                if recurse:
+                    continue
+                if low[node] == order[node]:
+                    self._close_component(node, stack, on_stack, successors)
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+
+        for node in range(count):
+            for descendant in _iter_bits(self._descendants[node]):
+                self._ancestors[descendant] |= 1 << node
+
+    def _close_component(self, root, stack, on_stack, successors):
+        members = []
+        while True:
+            member = stack.pop()
+            on_stack[member] = False
+            members.append(member)
+            if member == root:
+                break
+        member_bits = 0
+        for member in members:
+            member_bits |= 1 << member
+        closure = 0
+        cyclic = len(members) > 1
+        for member in members:
+            for target in successors[member]:
+                if member_bits >> target & 1:
+                    cyclic = True
+                else:
+                    closure |= 1 << target | self._descendants[target]
+        if cyclic:
+            closure |= member_bits
+        for member in members:
+            self._descendants[member] = closure
+
+    def can_reach(self, source, target):
+        """
+        Check whether a path leads from one node to another.
+
+        Raises:
+            KeyError: If either node is not in the index.
+        """
+        return bool(
+            self._descendants[self.node_index[source]] >> self.node_index[target] & 1
+        )
+
+    def descendants(self, node, node_type=None):
+        """
+        Get every node that a node can eventually produce.
+
+        Args:
+            node (str): The ID of the node to start from.
+            node_type (str): Only return nodes of this type. Defaults to all types.
+
+        Returns:
+            set: IDs of the reachable nodes.
+
+        Raises:
+            KeyError: If the node is not in the index.
+        """
+        return self._decode(self._descendants[self.node_index[node]], node_type)
+
+    def ancestors(self, node, node_type=None):
+        """
+        Get every node that a node ultimately depends on.
+
+        Args:
+            node (str): The ID of the node to start from.
+            node_type (str): Only return nodes of this type, e.g. "raw". Defaults to all types.
+
+        Returns:
+            set: IDs of the nodes that lead to this node.
+
+        Raises:
+            KeyError: If the node is not in the index.
+        """
+        return self._decode(self._ancestors[self.node_index[node]], node_type)
+
+    def _decode(self, bitset, node_type):
+        if node_type is not None:
+            bitset &= self._type_masks.get(node_type, 0)
+        return {self.node_ids[index] for index in _iter_bits(bitset)}
+
+    def add_edge(self, source, target, attributes=None):
+        """
+        Add an edge to the graph and extend the affected closures.
+
+        Only the source and its ancestors gain descendants, and only the
+        target and its descendants gain ancestors.
+
+        Args:
+            source (str): The ID of the source node. Added to the graph if missing.
+            target (str): The ID of the target node. Added to the graph if missing.
+            attributes (dict): Attributes of the new edge. Defaults to empty.
+        """
+        logger.debug(f"Adding edge to reachability index: {source} -> {target}")
+        for node in (source, target):
+            if node not in self.graph:
+                self.graph.add_node(node, attributes={})
+            self._intern(node, self.graph.nodes[node])
+        self.graph.add_edge(source, target, attributes=attributes or {})
+        mark_changed(self.graph)
+        self._signature = graph_signature(self.graph)
+
+        source_index = self.node_index[source]
+        target_index = self.node_index[target]
+        gained_descendants = 1 << target_index | self._descendants[target_index]
+        gained_ancestors = 1 << source_index | self._ancestors[source_index]
+        if gained_descendants & ~self._descendants[source_index] == 0:
+            return
+        for ancestor in _iter_bits(gained_ancestors):
+            self._descendants[ancestor] |= gained_descendants
+        for descendant in _iter_bits(gained_descendants):
+            self._ancestors[descendant] |= gained_ancestors
+
+    def remove_edge(self, source, target):
+        """
+        Remove an edge from the graph and shrink the affected closures.
+
+        Only the source and its ancestors can lose descendants. On an acyclic
+        region these are recomputed successors-first from their unchanged
+        neighbours; if the region contains a cycle the index is rebuilt.
+
+        Raises:
+            nx.NetworkXError: If the edge is not in the graph.
+        """
+        logger.debug(f"Removing edge from reachability index: {source} -> {target}")
+        self.graph.remove_edge(source, target)
+        mark_changed(self.graph)
+        self._signature = graph_signature(self.graph)
+
+        source_index = self.node_index[source]
+        affected = 1 << source_index | self._ancestors[source_index]
+        if any(self._descendants[node] >> node & 1 for node in _iter_bits(affected)):
+            logger.debug("Edge removal touches a cycle, rebuilding reachability index")
+            self._rebuild()
+            return
+
+        previous = {node: self._descendants[node] for node in _iter_bits(affected)}
+        for node in self._successors_first(affected):
+            closure = 0
+            for successor in self.graph.successors(self.node_ids[node]):
+                successor_index = self.node_index[successor]
+                closure |= 1 << successor_index | self._descendants[successor_index]
+            self._descendants[node] = closure
+
+        for node, old_closure in previous.items():
+            for lost in _iter_bits(old_closure & ~self._descendants[node]):
+                self._ancestors[lost] &= ~(1 << node)
+
+    def _successors_first(self, affected):
+        """Order the affected nodes so each comes after its affected successors."""
+        ordered = []
+        done = 0
+        for root in _iter_bits(affected):
+            if done >> root & 1:
+                continue
+            work = [(root, iter(self.graph.successors(self.node_ids[root])))]
+            done |= 1 << root
+            while work:
+                node, successors = work[-1]
+                for successor in successors:
+                    successor_index = self.node_index[successor]
+                    if (
+                        affected >> successor_index & 1
+                        and not done >> successor_index & 1
+                    ):
+                        done |= 1 << successor_index
+                        work.append(
+                            (successor_index, iter(self.graph.successors(successor)))
+                        )
+                        break
+                else:
+                    work.pop()
+                    ordered.append(node)
+        return ordered
+
+
+def reachability_index(nx_graph):
+    """
+    Get the shared reachability index of a graph, building it on first use.
+
+    The cached index is rebuilt if the graph was changed other than through
+    the index itself, which is a constant-time check. Edges added or removed
+    directly on the graph need ``graph_core.mark_changed`` to be noticed.
+
+    Args:
+        nx_graph (nx.DiGraph or KnowledgeGraph): The knowledge graph to index.
+
+    Returns:
+        ReachabilityIndex: The index, kept for as long as the graph is alive.
+    """
+    index = _indexes.get(nx_graph)
+    if index is None or index._signature != graph_signature(nx_graph):
+        index = ReachabilityIndex(nx_graph)
+        _indexes[nx_graph] = index
+    return index
+
+
+def select_subgraph(nx_graph, node, index=None):
+    """
+    Select the part of a graph connected to a node through its recipes.
+
+    The subgraph holds the node, everything it depends on and everything it
+    can produce, which is what the renderers draw when focused on one item.
+
+    Args:
+        nx_graph (nx.DiGraph): The knowledge graph to select from.
+        node (str): The ID of the node to focus on.
+        index (ReachabilityIndex): A prebuilt index of the graph. Defaults to
+            the graph's shared index from ``reachability_index``.
+
+    Returns:
+        nx.DiGraph: A read-only view of the selected part of the graph.
+    """
+    logger.debug(f"Selecting subgraph around node: {node}")
+    if index is None:
+        index = reachability_index(nx_graph)
+    selected = index.ancestors(node) | index.descendants(node) | {node}
+    return nx_graph.subgraph(selected)
+
+
+if __name__ == "__main__":
+    try:
+        # Example usage
+        graph = parse_knowledge_graph("data/knowledge_graph.json")
+        reachability = ReachabilityIndex(graph)
+        logger.debug(f"iron_ore leads to: {reachability.descendants('iron_ore')}")
+        logger.debug(
+            f"iron_axe needs raws: {reachability.ancestors('iron_axe', 'raw')}"
+        )
+    except Exception as e:
+        logger.debug(f"An error occurred: {str(e)}")
@@ -0,0 +1,128 @@
+import heapq
+import itertools
+import threading
+import time
+
+from logger import logger
+
+
+class RegenerationScheduler:
+    """
+    Tracks resource respawns lazily from elapsed time.
+
+    Nothing runs while a world is idle: each resource remembers when it was
+    last settled, and the respawns owed since then are worked out the next
+    time the pool is accessed. Callers that need to react to a respawn as it
+    happens register a callback, which is kept in a heap ordered by due time
+    and fired by ``run_due`` once ``collect`` has actually handed the respawn
+    out.
+    """
+
+    def __init__(self, intervals, clock=time.monotonic):
+        """
+        Initialize the RegenerationScheduler.
+
+        Args:
+            intervals (dict): Seconds between respawns, keyed by resource ID.
+            clock (callable): Returns the current time in seconds. Defaults to time.monotonic.
+        """
+        self.intervals = intervals
+        self.clock = clock
+        now = clock()
+        self._last_settled = {resource: now for resource in intervals}
+        self._respawned = dict.fromkeys(intervals, 0)
+        self._events = []
+        self._events_lock = threading.Lock()
+        self._sequence = itertools.count()
+
+    def collect(self, resource_id, room=None):
+        """
+        Settle a resource and return how many respawns it is owed.
+
+        Callers sharing the scheduler between threads must not settle the same
+        resource from two threads at once.
+
+        Args:
+            resource_id (str): The ID of the resource to settle.
+            room (int): The most respawns the pool can take. Time spent with no
+                room does not build up respawns. Defaults to unlimited.
+
+        Returns:
+            int: The number of new resource nodes to add.
+        """
+        interval = self.intervals.get(resource_id)
+        if interval is None:
+            return 0
+        now = self.clock()
+        owed = int((now - self._last_settled[resource_id]) // interval)
+        if room is not None and owed >= room:
+            owed = max(room, 0)
+            self._last_settled[resource_id] = now
+        else:
+            self._last_settled[resource_id] += owed * interval
+        self._respawned[resource_id] += owed
+        return owed
+
+    def next_respawn(self, resource_id):
+        """
+        Get the time of the next respawn of a resource.
+
+        Raises:
+            KeyError: If the resource does not regenerate.
+        """
+        return self._last_settled[resource_id] + self.intervals[resource_id]
+
+    def schedule(self, resource_id, callback):
+        """
+        Call a function when the next respawn of a resource happens.
+
+        Args:
+            resource_id (str): The ID of the resource to watch.
+            callback (callable): Called with the resource ID once the resource
+                has respawned.
+
+        Raises:
+            KeyError: If the resource does not regenerate.
+        """
+        due = self.next_respawn(resource_id)
+        logger.debug(f"Scheduling respawn event for {resource_id} at {due}")
+        self._push_event(due, resource_id, self._respawned[resource_id], callback)
+
+    def _push_event(self, due, resource_id, respawned, callback):
+        with self._events_lock:
+            heapq.heappush(
+                self._events,
+                (due, next(self._sequence), resource_id, respawned, callback),
+            )
+
+    def run_due(self):
+        """
+        Fire the callbacks of every scheduled respawn that has happened.
+
+        A respawn only happens once ``collect`` hands it out, so the pool should
+        be settled first. Events that are due but were not handed out, because
+        the pool was full or has not been settled since, are put back at the
+        resource's next respawn time instead of firing.
+
+        Returns:
+            int: The number of callbacks fired.
+        """
+        now = self.clock()
+        due = []
+        with self._events_lock:
+            while self._events and self._events[0][0] <= now:
+                due.append(heapq.heappop(self._events))
+        fired = 0
+        for _, _, resource_id, respawned, callback in due:
+            if self._respawned[resource_id] > respawned:
+                callback(resource_id)
+                fired += 1
+            else:
+                due_at = self.next_respawn(resource_id)
+                logger.debug(
+                    f"Rescheduling respawn event for {resource_id} at {due_at}"
+                )
+                self._push_event(due_at, resource_id, respawned, callback)
+        if fired:
+            logger.debug(f"Fired {fired} respawn events")
+        return fired
@@ -1,13 +1,29 @@
 import graphviz
 
-from knowledge_graph_parser import parse_knowledge_graph
+from graph_core import as_networkx
+from knowledge_graph_parser import load_knowledge_graph
 from logger import logger
+from reachability import reachability_index, select_subgraph
 
 
-def display_graph_graphviz(nx_graph):
-    """Display the knowledge graph using graphviz."""
+def display_graph_graphviz(nx_graph, focus=None, index=None):
+    """
+    Display the knowledge graph using graphviz.
+
+    Args:
+        nx_graph (nx.DiGraph or KnowledgeGraph): The knowledge graph to display.
+        focus (str): Only display this node and the nodes it depends on or leads to.
+        index (ReachabilityIndex): A prebuilt index of the graph to focus with.
+            Defaults to the graph's shared index.
+    """
     logger.debug("Starting to display knowledge graph using graphviz")
     try:
+        if focus is not None and index is None:
+            # Index the original graph so repeated renders reuse its closure
+            index = reachability_index(nx_graph)
+        nx_graph = as_networkx(nx_graph)
+        if focus is not None:
+            nx_graph = select_subgraph(nx_graph, focus, index)
         dot = graphviz.Digraph(comment="Knowledge Graph")
         dot.attr(rankdir="LR", size="8,5")
 
@@ -48,7 +64,7 @@ def display_graph_graphviz(nx_graph):
 if __name__ == "__main__":
     try:
         logger.debug("Parsing knowledge graph from JSON file")
-        graph = parse_knowledge_graph("data/knowledge_graph.json")
+        graph = load_knowledge_graph("data/knowledge_graph.json")
         display_graph_graphviz(graph)
     except Exception as e:
         logger.debug(f"An error occurred in main execution: {str(e)}")
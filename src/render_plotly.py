@@ -1,13 +1,20 @@
-import networkx as nx
 import plotly.graph_objects as go
 
-from knowledge_graph_parser import parse_knowledge_graph
+from graph_core import as_networkx
+from graph_layout import force_directed_layout, hierarchical_layout
+from knowledge_graph_parser import load_knowledge_graph
 from logger import logger
+from reachability import reachability_index, select_subgraph
 
 
 def create_spring_layout(nx_graph):
     logger.debug("Creating spring layout for the graph")
-    return nx.spring_layout(nx_graph, k=0.7, iterations=50)
+    return force_directed_layout(nx_graph, iterations=50)
+
+
+def create_hierarchical_layout(nx_graph):
+    logger.debug("Creating hierarchical layout for the graph")
+    return hierarchical_layout(nx_graph)
 
 
 def create_edge_trace(nx_graph, pos):
@@ -150,12 +157,31 @@ def save_figure(fig):
         logger.debug(f"Error writing figure to file: {str(error)}")
 
 
-def display_graph_plotly(nx_graph):
-    """Display the knowledge graph using Plotly."""
+def display_graph_plotly(nx_graph, focus=None, layout="spring", index=None):
+    """
+    Display the knowledge graph using Plotly.
+
+    Args:
+        nx_graph (nx.DiGraph or KnowledgeGraph): The knowledge graph to display.
+        focus (str): Only display this node and the nodes it depends on or leads to.
+        layout (str): "spring" for a force-directed layout, or "hierarchical" to
+            place nodes in columns by crafting depth. Defaults to "spring".
+        index (ReachabilityIndex): A prebuilt index of the graph to focus with.
+            Defaults to the graph's shared index.
+    """
     logger.debug("Starting to display knowledge graph using Plotly")
     try:
+        if focus is not None and index is None:
+            # Index the original graph so repeated renders reuse its closure
+            index = reachability_index(nx_graph)
+        nx_graph = as_networkx(nx_graph)
+        if focus is not None:
+            nx_graph = select_subgraph(nx_graph, focus, index)
         simple_graph = nx_graph.to_undirected()
-        pos = create_spring_layout(simple_graph)
+        if layout == "hierarchical":
+            pos = create_hierarchical_layout(nx_graph)
+        else:
+            pos = create_spring_layout(simple_graph)
         edge_trace = create_edge_trace(simple_graph, pos)
         node_trace = create_node_trace(simple_graph, pos)
         fig = create_figure(edge_trace, node_trace)
@@ -171,7 +197,7 @@ if __name__ == "__main__":
     try:
         file_path = "data/knowledge_graph.json"
         logger.debug("Parsing knowledge graph from JSON file")
-        graph = parse_knowledge_graph(file_path)
+        graph = load_knowledge_graph(file_path)
         display_graph_plotly(graph)
     except Exception as e:
         logger.debug(f"Error in main execution: {str(e)}")
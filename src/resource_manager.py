@@ -1,7 +1,13 @@
 import random
+import time
 
-from knowledge_graph_parser import parse_knowledge_graph
+from crafting_planner import CraftingPlanner
+from graph_query import query_edges, query_nodes
+from knowledge_graph_shards import open_knowledge_graph
 from logger import logger
+from regeneration import RegenerationScheduler
+from resource_pool import StripedResourcePool
+from resource_world import ResourceWorld
 
 
 class ResourceManager:
@@ -9,50 +15,145 @@ class ResourceManager:
     Manages the game's resources based on a knowledge graph.
 
     This class handles the initialization, generation, gathering, and replenishment of resources.
+    Resources with a ``regen_interval`` attribute respawn over time, up to their
+    ``max_nodes`` attribute if set. Respawns are settled whenever the pool is accessed.
+    Resource nodes are also placed in a chunked 2D world for position-based gathering.
+    The knowledge graph may be sharded, in which case shards load as queries,
+    recipe lookups and crafting plans reach them.
+    In concurrent mode the pool is a ``StripedResourcePool`` that many players can
+    gather from at once, and ``resource_nodes`` is not used.
     """
 
-    def __init__(self, knowledge_graph_path):
+    def __init__(
+        self, knowledge_graph_path, clock=time.monotonic, world_seed=0, concurrent=False
+    ):
         """
         Initialize the ResourceManager with a knowledge graph.
 
         Args:
-            knowledge_graph_path (str): Path to the JSON file containing the knowledge graph data.
+            knowledge_graph_path (str): Path to the JSON file containing the knowledge graph data,
+                or to the manifest of a sharded knowledge graph.
+            clock (callable): Returns the current time in seconds. Defaults to time.monotonic.
+            world_seed (int): Seed for generating the 2D resource world. Defaults to 0.
+            concurrent (bool): Use a thread-safe pool for multiplayer gathering.
+                Defaults to False.
         """
         try:
             logger.debug(
                 f"Initializing ResourceManager with graph: {knowledge_graph_path}"
             )
-            self.graph = parse_knowledge_graph(knowledge_graph_path)
+            self.graph = open_knowledge_graph(knowledge_graph_path)
             self.resources = self._get_resource_type_nodes()
             if not self.resources:
                 logger.debug("No resource type nodes found in the knowledge graph")
                 raise ValueError("No resource type nodes found in the knowledge graph")
             self.resource_nodes = self._generate_resource_nodes()
+            self.shared_pool = None
+            if concurrent:
+                self.shared_pool = StripedResourcePool(
+                    self.resources, self.resource_nodes
+                )
+                self.resource_nodes = None
+            self.max_nodes = self._get_resource_attribute("max_nodes")
+            self.regeneration = RegenerationScheduler(
+                self._get_resource_attribute("regen_interval"), clock
+            )
+            self.world = ResourceWorld(self._generate_resource_nodes, seed=world_seed)
+            self.planner = CraftingPlanner(self.graph)
             logger.debug("ResourceManager initialized successfully")
         except Exception as error:
             logger.debug(f"Error initializing ResourceManager: {str(error)}")
             raise
 
     def _get_resource_type_nodes(self):
-        return [
-            node
-            for node, data in self.graph.nodes(data=True)
-            if data.get("attributes", {}).get("type") == "resource"
-        ]
+        return query_nodes(self.graph, "type=resource")
+
+    def _get_resource_attribute(self, key):
+        """
+        Map each resource that has an attribute to its value.
+
+        The values come from the graph's attribute groups rather than from
+        each resource node, so a sharded graph answers from its manifest.
+        """
+        values = {}
+        for value, nodes in self.graph.node_groups(key).items():
+            for node in nodes:
+                values[node] = value
+        return {node: values[node] for node in self.resources if node in values}
+
+    def _regenerate(self, resource_ids=None):
+        """
+        Add the resource nodes that have respawned since the pool was last accessed.
+
+        Args:
+            resource_ids (list): Only settle these resources. Defaults to all of them.
+        """
+        for resource_id in resource_ids or list(self.regeneration.intervals):
+            if resource_id not in self.regeneration.intervals:
+                continue
+            if self.shared_pool is None:
+                available = self.resource_nodes.count(resource_id)
+                respawned = self._collect_respawns(resource_id, available)
+                self.resource_nodes.extend([resource_id] * respawned)
+            else:
+                with self.shared_pool.lock_for(resource_id):
+                    available = self.shared_pool.count(resource_id)
+                    respawned = self._collect_respawns(resource_id, available)
+                    self.shared_pool.add(resource_id, respawned)
+            if respawned:
+                logger.debug(f"Respawned {respawned} x {resource_id}")
+
+    def _collect_respawns(self, resource_id, available):
+        max_nodes = self.max_nodes.get(resource_id)
+        room = None if max_nodes is None else max_nodes - available
+        return self.regeneration.collect(resource_id, room)
+
+    def get_recipe(self, item_id):
+        """
+        Get the ingredients needed to craft an item.
 
-    def _generate_resource_nodes(self, num_nodes=10):
+        Args:
+            item_id (str): The ID of the item to craft.
+
+        Returns:
+            dict: Ingredient counts keyed by item ID, empty if the item cannot be crafted.
+        """
+        if item_id not in self.graph:
+            return {}
+        recipe = {}
+        for source, target in query_edges(self.graph, "action=craft", target=item_id):
+            attributes = self.graph.edges[source, target]["attributes"]
+            recipe[source] = recipe.get(source, 0) + attributes.get("quantity", 1)
+        return recipe
+
+    def plan_crafting(self, item_id, inventory=None):
+        """
+        Plan the cheapest way to obtain an item from an inventory.
+
+        Args:
+            item_id (str): The ID of the item to obtain.
+            inventory (dict): Item counts the player already holds. Defaults to empty.
+
+        Returns:
+            CraftingPlan or None: The ordered steps and their total cost, or None
+            if the item cannot be obtained.
+        """
+        return self.planner.plan(item_id, inventory)
+
+    def _generate_resource_nodes(self, num_nodes=10, rng=random):
         """
         Generate a list of random resource nodes.
 
         Args:
             num_nodes (int): Number of resource nodes to generate. Defaults to 10.
+            rng (random.Random): Source of randomness. Defaults to the random module.
 
         Returns:
             list: A list of randomly chosen resource nodes.
         """
         try:
             logger.debug(f"Generating {num_nodes} resource nodes")
-            return [random.choice(self.resources) for _ in range(num_nodes)]
+            return [rng.choice(self.resources) for _ in range(num_nodes)]
         except IndexError:
             logger.debug("No resource type nodes available to generate nodes")
             return []
@@ -68,8 +169,15 @@ class ResourceManager:
             str or None: The gathered resource ID if successful, None otherwise.
         """
         try:
-            if resource_id in self.resource_nodes:
+            self._regenerate([resource_id])
+            if self.shared_pool is not None:
+                gathered = self.shared_pool.take(resource_id)
+            elif resource_id in self.resource_nodes:
                 self.resource_nodes.remove(resource_id)
+                gathered = True
+            else:
+                gathered = False
+            if gathered:
                 logger.debug(f"Resource gathered: {resource_id}")
                 return resource_id
             logger.debug(f"Failed to gather resource: {resource_id} (not available)")
@@ -78,6 +186,47 @@ class ResourceManager:
             logger.debug(f"Error gathering resource: {str(error)}")
             return None
 
+    def gather_nearest_resource(self, resource_id, x, y, max_distance=None):
+        """
+        Gather the node of a resource nearest to a position in the world.
+
+        The pool stays the one stock of each resource: a node is only gathered
+        from the world if ``gather_resource`` can take one from the pool, so
+        regeneration and ``max_nodes`` limit both. The world decides which
+        node is taken.
+
+        Args:
+            resource_id (str): The ID of the resource to gather.
+            x (float): The x coordinate of the gatherer.
+            y (float): The y coordinate of the gatherer.
+            max_distance (float): How far to look. Defaults to the world's default reach.
+
+        Returns:
+            ResourceNode or None: The gathered node if one was available and in
+            reach, None otherwise.
+
+        Raises:
+            ValueError: If ``max_distance`` reaches further than the world keeps loaded.
+        """
+        if self.gather_resource(resource_id) is None:
+            return None
+        try:
+            node = self.world.gather_nearest(resource_id, x, y, max_distance)
+        except ValueError:
+            self._return_resource(resource_id)
+            raise
+        if node is None:
+            logger.debug(f"Failed to gather nearest resource: {resource_id}")
+            self._return_resource(resource_id)
+        return node
+
+    def _return_resource(self, resource_id):
+        """Put back a node taken from the pool whose gather did not go ahead."""
+        if self.shared_pool is not None:
+            self.shared_pool.add(resource_id)
+        else:
+            self.resource_nodes.append(resource_id)
+
     def get_available_resource_nodes(self):
         """
         Get a copy of the current available resource nodes.
@@ -86,6 +235,9 @@ class ResourceManager:
             list: A copy of the current available resource nodes.
         """
         logger.debug("Retrieving available resource nodes")
+        self._regenerate()
+        if self.shared_pool is not None:
+            return self.shared_pool.snapshot()
         return self.resource_nodes.copy()
 
     def replenish_resources(self, num_nodes=1):
@@ -98,13 +250,42 @@ class ResourceManager:
         try:
             logger.debug(f"Replenishing {num_nodes} resources")
             new_resources = [random.choice(self.resources) for _ in range(num_nodes)]
-            self.resource_nodes.extend(new_resources)
+            if self.shared_pool is not None:
+                for resource_id in new_resources:
+                    self.shared_pool.add(resource_id)
+            else:
+                self.resource_nodes.extend(new_resources)
             logger.debug(f"Resources added: {new_resources}")
         except IndexError:
             logger.debug("No resources available to replenish")
         except Exception as error:
             logger.debug(f"Error replenishing resources: {str(error)}")
 
+    def on_respawn(self, resource_id, callback):
+        """
+        Call a function when the next node of a resource respawns.
+
+        The callback fires from ``process_respawn_events`` once the respawn is due.
+
+        Args:
+            resource_id (str): The ID of the resource to watch.
+            callback (callable): Called with the resource ID when it respawns.
+
+        Raises:
+            KeyError: If the resource does not regenerate.
+        """
+        self.regeneration.schedule(resource_id, callback)
+
+    def process_respawn_events(self):
+        """
+        Settle the pool and fire any respawn callbacks that are due.
+
+        Returns:
+            int: The number of callbacks fired.
+        """
+        self._regenerate()
+        return self.regeneration.run_due()
+
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,83 @@
+import threading
+
+from logger import logger
+
+
+class StripedResourcePool:
+    """
+    A resource pool that many threads can gather from at once.
+
+    The pool keeps a count per resource instead of a list of nodes, and each
+    count is guarded by one of a fixed set of locks chosen by hashing the
+    resource ID. Gathers of different resources rarely share a lock, so
+    threads do not queue behind a single global lock, while the
+    check-then-decrement of a gather stays atomic and can never hand out the
+    same node twice.
+    """
+
+    def __init__(self, resource_ids, initial_nodes=(), stripes=16):
+        """
+        Initialize the StripedResourcePool.
+
+        Args:
+            resource_ids (list): Every resource ID the pool can hold.
+            initial_nodes (iterable): Resource IDs of the nodes to start with.
+            stripes (int): Number of locks the resources are spread over. Defaults to 16.
+        """
+        # Every key exists up front so the dict never resizes while shared
+        self._counts = dict.fromkeys(resource_ids, 0)
+        self._locks = [threading.RLock() for _ in range(stripes)]
+        for resource_id in initial_nodes:
+            self._counts[resource_id] += 1
+        logger.debug(
+            f"Created striped pool of {len(self._counts)} resources over {stripes} locks"
+        )
+
+    def lock_for(self, resource_id):
+        """Get the lock that guards a resource's count."""
+        return self._locks[hash(resource_id) % len(self._locks)]
+
+    def take(self, resource_id):
+        """
+        Atomically remove one node of a resource.
+
+        Returns:
+            bool: True if a node was taken, False if none was available.
+        """
+        if resource_id not in self._counts:
+            return False
+        with self.lock_for(resource_id):
+            if self._counts[resource_id] <= 0:
+                return False
+            self._counts[resource_id] -= 1
+            return True
+
+    def add(self, resource_id, count=1):
+        """
+        Atomically add nodes of a resource.
+
+        Raises:
+            KeyError: If the resource is not one the pool was created with.
+        """
+        with self.lock_for(resource_id):
+            self._counts[resource_id] += count
+
+    def count(self, resource_id):
+        """Get the number of available nodes of a resource."""
+        return self._counts.get(resource_id, 0)
+
+    def snapshot(self):
+        """
+        Get the available nodes as a list of resource IDs.
+
+        Each count is read atomically, but the pool may change between
+        resources while the list is built.
+
+        Returns:
+            list: One entry per available node, grouped by resource.
+        """
+        return [
+            resource_id
+            for resource_id, count in self._counts.items()
+            for _ in range(count)
+        ]
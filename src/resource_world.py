@@ -0,0 +1,277 @@
+import math
+import random
+import threading
+from collections import OrderedDict, defaultdict, namedtuple
+
+from logger import logger
+
+# Default search reach of ``nearest``, in chunks
+DEFAULT_REACH = 4
+
+ResourceNode = namedtuple("ResourceNode", ["resource_id", "x", "y", "chunk", "index"])
+
+
+class _Chunk:
+    """The resource nodes of one square chunk, indexed by resource ID."""
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.by_resource = defaultdict(set)
+        for node in nodes:
+            self.by_resource[node.resource_id].add(node.index)
+
+    def remove(self, index):
+        node = self.nodes[index]
+        self.by_resource[node.resource_id].discard(index)
+        self.nodes[index] = None
+        return node
+
+    def live_nodes(self, resource_id=None):
+        indices = (
+            self.by_resource.get(resource_id, ())
+            if resource_id is not None
+            else (node.index for node in self.nodes if node is not None)
+        )
+        return [self.nodes[index] for index in indices]
+
+
+class ResourceWorld:
+    """
+    Places resource nodes in a 2D world split into square chunks.
+
+    Chunks double as a uniform grid index: each one is generated
+    deterministically from the world seed and its coordinates when a query
+    first reaches it, and the least recently used chunks are unloaded once
+    more than ``max_loaded_chunks`` are resident. Only the indices of
+    gathered nodes are kept for unloaded chunks, so memory is bounded by the
+    areas in use.
+
+    The world is safe to share between threads. Each chunk is guarded by one
+    of a fixed set of striped locks, held while the chunk is generated, read
+    or gathered from, and a short global lock guards the LRU order. A node
+    is only ever gathered once: if another thread takes the nearest node
+    first, ``gather_nearest`` searches again.
+    """
+
+    def __init__(
+        self,
+        generate_nodes,
+        seed=0,
+        chunk_size=16,
+        nodes_per_chunk=4,
+        max_loaded_chunks=None,
+        stripes=16,
+    ):
+        """
+        Initialize the ResourceWorld.
+
+        Args:
+            generate_nodes (callable): Called as ``generate_nodes(count, rng)`` to pick
+                the resource IDs for a chunk, e.g. ``ResourceManager._generate_resource_nodes``.
+            seed (int): Seed that makes chunk generation repeatable. Defaults to 0.
+            chunk_size (float): Width and height of each chunk. Defaults to 16.
+            nodes_per_chunk (int): Number of resource nodes in each chunk. Defaults to 4.
+            max_loaded_chunks (int): Most chunks kept in memory at once. Defaults to
+                twice the chunks a default ``nearest`` search covers.
+            stripes (int): Number of locks the chunks are spread over. Defaults to 16.
+        """
+        logger.debug(f"Initializing ResourceWorld with seed {seed}")
+        self.generate_nodes = generate_nodes
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.nodes_per_chunk = nodes_per_chunk
+        if max_loaded_chunks is None:
+            max_loaded_chunks = 2 * (2 * DEFAULT_REACH + 1) ** 2
+        self.max_loaded_chunks = max_loaded_chunks
+        # Widest ring search whose chunks all fit in the cache at once
+        self.max_reach = max((math.isqrt(max_loaded_chunks) - 1) // 2, 0)
+        self._chunks = OrderedDict()
+        self._gathered = {}
+        self._cache_lock = threading.Lock()
+        self._chunk_locks = [threading.RLock() for _ in range(stripes)]
+
+    @property
+    def loaded_chunks(self):
+        """list: Coordinates of the chunks currently held in memory."""
+        with self._cache_lock:
+            return list(self._chunks)
+
+    def lock_for(self, chunk):
+        """Get the lock that guards a chunk and its gathered nodes."""
+        return self._chunk_locks[hash(chunk) % len(self._chunk_locks)]
+
+    def chunk_of(self, x, y):
+        """Get the coordinates of the chunk containing a point."""
+        return math.floor(x / self.chunk_size), math.floor(y / self.chunk_size)
+
+    def _generate_chunk(self, chunk):
+        rng = random.Random(f"{self.seed}:{chunk[0]}:{chunk[1]}")
+        resource_ids = self.generate_nodes(self.nodes_per_chunk, rng)
+        left, bottom = chunk[0] * self.chunk_size, chunk[1] * self.chunk_size
+        return [
+            ResourceNode(
+                resource_id,
+                left + rng.random() * self.chunk_size,
+                bottom + rng.random() * self.chunk_size,
+                chunk,
+                index,
+            )
+            for index, resource_id in enumerate(resource_ids)
+        ]
+
+    def load_chunk(self, chunk):
+        """
+        Get a chunk, generating it if it is not in memory.
+
+        Args:
+            chunk (tuple): The chunk coordinates.
+
+        Returns:
+            _Chunk: The chunk with previously gathered nodes removed. Hold
+            ``lock_for(chunk)`` while using it if other threads share the world.
+        """
+        with self.lock_for(chunk):
+            with self._cache_lock:
+                loaded = self._chunks.get(chunk)
+                if loaded is not None:
+                    self._chunks.move_to_end(chunk)
+                    return loaded
+
+            loaded = _Chunk(self._generate_chunk(chunk))
+            for index in self._gathered.get(chunk, ()):
+                loaded.remove(index)
+            with self._cache_lock:
+                self._chunks[chunk] = loaded
+                if len(self._chunks) > self.max_loaded_chunks:
+                    evicted, _ = self._chunks.popitem(last=False)
+                    logger.debug(f"Unloaded chunk {evicted}")
+            return loaded
+
+    def _live_nodes(self, chunk, resource_id=None):
+        with self.lock_for(chunk):
+            return self.load_chunk(chunk).live_nodes(resource_id)
+
+    def _ring(self, center, radius):
+        """Yield the chunks at exactly ``radius`` chunks from ``center``."""
+        cx, cy = center
+        if radius == 0:
+            yield center
+            return
+        for dx in range(-radius, radius + 1):
+            yield cx + dx, cy - radius
+            yield cx + dx, cy + radius
+        for dy in range(-radius + 1, radius):
+            yield cx - radius, cy + dy
+            yield cx + radius, cy + dy
+
+    def _check_fits(self, chunks, distance):
+        if chunks > self.max_loaded_chunks:
+            logger.debug(f"Refusing search of {chunks} chunks")
+            raise ValueError(
+                f"A search of {distance} covers {chunks} chunks, more than the "
+                f"{self.max_loaded_chunks} the world keeps loaded"
+            )
+
+    def nearest(self, resource_id, x, y, max_distance=None):
+        """
+        Find the nearest node of a resource.
+
+        Chunks are searched in rings around the point, stopping as soon as no
+        unsearched chunk can hold a closer node. A search may not span more
+        chunks than the cache holds, so repeated misses in one area never
+        regenerate chunks.
+
+        Args:
+            resource_id (str): The ID of the resource to look for.
+            x (float): The x coordinate to search from.
+            y (float): The y coordinate to search from.
+            max_distance (float): Ignore nodes further away than this. Defaults
+                to ``DEFAULT_REACH`` chunks, or ``max_reach`` if the cache is
+                too small for that.
+
+        Returns:
+            ResourceNode or None: The nearest node, or None if none is in range.
+
+        Raises:
+            ValueError: If ``max_distance`` reaches more chunks than the cache holds.
+        """
+        if max_distance is None:
+            max_distance = min(DEFAULT_REACH, self.max_reach) * self.chunk_size
+        max_radius = math.ceil(max_distance / self.chunk_size)
+        self._check_fits((2 * max_radius + 1) ** 2, max_distance)
+        center = self.chunk_of(x, y)
+        best, best_distance = None, max_distance
+        for radius in range(max_radius + 1):
+            for chunk in self._ring(center, radius):
+                for node in self._live_nodes(chunk, resource_id):
+                    distance = math.hypot(node.x - x, node.y - y)
+                    if distance <= best_distance:
+                        best, best_distance = node, distance
+            if best is not None and best_distance <= radius * self.chunk_size:
+                break
+        return best
+
+    def in_radius(self, x, y, radius, resource_id=None):
+        """
+        Find every node within a distance of a point.
+
+        Args:
+            x (float): The x coordinate of the center.
+            y (float): The y coordinate of the center.
+            radius (float): The search distance.
+            resource_id (str): Only return nodes of this resource. Defaults to all.
+
+        Returns:
+            list: The matching ResourceNodes, nearest first.
+
+        Raises:
+            ValueError: If the radius covers more chunks than the cache holds.
+        """
+        low_x, low_y = self.chunk_of(x - radius, y - radius)
+        high_x, high_y = self.chunk_of(x + radius, y + radius)
+        self._check_fits((high_x - low_x + 1) * (high_y - low_y + 1), radius)
+        found = [
+            node
+            for cx in range(low_x, high_x + 1)
+            for cy in range(low_y, high_y + 1)
+            for node in self._live_nodes((cx, cy), resource_id)
+            if math.hypot(node.x - x, node.y - y) <= radius
+        ]
+        return sorted(found, key=lambda node: math.hypot(node.x - x, node.y - y))
+
+    def remove(self, node):
+        """
+        Remove a node from the world so it stays gone after its chunk unloads.
+
+        Returns:
+            bool: True if the node was present, False if it was already gathered.
+        """
+        with self.lock_for(node.chunk):
+            gathered = self._gathered.setdefault(node.chunk, set())
+            if node.index in gathered:
+                return False
+            self.load_chunk(node.chunk).remove(node.index)
+            gathered.add(node.index)
+            return True
+
+    def gather_nearest(self, resource_id, x, y, max_distance=None):
+        """
+        Gather the nearest node of a resource.
+
+        If another thread gathers the node between finding and removing it,
+        the search is repeated for the next nearest.
+
+        Returns:
+            ResourceNode or None: The gathered node, or None if none is in range.
+        """
+        while True:
+            node = self.nearest(resource_id, x, y, max_distance)
+            if node is None:
+                logger.debug(f"No {resource_id} within reach of ({x}, {y})")
+                return None
+            if self.remove(node):
+                logger.debug(f"Gathered {resource_id} at ({node.x:.1f}, {node.y:.1f})")
+                return node
+            logger.debug(
+                f"Lost {resource_id} at ({node.x:.1f}, {node.y:.1f}), retrying"
+            )
@@ -0,0 +1,29 @@
+"""
+This module contains pytest fixtures shared across the test modules.
+"""
+
+import pytest
+
+
+class FakeClock:
+    """A clock that only moves when a test advances it."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    """
+    Fixture to create a controllable clock.
+
+    Returns:
+        FakeClock: A clock starting at time zero.
+    """
+    return FakeClock()
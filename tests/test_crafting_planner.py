@@ -0,0 +1,178 @@
+"""
+This module contains unit tests for the CraftingPlanner class.
+
+It tests planning gathers and crafts over the recipe graph and memoizing sub-plans.
+"""
+
+import networkx as nx
+import pytest
+
+from crafting_planner import CraftingPlanner, PlanStep
+from knowledge_graph_parser import parse_knowledge_graph
+
+
+@pytest.fixture
+def planner():
+    """
+    Fixture to create a CraftingPlanner over the game's knowledge graph.
+
+    Returns:
+        CraftingPlanner: A planner with an empty cache.
+    """
+    return CraftingPlanner(parse_knowledge_graph("data/knowledge_graph.json"))
+
+
+def test_plan_from_empty_inventory(planner):
+    """
+    Test that a tool is planned from raw sources when the inventory is empty.
+    """
+    crafting_plan = planner.plan("iron_pickaxe")
+
+    assert crafting_plan.steps == [
+        PlanStep("chop", "wood", ("tree",)),
+        PlanStep("extract", "iron", ("iron_ore",)),
+        PlanStep("craft", "iron_pickaxe", ("wood", "iron")),
+    ]
+    assert crafting_plan.cost == 3
+
+
+def test_plan_uses_inventory(planner):
+    """
+    Test that items already held are used instead of being gathered again.
+    """
+    crafting_plan = planner.plan("iron_pickaxe", {"wood": 1, "iron": 1})
+
+    assert crafting_plan.steps == [PlanStep("craft", "iron_pickaxe", ("wood", "iron"))]
+    assert crafting_plan.cost == 1
+
+
+def test_plan_quantity_consumes_inventory_once(planner):
+    """
+    Test that planning several items only uses each held item once.
+    """
+    crafting_plan = planner.plan("wood", {"wood": 1}, quantity=3)
+
+    assert crafting_plan.steps == [
+        PlanStep("chop", "wood", ("tree",)),
+        PlanStep("chop", "wood", ("tree",)),
+    ]
+    assert crafting_plan.cost == 2
+
+
+def test_plan_unknown_item(planner):
+    """
+    Test that planning for an item not in the graph returns None.
+    """
+    assert planner.plan("diamond_pickaxe") is None
+
+
+def test_plan_picks_cheapest_option():
+    """
+    Test that the cheapest way to obtain an item is chosen.
+    """
+    graph = nx.DiGraph()
+    graph.add_node("ore", attributes={"type": "raw"})
+    graph.add_node("scrap", attributes={"type": "raw"})
+    graph.add_node("iron", attributes={"type": "resource"})
+    graph.add_edge("ore", "iron", attributes={"action": "smelt"})
+    graph.add_edge("scrap", "iron", attributes={"action": "salvage"})
+    planner = CraftingPlanner(graph, action_costs={"smelt": 5, "salvage": 2})
+
+    crafting_plan = planner.plan("iron")
+
+    assert crafting_plan.steps == [PlanStep("salvage", "iron", ("scrap",))]
+    assert crafting_plan.cost == 2
+
+
+def test_plan_ingredient_quantity_and_uncraftable():
+    """
+    Test ingredient quantities and that an item without any source cannot be planned.
+    """
+    graph = nx.DiGraph()
+    graph.add_node("plank", attributes={"type": "resource"})
+    graph.add_node("table", attributes={"type": "tool"})
+    graph.add_node("relic", attributes={"type": "tool"})
+    graph.add_edge("plank", "table", attributes={"action": "craft", "quantity": 4})
+    planner = CraftingPlanner(graph)
+
+    crafting_plan = planner.plan("table", {"plank": 1})
+
+    assert [step.action for step in crafting_plan.steps] == ["gather"] * 3 + ["craft"]
+    assert crafting_plan.steps[-1].sources == ("plank",) * 4
+    assert crafting_plan.cost == 4
+    assert planner.plan("relic") is None
+
+
+def test_plan_handles_cycles():
+    """
+    Test that a cyclic recipe does not recurse forever.
+    """
+    graph = nx.DiGraph()
+    graph.add_node("egg", attributes={"type": "tool"})
+    graph.add_node("chicken", attributes={"type": "tool"})
+    graph.add_edge("egg", "chicken", attributes={"action": "craft"})
+    graph.add_edge("chicken", "egg", attributes={"action": "craft"})
+    planner = CraftingPlanner(graph)
+
+    assert planner.plan("chicken") is None
+    assert planner.plan("chicken", {"egg": 1}).cost == 1
+
+
+def test_plan_is_memoized_on_relevant_inventory(planner):
+    """
+    Test that inventory items unrelated to the goal do not miss the cache.
+    """
+    first = planner.plan("stone_axe", {"iron": 5})
+    misses = planner.cache_misses
+    second = planner.plan("stone_axe", {"iron": 1, "iron_axe": 2})
+
+    assert second == first
+    assert planner.cache_misses == misses
+    assert planner.cache_hits > 0
+
+    planner.clear_cache()
+    planner.plan("stone_axe")
+    assert planner.cache_misses > misses
+
+
+def test_plan_cache_is_bounded(planner):
+    """
+    Test that the sub-plan cache drops the least recently used entries when full.
+    """
+    bounded = CraftingPlanner(planner.graph, max_cache_entries=3)
+    for count in range(1, 20):
+        bounded.plan("iron_axe", {"wood": count})
+        assert len(bounded._cache) <= 3
+
+    misses = bounded.cache_misses
+    assert bounded.plan("iron_axe", {"wood": 2}) == planner.plan(
+        "iron_axe", {"wood": 2}
+    )
+    assert bounded.cache_misses > misses
+
+
+def test_plan_splits_shared_inventory():
+    """
+    Test that held items go to the ingredient that saves the most, not the first.
+    """
+    graph = nx.DiGraph()
+    for item in ("goal", "a", "b"):
+        graph.add_node(item, attributes={"type": "tool"})
+    graph.add_node("x", attributes={"type": "resource"})
+    graph.add_node("pit", attributes={"type": "raw"})
+    graph.add_edge("a", "goal", attributes={"action": "craft"})
+    graph.add_edge("b", "goal", attributes={"action": "craft"})
+    graph.add_edge("x", "a", attributes={"action": "craft"})
+    graph.add_edge("pit", "a", attributes={"action": "mine", "cost": 2})
+    graph.add_edge("x", "b", attributes={"action": "craft"})
+    graph.add_edge("pit", "x", attributes={"action": "mine", "cost": 10})
+    planner = CraftingPlanner(graph)
+
+    crafting_plan = planner.plan("goal", {"x": 1})
+
+    assert crafting_plan.cost == 4
+    assert crafting_plan.steps == [
+        PlanStep("mine", "a", ("pit",)),
+        PlanStep("craft", "b", ("x",)),
+        PlanStep("craft", "goal", ("a", "b")),
+    ]
@@ -2,11 +2,13 @@
 This module contains unit tests for the GameInterface class.
 """
 
+import io
+import json
 from unittest.mock import patch
 
 import pytest
 
-from game import GameInterface
+from game import GameInterface, main
 
 
 @pytest.fixture
@@ -17,6 +19,21 @@ def game():
     return GameInterface("data/knowledge_graph.json")
 
 
+def test_game_starts_on_sharded_graph(tmp_path, capsys):
+    """
+    Test that the game starts on a tier-sharded graph without loading any shard.
+    """
+    from knowledge_graph_shards import shard_knowledge_graph
+
+    game = GameInterface(shard_knowledge_graph("data/knowledge_graph.json", tmp_path))
+    game.display_available_resources()
+    assert game.collect("wood")
+    assert game.resource_manager.graph.loaded_shards == []
+
+    game.execute_command("craft stone_axe")
+    assert game.resource_manager.graph.loaded_shards == ["1"]
+
+
 def test_game_interface_initialization(game):
     """
     Test the initialization of the GameInterface.
@@ -112,3 +129,109 @@ def test_run_game_interface_invalid_gather_input(_mock_input, game, capsys):
     game.run()
     captured = capsys.readouterr()
     assert "Invalid input. Please enter a number." in captured.out
+
+
+def test_execute_command(game):
+    """
+    Test executing single batch commands.
+    """
+    resources = game.execute_command("resources")["resources"]
+    gathered = game.execute_command(f"gather {resources[0]}")
+
+    assert gathered == {"command": "gather", "ok": True, "resource": resources[0]}
+    assert game.execute_command("gather 1")["ok"]
+    assert game.execute_command("inventory")["inventory"] == game.inventory
+    assert sum(game.inventory.values()) == 2
+    assert game.execute_command("gather 100") == {
+        "command": "gather",
+        "ok": False,
+        "error": "invalid choice",
+    }
+    assert not game.execute_command("gather diamond")["ok"]
+    assert game.execute_command("dance")["error"] == "unknown command"
+
+
+def test_execute_gather_nearest_command(game):
+    """
+    Test gathering the nearest node of a resource in the world as a batch command.
+    """
+    game.resource_manager.resource_nodes = ["wood"]
+    gathered = game.execute_command("gather nearest wood 3 -4.5")
+
+    assert gathered["ok"] and gathered["resource"] == "wood"
+    assert len(gathered["position"]) == 2
+    assert game.inventory == {"wood": 1}
+    assert not game.execute_command("gather nearest wood 3 -4.5")["ok"]
+    for line in [
+        "gather nearest",
+        "gather nearest wood",
+        "gather nearest wood 1 north",
+        "gather nearest wood 0 inf",
+    ]:
+        assert game.execute_command(line)["error"].startswith("expected gather nearest")
+
+
+def test_run_script(game):
+    """
+    Test running a command stream with machine-readable output and no menu.
+    """
+    commands = io.StringIO(
+        "# warm up\nresources\n\ngather 1\ninventory\nquit\nresources\n"
+    )
+    output = io.StringIO()
+
+    executed = game.run_script(commands, output)
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert executed == 3
+    assert [result["command"] for result in results] == [
+        "resources",
+        "gather",
+        "inventory",
+    ]
+    assert results[2]["inventory"] == {results[1]["resource"]: 1}
+    assert "Enter your choice" not in output.getvalue()
+
+
+def test_run_script_flushes_large_batches(game, monkeypatch):
+    """
+    Test that long runs write every result line across several buffer flushes.
+    """
+    monkeypatch.setattr("game.BATCH_FLUSH_LINES", 10)
+    output = io.StringIO()
+
+    executed = game.run_script(["inventory"] * 25, output)
+
+    assert executed == 25
+    assert len(output.getvalue().splitlines()) == 25
+
+
+def test_main_runs_script(tmp_path, capsys):
+    """
+    Test the command line entry point in batch mode.
+    """
+    script = tmp_path / "commands.txt"
+    script.write_text("gather 1\ninventory\n")
+
+    main(["--script", str(script)])
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[1])["command"] == "inventory"
+
+
+def test_craft(game):
+    """
+    Test crafting consumes the recipe's ingredients from the inventory.
+    """
+    game.inventory = {"wood": 2, "stone": 1}
+
+    assert game.craft("stone_axe")
+    assert game.inventory == {"wood": 1, "stone_axe": 1}
+    assert not game.craft("stone_pickaxe")
+    assert not game.craft("wood")
+    assert game.execute_command("craft diamond") == {
+        "command": "craft",
+        "ok": False,
+        "item": "diamond",
+    }
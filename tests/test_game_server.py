@@ -0,0 +1,353 @@
+"""
+This module contains unit tests for the GameServer class.
+
+It tests the batched HTTP API, keep-alive connections and WebSocket pool pushes
+against a server running on localhost.
+"""
+
+import base64
+import http.client
+import json
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from game import GameInterface
+from game_server import (
+    CLOSE_PROTOCOL_ERROR,
+    CLOSE_TOO_BIG,
+    MAX_MESSAGE_SIZE,
+    OPCODE_CLOSE,
+    OPCODE_CONTINUATION,
+    OPCODE_PING,
+    OPCODE_PONG,
+    OPCODE_TEXT,
+    GameServer,
+    _encode_frame,
+    _read_frame,
+)
+from regeneration import RegenerationScheduler
+
+
+@pytest.fixture
+def server():
+    """
+    Fixture to run a GameServer on a free localhost port.
+
+    Yields:
+        GameServer: The running server, shut down after the test.
+    """
+    game_server = start_server(GameInterface("data/knowledge_graph.json"))
+    yield game_server
+    game_server.shutdown()
+    game_server.server_close()
+
+
+def start_server(game):
+    """Serve a game on a free localhost port from a background thread."""
+    game_server = GameServer(game)
+    thread = threading.Thread(
+        target=game_server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    return game_server
+
+
+def post_commands(connection, commands):
+    """Send a command batch over an open HTTP connection and decode the reply."""
+    connection.request(
+        "POST",
+        "/commands",
+        body=json.dumps({"commands": commands}),
+        headers={"Content-Type": "application/json"},
+    )
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+class WebSocketClient:
+    """A minimal WebSocket client for talking to the test server."""
+
+    def __init__(self, port, origin=None):
+        self.sock = socket.create_connection(("127.0.0.1", port))
+        key = base64.b64encode(os.urandom(16)).decode()
+        origin_header = f"Origin: {origin}\r\n" if origin else ""
+        self.sock.sendall(
+            (
+                "GET /ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n"
+                f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n"
+                f"{origin_header}Sec-WebSocket-Version: 13\r\n\r\n"
+            ).encode()
+        )
+        self.rfile = self.sock.makefile("rb")
+        self.status_line = self.rfile.readline()
+        while self.rfile.readline() not in (b"\r\n", b""):
+            pass
+
+    def send(self, payload, opcode=OPCODE_TEXT, fin=True):
+        frame = bytearray(_encode_frame(payload, opcode, mask=os.urandom(4)))
+        if not fin:
+            frame[0] &= 0x7F
+        self.sock.sendall(frame)
+
+    def receive(self):
+        _, opcode, payload = _read_frame(self.rfile, require_mask=False)
+        return opcode, payload
+
+    def receive_json(self):
+        return json.loads(self.receive()[1])
+
+    def close(self):
+        self.send(b"", OPCODE_CLOSE)
+        self.receive()
+        self.rfile.close()
+        self.sock.close()
+
+
+def test_server_refuses_non_local_host():
+    """
+    Test that the server only binds to loopback addresses.
+    """
+    with pytest.raises(ValueError):
+        GameServer(GameInterface("data/knowledge_graph.json"), host="0.0.0.0")
+
+
+def test_batched_commands_over_keep_alive(server):
+    """
+    Test that one connection can run several command batches.
+    """
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+
+    status, body = post_commands(connection, ["gather 1", "gather 1", "inventory"])
+    first_socket = connection.sock
+    connection.request("GET", "/inventory")
+    inventory = json.loads(connection.getresponse().read())
+
+    assert status == 200
+    assert [result["ok"] for result in body["results"]] == [True, True, True]
+    assert sum(body["results"][2]["inventory"].values()) == 2
+    assert inventory["inventory"] == body["results"][2]["inventory"]
+    assert connection.sock is first_socket
+    connection.close()
+
+
+def test_craft_command(server):
+    """
+    Test crafting through the API once the ingredients are in the inventory.
+    """
+    server.game.inventory = {"wood": 1, "iron": 2}
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+
+    _, body = post_commands(connection, ["craft iron_axe", "craft iron_axe"])
+
+    assert [result["ok"] for result in body["results"]] == [True, False]
+    assert server.game.inventory == {"iron": 1, "iron_axe": 1}
+    connection.close()
+
+
+def test_bad_requests(server):
+    """
+    Test that malformed batches and unknown paths are rejected.
+    """
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    connection.request("POST", "/commands", body="not json")
+    response = connection.getresponse()
+    response.read()
+    assert response.status == 400
+
+    connection.request("GET", "/missing")
+    response = connection.getresponse()
+    response.read()
+    assert response.status == 404
+    connection.close()
+
+
+@pytest.mark.parametrize(
+    "body", [{"commands": 5}, {"commands": None}, {"commands": "gather"}, [1]]
+)
+def test_command_batches_must_be_lists(server, body):
+    """
+    Test that batches whose commands are not a list are rejected over HTTP and WebSocket.
+    """
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    connection.request("POST", "/commands", body=json.dumps(body))
+    response = connection.getresponse()
+    response.read()
+    client = WebSocketClient(server.server_address[1])
+    client.send(json.dumps(body).encode())
+
+    assert response.status == 400
+    assert "error" in client.receive_json()
+    assert server.game.inventory == {}
+    connection.close()
+    client.close()
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {"Origin": "http://evil.example"},
+        {"Origin": "null"},
+        {"Host": "evil.example:80"},
+    ],
+)
+def test_non_local_requests_are_refused(server, headers):
+    """
+    Test that requests from other origins or for other hosts are refused.
+    """
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    connection.request(
+        "POST",
+        "/commands",
+        body=json.dumps({"commands": ["gather 1"]}),
+        headers=headers,
+    )
+    response = connection.getresponse()
+    response.read()
+
+    assert response.status == 403
+    assert server.game.inventory == {}
+    connection.close()
+
+
+def test_websocket_checks_origin(server):
+    """
+    Test that a WebSocket upgrade is only accepted from a local origin.
+    """
+    refused = WebSocketClient(server.server_address[1], origin="http://evil.example")
+    accepted = WebSocketClient(server.server_address[1], origin="http://localhost:3000")
+
+    assert b"403" in refused.status_line
+    assert b"101" in accepted.status_line
+    refused.sock.close()
+    accepted.close()
+
+
+def test_websocket_fragmented_message(server):
+    """
+    Test that a fragmented message is joined, with a ping answered in between.
+    """
+    client = WebSocketClient(server.server_address[1])
+    message = json.dumps({"commands": ["inventory"]}).encode()
+
+    client.send(message[:5], fin=False)
+    client.send(b"mid", OPCODE_PING)
+    client.send(message[5:], OPCODE_CONTINUATION)
+
+    assert client.receive() == (OPCODE_PONG, b"mid")
+    assert client.receive_json()["results"][0]["command"] == "inventory"
+    client.close()
+
+
+@pytest.mark.parametrize(
+    "frame, code",
+    [
+        (_encode_frame(b'{"commands": []}')[:2], CLOSE_PROTOCOL_ERROR),
+        (_encode_frame(b"x", OPCODE_CONTINUATION, mask=b"abcd"), CLOSE_PROTOCOL_ERROR),
+        # Only the header is sent, declaring a payload over the limit
+        (
+            _encode_frame(b"x" * (MAX_MESSAGE_SIZE + 1), mask=b"abcd")[:14],
+            CLOSE_TOO_BIG,
+        ),
+    ],
+)
+def test_websocket_protocol_errors_close(server, frame, code):
+    """
+    Test that unmasked, out of place or oversized frames close the connection.
+    """
+    client = WebSocketClient(server.server_address[1])
+    client.sock.sendall(frame)
+
+    opcode, payload = client.receive()
+
+    assert opcode == OPCODE_CLOSE
+    assert int.from_bytes(payload[:2], "big") == code
+    client.rfile.close()
+    client.sock.close()
+
+
+def test_websocket_pushes_pool_changes(server):
+    """
+    Test that WebSocket subscribers see pool changes made over HTTP.
+    """
+    client = WebSocketClient(server.server_address[1])
+    assert b"101" in client.status_line
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+
+    post_commands(connection, ["gather 1"])
+    first = client.receive_json()
+    _, body = post_commands(connection, ["gather 1"])
+    event = client.receive_json()
+
+    assert event["event"] == "pool"
+    assert event["sequence"] > first["sequence"]
+    assert (
+        event["resources"]
+        == server.game.resource_manager.get_available_resource_nodes()
+    )
+    assert body["results"][0]["ok"]
+    connection.close()
+    client.close()
+
+
+def test_websocket_pushes_respawns(clock):
+    """
+    Test that WebSocket subscribers see resources respawn without any batch.
+    """
+    game = GameInterface("data/knowledge_graph.json")
+    manager = game.resource_manager
+    manager.regeneration = RegenerationScheduler(manager.regeneration.intervals, clock)
+    manager.resource_nodes = []
+    game_server = start_server(game)
+    try:
+        client = WebSocketClient(game_server.server_address[1])
+        clock.advance(30)
+        event = client.receive_json()
+
+        assert event["event"] == "pool"
+        assert event["resources"] == ["wood"]
+        client.close()
+    finally:
+        game_server.shutdown()
+        game_server.server_close()
+
+
+def test_websocket_command_batches(server):
+    """
+    Test running a batch over the WebSocket and answering pings.
+    """
+    client = WebSocketClient(server.server_address[1])
+
+    client.send(json.dumps({"commands": ["inventory", "resources"]}).encode())
+    reply = client.receive_json()
+    client.send(b"hello", OPCODE_PING)
+    opcode, payload = client.receive()
+
+    assert [result["command"] for result in reply["results"]] == [
+        "inventory",
+        "resources",
+    ]
+    assert (opcode, payload) == (OPCODE_PONG, b"hello")
+    client.close()
+
+
+def test_many_concurrent_connections(server):
+    """
+    Test that concurrent clients never gather more than the pool holds.
+    """
+    pool_size = len(server.game.resource_manager.get_available_resource_nodes())
+
+    def gather_all():
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+        _, body = post_commands(connection, ["gather 1"] * 5)
+        connection.close()
+        return sum(result["ok"] for result in body["results"])
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        gathered = sum(executor.map(lambda _: gather_all(), range(16)))
+
+    assert gathered == pool_size
+    assert sum(server.game.inventory.values()) == pool_size
@@ -0,0 +1,201 @@
+"""
+This module contains unit tests for the graph_core module.
+
+It tests that the compact KnowledgeGraph matches the NetworkX graph built from
+the same data, its typed attribute storage and its NetworkX adapter.
+"""
+
+import json
+import subprocess
+import sys
+
+import networkx as nx
+import pytest
+
+from graph_core import KnowledgeGraph, as_networkx
+from graph_query import query_edges, query_nodes
+from knowledge_graph_parser import load_knowledge_graph, parse_knowledge_graph
+
+GRAPH_PATH = "data/knowledge_graph.json"
+
+
+@pytest.fixture
+def graph():
+    """
+    Fixture to load the game's knowledge graph into a KnowledgeGraph.
+
+    Returns:
+        KnowledgeGraph: The loaded knowledge graph.
+    """
+    return load_knowledge_graph(GRAPH_PATH)
+
+
+def assert_same_graph(graph, nx_graph):
+    """Check that a KnowledgeGraph holds exactly the data of a NetworkX graph."""
+    assert list(graph.nodes()) == list(nx_graph.nodes())
+    assert list(graph.edges()) == list(nx_graph.edges())
+    for node, data in nx_graph.nodes(data=True):
+        assert graph.nodes[node]["attributes"] == data.get("attributes", {})
+        assert set(graph.successors(node)) == set(nx_graph.successors(node))
+        assert set(graph.predecessors(node)) == set(nx_graph.predecessors(node))
+        assert set(graph.in_edges(node)) == set(nx_graph.in_edges(node))
+    for source, target, data in graph.edges(data=True):
+        assert data["attributes"] == nx_graph.edges[source, target]["attributes"]
+
+
+def test_matches_networkx(graph):
+    """
+    Test that loading without NetworkX gives the same graph as parsing with it.
+    """
+    assert isinstance(graph, KnowledgeGraph)
+    assert_same_graph(graph, parse_knowledge_graph(GRAPH_PATH))
+    assert graph.number_of_nodes() == len(graph) == 10
+    assert graph.number_of_edges() == len(graph.edges) == 11
+    assert "wood" in graph and "gold" not in graph
+    assert graph.has_edge("tree", "wood") and not graph.has_edge("wood", "tree")
+    assert ("tree", "wood") in graph.edges
+
+
+def test_duplicates_and_implicit_nodes(tmp_path):
+    """
+    Test that repeated records and nodes only named by edges behave as in NetworkX.
+    """
+    data = {
+        "nodes": [
+            {"id": "a", "attributes": {"type": "raw"}},
+            {"id": "b"},
+            {"id": "a", "attributes": {"type": "resource", "tier": 2}},
+        ],
+        "edges": [
+            {"source": "a", "target": "b", "attributes": {"action": "chop"}},
+            {"source": "b", "target": "c", "attributes": {"action": "craft"}},
+            {"source": "a", "target": "b", "attributes": {"action": "mine"}},
+            {"source": "d", "target": "a"},
+        ],
+    }
+    path = tmp_path / "graph.json"
+    path.write_text(json.dumps(data))
+
+    graph = load_knowledge_graph(path)
+
+    assert_same_graph(graph, parse_knowledge_graph(path))
+    assert graph.nodes["c"]["attributes"] == {}
+    assert graph.edges["a", "b"]["attributes"] == {"action": "mine"}
+
+
+def test_typed_attribute_columns(graph):
+    """
+    Test that attributes are stored in typed, shared columns.
+    """
+    tier = graph._node_columns["tier"]
+    node_type = graph._node_columns["type"]
+
+    assert tier.values.typecode == "q"
+    assert node_type.values.typecode == "B"
+    assert node_type.categories[1:] == ["resource", "raw", "tool"]
+    assert graph.nodes["wood"]["attributes"]["type"] is sys.intern("resource")
+    assert "regen_interval" not in graph.nodes["tree"]["attributes"]
+
+
+def test_oversized_ints_stay_in_a_list():
+    """
+    Test that whole numbers beyond 64 bits are kept instead of overflowing.
+    """
+    graph = KnowledgeGraph.from_records(
+        [
+            {"id": "a", "attributes": {"seed": 2**70}},
+            {"id": "b", "attributes": {"seed": 1}},
+        ]
+    )
+
+    assert isinstance(graph._node_columns["seed"].values, list)
+    assert graph.nodes["a"]["attributes"]["seed"] == 2**70
+
+
+def test_node_groups(graph):
+    """
+    Test grouping nodes by an attribute straight from its column.
+    """
+    assert graph.node_groups("type")["raw"] == {"tree", "rock", "iron_ore"}
+    assert graph.node_groups("regen_interval") == {
+        30: {"wood"},
+        45: {"stone"},
+        90: {"iron"},
+    }
+    assert graph.node_groups("missing") == {}
+
+
+def test_attributes_are_read_only(graph):
+    """
+    Test that attribute views can be read like dicts but not changed.
+    """
+    attributes = graph.nodes["wood"]["attributes"]
+
+    assert attributes.get("max_nodes") == 6
+    assert attributes.get("missing", "default") == "default"
+    assert dict(attributes) == {
+        "type": "resource",
+        "tier": 1,
+        "regen_interval": 30,
+        "max_nodes": 6,
+    }
+    with pytest.raises(KeyError):
+        graph.nodes["tree"]["attributes"]["max_nodes"]
+    with pytest.raises(TypeError):
+        attributes["tier"] = 3
+    with pytest.raises(TypeError):
+        graph.add_edge("wood", "stone", attributes={})
+
+
+def test_missing_lookups(graph):
+    """
+    Test lookups of nodes and edges that are not in the graph.
+    """
+    with pytest.raises(KeyError):
+        graph.nodes["gold"]
+    with pytest.raises(KeyError):
+        graph.edges["wood", "tree"]
+
+
+def test_networkx_adapter(graph):
+    """
+    Test converting to NetworkX for the renderers.
+    """
+    nx_graph = as_networkx(graph)
+
+    assert isinstance(nx_graph, nx.DiGraph)
+    assert_same_graph(graph, nx_graph)
+    assert as_networkx(nx_graph) is nx_graph
+
+
+def test_queries_on_knowledge_graph(graph):
+    """
+    Test that the attribute query index works on a KnowledgeGraph.
+    """
+    assert query_nodes(graph, "type=tool AND tier<=1") == [
+        "stone_axe",
+        "stone_pickaxe",
+    ]
+    assert set(query_edges(graph, "action=craft", target="iron_axe")) == {
+        ("wood", "iron_axe"),
+        ("iron", "iron_axe"),
+    }
+
+
+def test_game_runtime_does_not_import_networkx():
+    """
+    Test that starting the game does not pull in NetworkX.
+    """
+    code = (
+        "import sys; from game import GameInterface; "
+        "GameInterface('data/knowledge_graph.json'); "
+        "print('networkx' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        env={"PYTHONPATH": "src"},
+        check=True,
+    )
+    assert result.stdout.strip() == "False"
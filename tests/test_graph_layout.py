@@ -0,0 +1,142 @@
+"""
+This module contains unit tests for the graph_layout module.
+
+It tests the multilevel force-directed layout, its Barnes-Hut style
+repulsion and the hierarchical crafting-depth layout.
+"""
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from graph_layout import (
+    _exact_repulsion,
+    _grid_repulsion,
+    crafting_depth,
+    force_directed_layout,
+    hierarchical_layout,
+)
+from knowledge_graph_parser import load_knowledge_graph, parse_knowledge_graph
+
+
+@pytest.fixture
+def graph():
+    """
+    Fixture to load the game's knowledge graph.
+
+    Returns:
+        KnowledgeGraph: The loaded knowledge graph.
+    """
+    return load_knowledge_graph("data/knowledge_graph.json")
+
+
+def assert_valid_layout(pos, nodes):
+    """Check that a layout places every node at a finite point in [-1, 1]."""
+    assert set(pos) == set(nodes)
+    coordinates = np.array(list(pos.values()))
+    assert coordinates.shape == (len(nodes), 2)
+    assert np.isfinite(coordinates).all()
+    assert np.abs(coordinates).max() <= 1 + 1e-9
+
+
+def test_force_directed_layout(graph):
+    """
+    Test laying out the game's graph, from either graph type, deterministically.
+    """
+    pos = force_directed_layout(graph)
+
+    assert_valid_layout(pos, list(graph.nodes()))
+    assert len({tuple(point.round(6)) for point in pos.values()}) == len(pos)
+    nx_pos = force_directed_layout(parse_knowledge_graph("data/knowledge_graph.json"))
+    for node, point in pos.items():
+        assert np.allclose(nx_pos[node], point)
+
+
+@pytest.mark.parametrize("nodes", [[], ["only"]])
+def test_trivial_layouts(nodes):
+    """
+    Test graphs with no nodes or a single node.
+    """
+    nx_graph = nx.DiGraph()
+    nx_graph.add_nodes_from(nodes)
+
+    assert {n: list(p) for n, p in force_directed_layout(nx_graph).items()} == {
+        n: [0.0, 0.0] for n in nodes
+    }
+    assert set(hierarchical_layout(nx_graph)) == set(nodes)
+
+
+def test_layout_keeps_neighbours_close():
+    """
+    Test that a large grid graph, laid out through every coarsening level,
+    keeps neighbours much closer together than nodes in general.
+    """
+    nx_graph = nx.convert_node_labels_to_integers(nx.grid_2d_graph(40, 40))
+    pos = force_directed_layout(nx_graph)
+    coordinates = np.array([pos[node] for node in nx_graph.nodes()])
+    edges = np.array(list(nx_graph.edges()))
+
+    edge_lengths = np.linalg.norm(
+        coordinates[edges[:, 0]] - coordinates[edges[:, 1]], axis=1
+    )
+    rng = np.random.default_rng(0)
+    pairs = rng.integers(0, len(coordinates), size=(2000, 2))
+    pair_lengths = np.linalg.norm(
+        coordinates[pairs[:, 0]] - coordinates[pairs[:, 1]], axis=1
+    )
+
+    assert_valid_layout(pos, list(nx_graph.nodes()))
+    assert np.median(edge_lengths) < np.median(pair_lengths) / 10
+
+
+def test_grid_repulsion_approximates_exact():
+    """
+    Test that the grid pyramid stays close to exact pairwise repulsion.
+    """
+    rng = np.random.default_rng(1)
+    pos = rng.random((2000, 2)) * 50
+    mass = rng.integers(1, 4, size=2000).astype(float)
+
+    approximate = _grid_repulsion(pos, mass, 1.0)
+    exact = _exact_repulsion(pos, mass, 1.0)
+
+    error = np.linalg.norm(approximate - exact, axis=1)
+    assert np.median(error) < 0.1 * np.median(np.linalg.norm(exact, axis=1))
+
+
+def test_crafting_depth(graph):
+    """
+    Test that recipe graphs rank as raw, then resource, then tool.
+    """
+    depths = crafting_depth(graph)
+    expected = {"raw": 0, "resource": 1, "tool": 2}
+
+    for node, depth in depths.items():
+        assert depth == expected[graph.nodes[node]["attributes"]["type"]]
+
+
+def test_crafting_depth_breaks_cycles():
+    """
+    Test that cycles and self-loops are ranked instead of left out.
+    """
+    nx_graph = nx.DiGraph([("a", "b"), ("b", "c"), ("c", "b"), ("c", "d"), ("d", "d")])
+
+    assert crafting_depth(nx_graph) == {"a": 0, "b": 1, "c": 2, "d": 3}
+
+
+def test_hierarchical_layout(graph):
+    """
+    Test that nodes are placed in columns by depth and spread within them.
+    """
+    pos = hierarchical_layout(graph)
+    depths = crafting_depth(graph)
+
+    assert_valid_layout(pos, list(graph.nodes()))
+    for node, (x, _) in pos.items():
+        assert x == pytest.approx(depths[node] - 1)
+    for depth in (0, 1, 2):
+        column = [pos[node][1] for node in pos if depths[node] == depth]
+        assert len(set(column)) == len(column)
+    sources = sorted(["tree", "rock", "iron_ore"], key=lambda node: pos[node][1])
+    products = sorted(["wood", "stone", "iron"], key=lambda node: pos[node][1])
+    assert [next(graph.successors(source)) for source in sources] == products
@@ -0,0 +1,278 @@
+"""
+This module contains unit tests for the graph_query module.
+
+It tests query compilation, index-backed node and edge queries, and result
+invalidation when the graph changes.
+"""
+
+import gc
+import weakref
+
+import networkx as nx
+import pytest
+
+from graph_core import mark_changed
+from graph_query import (
+    Condition,
+    GraphQueryIndex,
+    _indexes,
+    compile_query,
+    query_edges,
+    query_index,
+    query_nodes,
+)
+from knowledge_graph_parser import load_knowledge_graph, parse_knowledge_graph
+from reachability import ReachabilityIndex
+
+
+@pytest.fixture
+def graph():
+    """
+    Fixture to load the game's knowledge graph.
+
+    Returns:
+        nx.DiGraph: The parsed knowledge graph.
+    """
+    return parse_knowledge_graph("data/knowledge_graph.json")
+
+
+@pytest.fixture
+def index(graph):
+    """
+    Fixture to build a GraphQueryIndex over the game's knowledge graph.
+
+    Returns:
+        GraphQueryIndex: The index of the parsed knowledge graph.
+    """
+    return GraphQueryIndex(graph)
+
+
+@pytest.fixture
+def compact():
+    """
+    Fixture to load the game's knowledge graph in its compact runtime form.
+
+    Returns:
+        KnowledgeGraph: The loaded knowledge graph.
+    """
+    return load_knowledge_graph("data/knowledge_graph.json")
+
+
+def scan_nodes(nx_graph, predicate):
+    """Answer a node query with a full scan, for comparison."""
+    return [
+        node
+        for node, data in nx_graph.nodes(data=True)
+        if predicate(data["attributes"])
+    ]
+
+
+def test_compile_query():
+    """
+    Test parsing conditions, operators, value types and AND/OR precedence.
+    """
+    query = compile_query("type=tool AND tier<=2 or name!='3'")
+
+    assert query.clauses == (
+        (Condition("type", "=", "tool"), Condition("tier", "<=", 2)),
+        (Condition("name", "!=", "3"),),
+    )
+    assert compile_query("type=tool AND tier<=2 or name!='3'") is query
+    assert compile_query("weight>1.5 AND rare=true").clauses == (
+        (Condition("weight", ">", 1.5), Condition("rare", "=", True)),
+    )
+
+
+@pytest.mark.parametrize("text", ["", "type", "tier<=", "tier<==2", "AND type=tool"])
+def test_compile_invalid_query(text):
+    """
+    Test that malformed queries are rejected.
+    """
+    with pytest.raises(ValueError):
+        compile_query(text)
+
+
+@pytest.mark.parametrize(
+    "text, predicate",
+    [
+        ("type=tool", lambda a: a.get("type") == "tool"),
+        (
+            "type=tool AND tier<=1",
+            lambda a: a.get("type") == "tool" and a.get("tier") <= 1,
+        ),
+        (
+            "type=raw OR tier>1",
+            lambda a: a.get("type") == "raw" or a.get("tier") > 1,
+        ),
+        ("type!=resource", lambda a: a.get("type") != "resource"),
+        ("max_nodes>=6", lambda a: a.get("max_nodes", 0) >= 6),
+        ("type<tool", lambda a: a.get("type") < "tool"),
+    ],
+)
+def test_node_queries_match_scan(graph, compact, index, text, predicate):
+    """
+    Test that indexed node queries agree with a full scan, in graph order.
+    """
+    assert index.nodes(text) == scan_nodes(graph, predicate)
+    assert GraphQueryIndex(compact).nodes(text) == index.nodes(text)
+
+
+def test_mixed_types_do_not_match_ranges(index):
+    """
+    Test that a numeric range skips values of another type instead of failing.
+    """
+    assert index.nodes("type>=1") == []
+    assert index.nodes("tier>=tool") == []
+
+
+def test_edge_queries(graph, index):
+    """
+    Test edge queries filtered by attributes, source and target.
+    """
+    crafts = index.edges("action=craft")
+
+    assert crafts == [
+        (source, target)
+        for source, target, data in graph.edges(data=True)
+        if data["attributes"]["action"] == "craft"
+    ]
+    assert set(index.edges("action=craft", target="iron_axe")) == set(
+        graph.in_edges("iron_axe")
+    )
+    assert index.edges(source="tree") == [("tree", "wood")]
+    assert index.edges("action=craft", target="wood") == []
+    assert index.edges(target="missing") == []
+
+
+def test_indexes_are_built_separately(index):
+    """
+    Test that node queries and single-node edge queries never index every edge.
+    """
+    index.nodes("type=tool")
+    assert index.edges("action=craft", target="iron_axe")
+    assert index._edge_order is None
+    index.edges("action=craft")
+    assert index._edge_order is not None
+
+
+@pytest.mark.parametrize("load", [parse_knowledge_graph, load_knowledge_graph])
+@pytest.mark.parametrize(
+    "text", [None, "action=craft", "action!=craft", "quantity>=2", "action<m"]
+)
+def test_adjacent_edges_match_index(load, text):
+    """
+    Test that edges at one node are matched as the full edge index would.
+    """
+    nx_graph = load("data/knowledge_graph.json")
+    indexed = GraphQueryIndex(nx_graph)
+    indexed.edges()
+    for node in nx_graph:
+        local = GraphQueryIndex(nx_graph)
+        assert local.edges(text, target=node) == indexed.edges(text, target=node)
+        assert local.edges(text, source=node) == indexed.edges(text, source=node)
+
+
+def test_results_are_memoized(index, mocker):
+    """
+    Test that a repeated query is served without evaluating it again.
+    """
+    evaluate = mocker.spy(index, "_evaluate")
+
+    first = index.nodes("type=tool")
+    first.append("mutated")
+    second = index.nodes(compile_query("type=tool"))
+
+    assert evaluate.call_count == 1
+    assert "mutated" not in second
+
+
+def test_mutation_through_index(graph, index):
+    """
+    Test that changing the graph through the index updates query results.
+    """
+    assert index.nodes("type=tool AND tier<=1") == ["stone_axe", "stone_pickaxe"]
+
+    index.add_node("stone_axe", {"type": "tool", "tier": 3})
+    index.add_edge("gold", "gold_axe", {"action": "craft"})
+    index.remove_edge("wood", "stone_axe")
+
+    assert index.nodes("type=tool AND tier<=1") == ["stone_pickaxe"]
+    assert index.edges("action=craft", target="gold_axe") == [("gold", "gold_axe")]
+    assert ("wood", "stone_axe") not in index.edges("action=craft")
+    assert not graph.has_edge("wood", "stone_axe")
+    assert graph.nodes["stone_axe"]["attributes"]["tier"] == 3
+
+
+def test_external_mutation(graph, index):
+    """
+    Test that adding nodes directly is noticed and in-place edits need invalidate.
+    """
+    index.nodes("type=tool")
+    graph.add_node("bow", attributes={"type": "tool"})
+    assert index.nodes("type=tool")[-1] == "bow"
+
+    graph.nodes["bow"]["attributes"]["type"] = "weapon"
+    assert "bow" in index.nodes("type=tool")
+    index.invalidate()
+    assert "bow" not in index.nodes("type=tool")
+
+
+def test_cached_queries_skip_edge_count(graph, index, mocker):
+    """
+    Test that checking a cached result does not count the graph's edges.
+    """
+    index.nodes("type=tool AND tier<=2")
+    index.edges("action=craft", target="iron_axe")
+    count_edges = mocker.patch.object(graph, "number_of_edges")
+
+    index.nodes("type=tool AND tier<=2")
+    index.edges("action=craft", target="iron_axe")
+    assert count_edges.call_count == 0
+
+
+def test_same_size_mutation(graph, index):
+    """
+    Test that edits which keep the node and edge counts still refresh results.
+    """
+    assert index.edges("action=craft", target="iron_axe") == [
+        ("wood", "iron_axe"),
+        ("iron", "iron_axe"),
+    ]
+
+    reachability = ReachabilityIndex(graph)
+    reachability.remove_edge("wood", "iron_axe")
+    reachability.add_edge("stone", "iron_axe", {"action": "craft"})
+    assert set(index.edges("action=craft", target="iron_axe")) == {
+        ("iron", "iron_axe"),
+        ("stone", "iron_axe"),
+    }
+
+    graph.remove_edge("stone", "iron_axe")
+    graph.add_edge("tree", "iron_axe", attributes={"action": "craft"})
+    mark_changed(graph)
+    assert ("tree", "iron_axe") in index.edges("action=craft", target="iron_axe")
+
+
+def test_shared_index_does_not_keep_graph_alive():
+    """
+    Test that graphs queried through the helpers are freed once unused.
+    """
+    graphs = [parse_knowledge_graph("data/knowledge_graph.json") for _ in range(5)]
+    for nx_graph in graphs:
+        query_nodes(nx_graph, "type=tool")
+    assert all(nx_graph in _indexes for nx_graph in graphs)
+    references = [weakref.ref(nx_graph) for nx_graph in graphs]
+
+    del graphs, nx_graph
+    gc.collect()
+    assert all(reference() is None for reference in references)
+
+
+def test_shared_index(graph):
+    """
+    Test that the module-level helpers reuse one index per graph.
+    """
+    assert query_index(graph) is query_index(graph)
+    assert query_index(graph) is not query_index(nx.DiGraph())
+    assert query_nodes(graph, "type=raw") == ["tree", "rock", "iron_ore"]
+    assert query_edges(graph, "action=mine") == query_index(graph).edges("action=mine")
@@ -4,11 +4,14 @@ This module contains unit tests for the knowledge_graph_parser module.
 It tests the functionality of parsing knowledge graphs and retrieving available resources and tools.
 """
 
+import copy
 import json
+import pickle
 
 import networkx as nx
 import pytest
 
+from graph_core import AttributeInterner
 from knowledge_graph_parser import get_available_resources, parse_knowledge_graph
 
 
@@ -150,3 +153,66 @@ def test_get_available_resources_error_handling(mocker):
 
     resources_and_tools = get_available_resources(mock_graph)
     assert resources_and_tools == []
+
+
+def test_parsed_attributes_are_shared_and_read_only(test_graph_json):
+    """
+    Test that equal attribute dicts are stored once and cannot be changed.
+
+    This test ensures that copies of the graph keep sharing the attributes.
+    """
+    graph = parse_knowledge_graph(test_graph_json)
+    wood = graph.nodes["wood"]["attributes"]
+
+    assert wood is graph.nodes["stone"]["attributes"]
+    assert wood is not graph.nodes["tree"]["attributes"]
+    assert (
+        graph["wood"]["stone_axe"]["attributes"]
+        is (graph["stone"]["stone_axe"]["attributes"])
+    )
+    assert wood == {"type": "resource"}
+    with pytest.raises(TypeError):
+        wood["type"] = "tool"
+    undirected = graph.to_undirected()
+    assert undirected.nodes["wood"]["attributes"] is wood
+    assert copy.deepcopy(wood) is wood
+    assert pickle.loads(pickle.dumps(wood)) == wood
+
+
+def test_parse_knowledge_graph_shared_interner(test_graph_json):
+    """
+    Test that graphs parsed with the same interner share attributes.
+    """
+    interner = AttributeInterner()
+    first = parse_knowledge_graph(test_graph_json, interner)
+    second = parse_knowledge_graph(test_graph_json, interner)
+
+    assert len(interner) == 5
+    assert first.nodes["iron"]["attributes"] is second.nodes["wood"]["attributes"]
+
+
+def test_attribute_interner_unhashable_values():
+    """
+    Test that attributes with unhashable values are frozen without being shared.
+    """
+    interner = AttributeInterner()
+    attributes = {"type": "tool", "uses": ["chop"]}
+
+    frozen = interner.intern(attributes)
+
+    assert frozen == attributes
+    assert interner.intern(attributes) is not frozen
+    assert len(interner) == 0
+
+
+def test_attribute_interner_keeps_value_types_apart():
+    """
+    Test that equal values of different types are not shared, but key order is ignored.
+    """
+    interner = AttributeInterner()
+
+    values = [interner.intern({"tier": value}) for value in (1, True, 1.0)]
+
+    assert [type(frozen["tier"]) for frozen in values] == [int, bool, float]
+    assert len(interner) == 3
+    assert interner.intern({"a": 1, "b": 2}) is interner.intern({"b": 2, "a": 1})
@@ -0,0 +1,257 @@
+"""
+This module contains unit tests for the knowledge_graph_shards module.
+
+It tests splitting a knowledge graph into shards and loading those shards lazily.
+"""
+
+import json
+
+import pytest
+
+from graph_query import query_edges, query_nodes
+from knowledge_graph_shards import (
+    MANIFEST_FILE,
+    ShardedKnowledgeGraph,
+    open_knowledge_graph,
+    shard_knowledge_graph,
+)
+
+
+@pytest.fixture
+def test_graph_json(tmp_path):
+    """
+    Fixture to create a temporary JSON file containing tiered test graph data.
+
+    Returns:
+        Path: Path to the temporary JSON file.
+    """
+    json_data = {
+        "nodes": [
+            {"id": "tree", "attributes": {"type": "raw", "tier": 1}},
+            {"id": "wood", "attributes": {"type": "resource", "tier": 1}},
+            {"id": "iron_ore", "attributes": {"type": "raw", "tier": 2}},
+            {"id": "iron", "attributes": {"type": "resource", "tier": 2}},
+            {"id": "iron_axe", "attributes": {"type": "tool", "tier": 2}},
+            {"id": "mystery", "attributes": {"type": "raw"}},
+        ],
+        "edges": [
+            {"source": "tree", "target": "wood", "attributes": {"action": "chop"}},
+            {
+                "source": "iron_ore",
+                "target": "iron",
+                "attributes": {"action": "extract"},
+            },
+            {"source": "wood", "target": "iron_axe", "attributes": {"action": "craft"}},
+            {"source": "iron", "target": "iron_axe", "attributes": {"action": "craft"}},
+        ],
+    }
+    json_file = tmp_path / "test_graph.json"
+    json_file.write_text(json.dumps(json_data))
+    return json_file
+
+
+@pytest.fixture
+def sharded_graph(test_graph_json, tmp_path):
+    """
+    Fixture to shard the test graph by tier and open it lazily.
+
+    Returns:
+        ShardedKnowledgeGraph: The sharded test graph with no shards loaded.
+    """
+    manifest_path = shard_knowledge_graph(test_graph_json, tmp_path / "shards")
+    return ShardedKnowledgeGraph(manifest_path)
+
+
+def test_shard_knowledge_graph_writes_manifest(test_graph_json, tmp_path):
+    """
+    Test that sharding writes one file per tier and keeps cross-shard edges in the manifest.
+    """
+    manifest_path = shard_knowledge_graph(test_graph_json, tmp_path / "shards")
+    manifest = json.loads((tmp_path / "shards" / MANIFEST_FILE).read_text())
+
+    assert str(manifest_path).endswith(MANIFEST_FILE)
+    assert set(manifest["shards"]) == {"1", "2", "default"}
+    assert manifest["nodes"]["iron_axe"] == "2"
+    assert manifest["nodes"]["mystery"] == "default"
+    assert manifest["edges"] == [
+        {"source": "wood", "target": "iron_axe", "attributes": {"action": "craft"}}
+    ]
+
+
+def test_shard_knowledge_graph_by_namespace(tmp_path):
+    """
+    Test sharding by the namespace prefix of node IDs.
+    """
+    json_file = tmp_path / "namespaced.json"
+    json_file.write_text(
+        json.dumps(
+            {
+                "nodes": [
+                    {"id": "forest:tree", "attributes": {"type": "raw"}},
+                    {"id": "mine:rock", "attributes": {"type": "raw"}},
+                    {"id": "wood", "attributes": {"type": "resource"}},
+                ]
+            }
+        )
+    )
+    shard_knowledge_graph(json_file, tmp_path / "shards", shard_key="namespace")
+    manifest = json.loads((tmp_path / "shards" / MANIFEST_FILE).read_text())
+
+    assert manifest["nodes"] == {
+        "forest:tree": "forest",
+        "mine:rock": "mine",
+        "wood": "default",
+    }
+
+
+def test_shard_knowledge_graph_missing_key(tmp_path):
+    """
+    Test that sharding a file without nodes raises a KeyError.
+    """
+    invalid_json_file = tmp_path / "missing_key.json"
+    invalid_json_file.write_text("{}")
+
+    with pytest.raises(KeyError):
+        shard_knowledge_graph(invalid_json_file, tmp_path / "shards")
+
+
+def test_sharded_graph_loads_nothing_up_front(sharded_graph):
+    """
+    Test that opening a sharded graph and checking node membership loads no shards.
+    """
+    assert sharded_graph.has_node("iron_axe")
+    assert not sharded_graph.has_node("diamond")
+    assert sharded_graph.shard_of("wood") == "1"
+    assert sharded_graph.loaded_shards == []
+
+
+def test_sharded_graph_loads_only_touched_shard(sharded_graph):
+    """
+    Test that a lookup loads only the shard holding the requested node.
+    """
+    assert sharded_graph.node_attributes("wood")["type"] == "resource"
+    assert sharded_graph.successors("tree") == ["wood"]
+    assert sharded_graph.loaded_shards == ["1"]
+
+
+def test_sharded_graph_follows_cross_shard_edges(sharded_graph):
+    """
+    Test that neighbours in other shards are found through the manifest.
+    """
+    assert sorted(sharded_graph.predecessors("iron_axe")) == ["iron", "wood"]
+    assert sharded_graph.successors("wood") == ["iron_axe"]
+    assert sharded_graph.edge_attributes("wood", "iron_axe")["action"] == "craft"
+    assert sharded_graph.edge_attributes("iron_ore", "iron")["action"] == "extract"
+    assert sharded_graph.loaded_shards == ["1", "2"]
+
+
+def test_sharded_graph_to_networkx(sharded_graph, test_graph_json):
+    """
+    Test that merging all shards reproduces the original graph.
+    """
+    merged = sharded_graph.to_networkx()
+
+    assert merged.number_of_nodes() == 6
+    assert merged.number_of_edges() == 4
+    assert merged["wood"]["iron_axe"]["attributes"]["action"] == "craft"
+    assert sharded_graph.loaded_shards == ["1", "2", "default"]
+
+
+def test_shard_knowledge_graph_implicit_nodes_and_file_names(tmp_path):
+    """
+    Test that edge-only nodes are placed and unsafe shard names stay in the directory.
+    """
+    json_file = tmp_path / "unsafe.json"
+    json_file.write_text(
+        json.dumps(
+            {
+                "nodes": [
+                    {"id": "a", "attributes": {"tier": "../escape"}},
+                    {"id": "b", "attributes": {"tier": "./escape"}},
+                ],
+                "edges": [{"source": "a", "target": "ghost"}],
+            }
+        )
+    )
+    shard_knowledge_graph(json_file, tmp_path / "shards")
+    manifest = json.loads((tmp_path / "shards" / MANIFEST_FILE).read_text())
+
+    assert manifest["nodes"]["ghost"] == "default"
+    assert sorted(manifest["shards"].values()) == [
+        "tier__escape.json",
+        "tier__escape_2.json",
+        "tier_default.json",
+    ]
+    assert not (tmp_path / "escape.json").exists()
+    graph = ShardedKnowledgeGraph(tmp_path / "shards")
+    assert graph.successors("a") == ["ghost"]
+    assert graph.nodes["ghost"]["attributes"] == {}
+
+
+def test_sharded_graph_runtime_api(sharded_graph, test_graph_json):
+    """
+    Test the NetworkX-shaped lookups the game runtime uses.
+    """
+    flat = open_knowledge_graph(str(test_graph_json))
+
+    assert "wood" in sharded_graph and "diamond" not in sharded_graph
+    assert list(sharded_graph) == list(flat)
+    assert sharded_graph.number_of_edges() == flat.number_of_edges()
+    assert sharded_graph.loaded_shards == []
+
+    assert sharded_graph.nodes["iron"]["attributes"]["type"] == "resource"
+    assert sorted(sharded_graph.in_edges("iron_axe")) == [
+        ("iron", "iron_axe"),
+        ("wood", "iron_axe"),
+    ]
+    assert sharded_graph.edges["wood", "iron_axe"]["attributes"]["action"] == "craft"
+    assert sharded_graph.has_edge("wood", "iron_axe")
+    assert not sharded_graph.has_edge("iron_axe", "wood")
+    assert sorted(sharded_graph.edges()) == sorted(flat.edges())
+    assert dict(sharded_graph.nodes(data=True))["mystery"]["attributes"] == {
+        "type": "raw"
+    }
+    with pytest.raises(TypeError):
+        sharded_graph.add_edge("wood", "iron")
+
+
+def test_sharded_graph_queries_load_lazily(sharded_graph):
+    """
+    Test that queries by the shard key, or at one node, only load what they reach.
+    """
+    assert query_nodes(sharded_graph, "tier=2") == ["iron_ore", "iron", "iron_axe"]
+    assert sharded_graph.loaded_shards == []
+
+    assert query_edges(sharded_graph, "action=craft", target="iron_axe") == [
+        ("wood", "iron_axe"),
+        ("iron", "iron_axe"),
+    ]
+    assert sharded_graph.loaded_shards == ["2"]
+
+    assert query_nodes(sharded_graph, "type=raw") == ["tree", "iron_ore", "mystery"]
+    assert sharded_graph.loaded_shards == ["2"]
+
+
+def test_sharded_graph_groups_keys_in_manifest(test_graph_json, tmp_path):
+    """
+    Test that keys grouped in the manifest need no shard and other keys load them all.
+    """
+    manifest_path = shard_knowledge_graph(
+        test_graph_json, tmp_path / "shards", group_keys=("type",)
+    )
+    manifest = json.loads((tmp_path / "shards" / MANIFEST_FILE).read_text())
+    assert ["resource", ["wood", "iron"]] in manifest["groups"]["type"]
+
+    graph = ShardedKnowledgeGraph(manifest_path)
+    assert graph.node_groups("type")["resource"] == {"wood", "iron"}
+    assert graph.loaded_shards == []
+    assert graph.node_groups("regen_interval") == {}
+    assert graph.loaded_shards == ["1", "2", "default"]
+
+
+def test_sharded_graph_missing_manifest(tmp_path):
+    """
+    Test that opening a directory without a manifest raises a FileNotFoundError.
+    """
+    with pytest.raises(FileNotFoundError):
+        ShardedKnowledgeGraph(str(tmp_path))
@@ -0,0 +1,235 @@
+"""
+This module contains unit tests for the reachability module.
+
+It tests the precomputed closure, its incremental updates and subgraph selection.
+"""
+
+import gc
+import itertools
+import weakref
+
+import networkx as nx
+import pytest
+
+from graph_core import mark_changed
+from knowledge_graph_parser import load_knowledge_graph, parse_knowledge_graph
+from reachability import ReachabilityIndex, reachability_index, select_subgraph
+
+
+@pytest.fixture
+def graph():
+    """
+    Fixture to load the game's knowledge graph.
+
+    Returns:
+        nx.DiGraph: The parsed knowledge graph.
+    """
+    return parse_knowledge_graph("data/knowledge_graph.json")
+
+
+@pytest.fixture
+def index(graph):
+    """
+    Fixture to build a ReachabilityIndex over the game's knowledge graph.
+
+    Returns:
+        ReachabilityIndex: The index of the parsed knowledge graph.
+    """
+    return ReachabilityIndex(graph)
+
+
+def assert_matches_networkx(index, nx_graph):
+    """Check every closure in the index against a fresh NetworkX traversal."""
+    for node in nx_graph.nodes():
+        expected = nx.descendants(nx_graph, node)
+        if _on_cycle(nx_graph, node):
+            expected.add(node)
+        assert index.descendants(node) == expected
+        assert index.ancestors(node) == {
+            other for other in nx_graph.nodes() if node in index.descendants(other)
+        }
+
+
+def _on_cycle(nx_graph, node):
+    """Check whether a node lies on a cycle and so reaches itself."""
+    return any(
+        nx.has_path(nx_graph, successor, node)
+        for successor in nx_graph.successors(node)
+    )
+
+
+def test_descendants(index):
+    """
+    Test which items a raw source can eventually produce.
+    """
+    assert index.descendants("iron_ore") == {"iron", "iron_axe", "iron_pickaxe"}
+    assert index.descendants("iron_ore", node_type="tool") == {
+        "iron_axe",
+        "iron_pickaxe",
+    }
+    assert index.descendants("iron_pickaxe") == set()
+
+
+def test_ancestors(index):
+    """
+    Test which raw sources a tool ultimately depends on.
+    """
+    assert index.ancestors("iron_axe", node_type="raw") == {"tree", "iron_ore"}
+    assert index.ancestors("iron_axe") == {"tree", "iron_ore", "wood", "iron"}
+    assert index.ancestors("iron_axe", node_type="missing") == set()
+
+
+def test_can_reach(index):
+    """
+    Test single pair reachability checks.
+    """
+    assert index.can_reach("tree", "iron_pickaxe")
+    assert not index.can_reach("rock", "iron_pickaxe")
+    assert not index.can_reach("wood", "wood")
+    with pytest.raises(KeyError):
+        index.can_reach("diamond", "wood")
+
+
+def test_matches_networkx(graph, index):
+    """
+    Test that every closure matches a NetworkX traversal.
+    """
+    assert_matches_networkx(index, graph)
+
+
+def test_cycles():
+    """
+    Test that nodes on a cycle reach themselves and each other.
+    """
+    cyclic = nx.DiGraph()
+    cyclic.add_edges_from([("a", "b"), ("b", "c"), ("c", "a"), ("c", "d")])
+    index = ReachabilityIndex(cyclic)
+
+    assert index.descendants("b") == {"a", "b", "c", "d"}
+    assert index.ancestors("d") == {"a", "b", "c"}
+    assert index.can_reach("a", "a")
+    assert not index.can_reach("d", "d")
+
+
+def test_add_edge(graph, index):
+    """
+    Test that adding an edge extends only the affected closures.
+    """
+    index.add_edge("iron_axe", "gold", {"action": "craft"})
+
+    assert graph.has_edge("iron_axe", "gold")
+    assert "gold" in index.descendants("iron_ore")
+    assert "gold" in index.descendants("tree")
+    assert "gold" not in index.descendants("rock")
+    assert index.ancestors("gold", node_type="raw") == {"tree", "iron_ore"}
+    assert_matches_networkx(index, graph)
+
+
+def test_remove_edge(graph, index):
+    """
+    Test that removing an edge shrinks only the affected closures.
+    """
+    index.remove_edge("wood", "iron_axe")
+
+    assert "iron_axe" not in index.descendants("tree")
+    assert "iron_pickaxe" in index.descendants("tree")
+    assert index.ancestors("iron_axe") == {"iron", "iron_ore"}
+    assert_matches_networkx(index, graph)
+
+
+def test_incremental_updates_match_rebuild():
+    """
+    Test a sequence of edge changes, including ones that create and break cycles.
+    """
+    nx_graph = nx.DiGraph()
+    nx_graph.add_nodes_from("abcdef")
+    index = ReachabilityIndex(nx_graph)
+    changes = [("a", "b"), ("b", "c"), ("d", "e"), ("c", "d"), ("e", "b"), ("a", "f")]
+
+    for source, target in changes:
+        index.add_edge(source, target)
+        assert_matches_networkx(index, nx_graph)
+    for source, target in itertools.chain(changes[4:], changes[:4]):
+        index.remove_edge(source, target)
+        assert_matches_networkx(index, nx_graph)
+
+
+def test_select_subgraph(graph, index):
+    """
+    Test selecting the part of the graph related to one item.
+    """
+    subgraph = select_subgraph(graph, "iron", index)
+
+    assert set(subgraph.nodes()) == {"iron_ore", "iron", "iron_axe", "iron_pickaxe"}
+    assert subgraph.has_edge("iron", "iron_axe")
+    assert not subgraph.has_edge("wood", "iron_axe")
+    assert set(select_subgraph(graph, "rock").nodes()) == {
+        "rock",
+        "stone",
+        "stone_axe",
+        "stone_pickaxe",
+    }
+
+
+def test_shared_index_is_reused(graph):
+    """
+    Test that focusing on a graph reuses its index until the graph changes.
+    """
+    index = reachability_index(graph)
+    assert reachability_index(graph) is index
+    select_subgraph(graph, "iron")
+    assert reachability_index(graph) is index
+
+    index.add_edge("wood", "iron_axe")
+    assert reachability_index(graph) is index
+
+    graph.add_edge("rock", "iron_axe", attributes={})
+    mark_changed(graph)
+    rebuilt = reachability_index(graph)
+    assert rebuilt is not index
+    assert rebuilt.can_reach("rock", "iron_axe")
+
+
+def test_shared_index_of_compact_graph():
+    """
+    Test that a compact graph can be indexed and focused on directly.
+    """
+    compact = load_knowledge_graph("data/knowledge_graph.json")
+    index = reachability_index(compact)
+
+    assert reachability_index(compact) is index
+    assert index.ancestors("iron_axe", "raw") == {"iron_ore", "tree"}
+    subgraph = select_subgraph(compact.to_networkx(), "iron", index)
+    assert set(subgraph.nodes()) == {"iron_ore", "iron", "iron_axe", "iron_pickaxe"}
+
+
+def test_index_built_on_load(mocker):
+    """
+    Test that the loaders can build the shared index up front.
+    """
+    graph = load_knowledge_graph("data/knowledge_graph.json", reachability=True)
+    build = mocker.spy(ReachabilityIndex, "__init__")
+    count_edges = mocker.patch.object(graph, "number_of_edges")
+
+    index = reachability_index(graph)
+    assert index.can_reach("iron_ore", "iron_pickaxe")
+    assert build.call_count == 0
+    assert count_edges.call_count == 0
+
+    nx_graph = parse_knowledge_graph("data/knowledge_graph.json", reachability=True)
+    assert build.call_count == 1
+    assert reachability_index(nx_graph).can_reach("iron_ore", "iron_pickaxe")
+    assert build.call_count == 1
+
+
+def test_shared_index_does_not_keep_graph_alive():
+    """
+    Test that caching an index does not keep its graph alive.
+    """
+    nx_graph = parse_knowledge_graph("data/knowledge_graph.json")
+    reachability_index(nx_graph)
+    reference = weakref.ref(nx_graph)
+
+    del nx_graph
+    gc.collect()
+    assert reference() is None
@@ -0,0 +1,118 @@
+"""
+This module contains unit tests for the RegenerationScheduler class.
+
+It tests lazy respawn accrual from elapsed time and firing scheduled respawn events.
+"""
+
+import pytest
+
+from regeneration import RegenerationScheduler
+
+
+@pytest.fixture
+def scheduler(clock):
+    """
+    Fixture to create a RegenerationScheduler for wood and stone.
+
+    Returns:
+        RegenerationScheduler: A scheduler driven by the fake clock.
+    """
+    return RegenerationScheduler({"wood": 10, "stone": 30}, clock)
+
+
+def test_collect_accrues_from_elapsed_time(scheduler, clock):
+    """
+    Test that respawns are worked out from elapsed time and carry partial progress.
+    """
+    assert scheduler.collect("wood") == 0
+    clock.advance(25)
+    assert scheduler.collect("wood") == 2
+    clock.advance(5)
+    assert scheduler.collect("wood") == 1
+    assert scheduler.collect("stone") == 1
+
+
+def test_collect_unknown_resource(scheduler, clock):
+    """
+    Test that resources without a regeneration interval never respawn.
+    """
+    clock.advance(1000)
+    assert scheduler.collect("iron") == 0
+
+
+def test_collect_respects_room(scheduler, clock):
+    """
+    Test that time spent without room in the pool does not build up respawns.
+    """
+    clock.advance(100)
+    assert scheduler.collect("wood", room=3) == 3
+    clock.advance(10)
+    assert scheduler.collect("wood") == 1
+    clock.advance(100)
+    assert scheduler.collect("wood", room=0) == 0
+    clock.advance(5)
+    assert scheduler.collect("wood") == 0
+
+
+def test_scheduled_events_fire_in_order(scheduler, clock):
+    """
+    Test that respawn callbacks fire once respawned and in due-time order.
+    """
+    fired = []
+    scheduler.schedule("stone", fired.append)
+    scheduler.schedule("wood", fired.append)
+
+    assert scheduler.next_respawn("wood") == 10
+    assert scheduler.run_due() == 0
+    clock.advance(30)
+    scheduler.collect("wood")
+    scheduler.collect("stone")
+    assert scheduler.run_due() == 2
+    assert fired == ["wood", "stone"]
+    assert scheduler.run_due() == 0
+
+
+def test_unsettled_events_wait_for_collect(scheduler, clock):
+    """
+    Test that a due respawn does not fire until collect has handed it out.
+    """
+    fired = []
+    scheduler.schedule("wood", fired.append)
+
+    clock.advance(10)
+    assert scheduler.run_due() == 0
+    assert fired == []
+
+    assert scheduler.collect("wood") == 1
+    assert scheduler.run_due() == 1
+    assert fired == ["wood"]
+
+
+def test_full_pool_reschedules_events(scheduler, clock):
+    """
+    Test that a respawn blocked by a full pool is rescheduled instead of fired.
+    """
+    fired = []
+    scheduler.schedule("wood", fired.append)
+
+    clock.advance(15)
+    assert scheduler.collect("wood", room=0) == 0
+    assert scheduler.run_due() == 0
+    assert scheduler.next_respawn("wood") == 25
+
+    clock.advance(5)
+    scheduler.collect("wood", room=1)
+    assert scheduler.run_due() == 0
+
+    clock.advance(5)
+    assert scheduler.collect("wood", room=1) == 1
+    assert scheduler.run_due() == 1
+    assert fired == ["wood"]
+
+
+def test_schedule_unknown_resource(scheduler):
+    """
+    Test that scheduling a resource that does not regenerate raises a KeyError.
+    """
+    with pytest.raises(KeyError):
+        scheduler.schedule("iron", print)
@@ -4,6 +4,9 @@ This module contains unit tests for the ResourceManager class.
 It tests the initialization, resource generation, gathering, and replenishment functionalities.
 """
 
+import json
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
 from resource_manager import ResourceManager
@@ -108,3 +111,181 @@ def test_get_available_resource_nodes(resource_manager):
     assert isinstance(available_nodes, list)
     assert len(available_nodes) == len(resource_manager.resource_nodes)
     assert available_nodes is not resource_manager.resource_nodes
+
+
+def test_resources_regenerate_lazily(tmp_path, clock):
+    """
+    Test that resources respawn from elapsed time when the pool is accessed.
+
+    Verifies that respawns follow the regen_interval attribute and stop at max_nodes.
+    """
+    tmp_graph = tmp_path / "regen_graph.json"
+    tmp_graph.write_text(
+        json.dumps(
+            {
+                "nodes": [
+                    {
+                        "id": "wood",
+                        "attributes": {
+                            "type": "resource",
+                            "regen_interval": 10,
+                            "max_nodes": 12,
+                        },
+                    },
+                    {"id": "stone", "attributes": {"type": "resource"}},
+                ]
+            }
+        )
+    )
+    manager = ResourceManager(str(tmp_graph), clock=clock)
+    initial_wood = manager.resource_nodes.count("wood")
+    initial_stone = manager.resource_nodes.count("stone")
+
+    clock.advance(19)
+    nodes = manager.get_available_resource_nodes()
+    assert nodes.count("wood") == initial_wood + 1
+    assert nodes.count("stone") == initial_stone
+
+    clock.advance(10000)
+    assert manager.get_available_resource_nodes().count("wood") == 12
+
+
+def test_respawn_events(clock):
+    """
+    Test that respawn callbacks fire once the respawn is due.
+    """
+    manager = ResourceManager("data/knowledge_graph.json", clock=clock)
+    manager.resource_nodes = []
+    fired = []
+
+    manager.on_respawn("wood", fired.append)
+    assert manager.process_respawn_events() == 0
+
+    clock.advance(30)
+    assert manager.process_respawn_events() == 1
+    assert fired == ["wood"]
+    assert manager.resource_nodes == ["wood"]
+
+
+def test_respawn_events_wait_for_room(clock):
+    """
+    Test that respawn callbacks do not fire while the pool is full.
+    """
+    manager = ResourceManager("data/knowledge_graph.json", clock=clock)
+    max_nodes = manager.graph.nodes["wood"]["attributes"]["max_nodes"]
+    manager.resource_nodes = ["wood"] * max_nodes
+    fired = []
+
+    manager.on_respawn("wood", fired.append)
+    clock.advance(30)
+    assert manager.process_respawn_events() == 0
+    assert fired == []
+
+    manager.resource_nodes.pop()
+    clock.advance(30)
+    assert manager.process_respawn_events() == 1
+    assert fired == ["wood"]
+    assert manager.resource_nodes.count("wood") == max_nodes
+
+
+def test_gather_nearest_resource(resource_manager):
+    """
+    Test gathering the nearest node of a resource from the 2D world.
+    """
+    resource_manager.resource_nodes = ["wood", "wood"]
+    gathered = resource_manager.gather_nearest_resource("wood", 0, 0)
+
+    assert gathered.resource_id == "wood"
+    assert gathered not in resource_manager.world.in_radius(0, 0, 50)
+    assert resource_manager.resource_nodes == ["wood"]
+    assert resource_manager.gather_nearest_resource("tree", 0, 0) is None
+
+
+def test_gather_nearest_resource_uses_pool(resource_manager):
+    """
+    Test that world gathers take from the pool and give it back when nothing is gathered.
+    """
+    resource_manager.resource_nodes = ["wood"]
+    assert resource_manager.gather_nearest_resource("wood", 0, 0, 0.0001) is None
+    with pytest.raises(ValueError):
+        resource_manager.gather_nearest_resource("wood", 0, 0, 100000)
+    assert resource_manager.resource_nodes == ["wood"]
+
+    assert resource_manager.gather_nearest_resource("wood", 0, 0) is not None
+    nearest = resource_manager.world.nearest("wood", 0, 0)
+    assert resource_manager.gather_nearest_resource("wood", 0, 0) is None
+    assert resource_manager.world.nearest("wood", 0, 0) == nearest
+
+
+def test_get_recipe(resource_manager):
+    """
+    Test looking up the ingredients of craftable and uncraftable items.
+    """
+    assert resource_manager.get_recipe("iron_axe") == {"wood": 1, "iron": 1}
+    assert resource_manager.get_recipe("wood") == {}
+    assert resource_manager.get_recipe("diamond") == {}
+
+
+def test_concurrent_gathering(clock):
+    """
+    Test that players gathering from a shared pool never double-count nodes.
+    """
+    manager = ResourceManager("data/knowledge_graph.json", clock=clock, concurrent=True)
+    manager.replenish_resources(300)
+    available = manager.get_available_resource_nodes()
+
+    def gather_all(resource_id):
+        return sum(
+            manager.gather_resource(resource_id) is not None
+            for _ in range(len(available))
+        )
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        gathered = list(executor.map(gather_all, manager.resources * 3))
+
+    assert manager.resource_nodes is None
+    assert sum(gathered) == len(available)
+    assert manager.get_available_resource_nodes() == []
+
+
+def test_concurrent_pool_regenerates(clock):
+    """
+    Test that the shared pool respawns resources up to their cap.
+    """
+    manager = ResourceManager("data/knowledge_graph.json", clock=clock, concurrent=True)
+    while manager.get_available_resource_nodes():
+        manager.gather_resource(manager.get_available_resource_nodes()[0])
+
+    clock.advance(60)
+    assert manager.gather_resource("wood") == "wood"
+    assert manager.get_available_resource_nodes().count("wood") == 1
+    clock.advance(10000)
+    assert manager.get_available_resource_nodes().count("wood") == 6
+
+
+def test_sharded_knowledge_graph(tmp_path):
+    """
+    Test that a tier-sharded graph only loads the shards the manager reaches into.
+    """
+    from knowledge_graph_shards import shard_knowledge_graph
+
+    manifest_path = shard_knowledge_graph("data/knowledge_graph.json", tmp_path)
+    flat = ResourceManager("data/knowledge_graph.json")
+    sharded = ResourceManager(manifest_path)
+
+    assert sharded.resources == flat.resources
+    assert sharded.regeneration.intervals == flat.regeneration.intervals
+    assert sharded.max_nodes == flat.max_nodes
+    sharded.get_available_resource_nodes()
+    assert sharded.graph.loaded_shards == []
+
+    assert sharded.get_recipe("stone_axe") == flat.get_recipe("stone_axe")
+    assert sharded.graph.loaded_shards == ["1"]
+
+    # Cross-shard edges come last, so only the order of a step's sources differs
+    sharded_plan = sharded.plan_crafting("iron_axe", {"wood": 1})
+    flat_plan = flat.plan_crafting("iron_axe", {"wood": 1})
+    assert sharded_plan.cost == flat_plan.cost
+    assert [
+        (step.action, step.item, set(step.sources)) for step in sharded_plan.steps
+    ] == [(step.action, step.item, set(step.sources)) for step in flat_plan.steps]
@@ -0,0 +1,96 @@
+"""
+This module contains unit tests for the StripedResourcePool class.
+
+It tests atomic gathering and replenishing, including from many threads at once.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from resource_pool import StripedResourcePool
+
+
+@pytest.fixture
+def pool():
+    """
+    Fixture to create a StripedResourcePool with a few nodes.
+
+    Returns:
+        StripedResourcePool: A pool holding two wood nodes and one stone node.
+    """
+    return StripedResourcePool(["wood", "stone", "iron"], ["wood", "stone", "wood"])
+
+
+def test_take(pool):
+    """
+    Test that taking removes one node at a time until none are left.
+    """
+    assert pool.take("wood")
+    assert pool.take("wood")
+    assert not pool.take("wood")
+    assert not pool.take("iron")
+    assert not pool.take("diamond")
+    assert pool.snapshot() == ["stone"]
+
+
+def test_add_and_count(pool):
+    """
+    Test adding nodes and reading counts.
+    """
+    pool.add("iron", 3)
+
+    assert pool.count("iron") == 3
+    assert pool.count("diamond") == 0
+    assert sorted(pool.snapshot()) == ["iron"] * 3 + ["stone"] + ["wood"] * 2
+    with pytest.raises(KeyError):
+        pool.add("diamond")
+
+
+def test_lock_for_is_stable(pool):
+    """
+    Test that a resource is always guarded by the same lock.
+    """
+    assert pool.lock_for("wood") is pool.lock_for("wood")
+
+
+def test_concurrent_takes_never_double_count():
+    """
+    Test that threads racing to gather never take more nodes than exist.
+    """
+    pool = StripedResourcePool(["wood", "stone"], ["wood"] * 500 + ["stone"] * 500)
+    start = threading.Barrier(8)
+
+    def gather(resource_id):
+        start.wait()
+        return sum(pool.take(resource_id) for _ in range(200))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        taken = list(executor.map(gather, ["wood", "stone"] * 4))
+
+    assert sum(taken) == 1000
+    assert pool.snapshot() == []
+
+
+def test_concurrent_adds_and_takes():
+    """
+    Test that interleaved replenishing and gathering keep the count exact.
+    """
+    pool = StripedResourcePool(["wood"])
+
+    def add():
+        for _ in range(1000):
+            pool.add("wood")
+
+    def take():
+        return sum(pool.take("wood") for _ in range(1000))
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        adders = [executor.submit(add) for _ in range(2)]
+        takers = [executor.submit(take) for _ in range(2)]
+        taken = sum(future.result() for future in takers)
+        for future in adders:
+            future.result()
+
+    assert pool.count("wood") == 2000 - taken
@@ -0,0 +1,177 @@
+"""
+This module contains unit tests for the ResourceWorld class.
+
+It tests deterministic chunk generation, spatial queries and chunk streaming.
+"""
+
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from resource_world import ResourceWorld
+
+
+def generate_nodes(count, rng):
+    """Pick resource IDs for a chunk the same way ResourceManager does."""
+    return [rng.choice(["wood", "stone", "iron"]) for _ in range(count)]
+
+
+@pytest.fixture
+def world():
+    """
+    Fixture to create a small-chunked ResourceWorld.
+
+    Returns:
+        ResourceWorld: A world with no chunks loaded.
+    """
+    return ResourceWorld(generate_nodes, seed=42, chunk_size=10, nodes_per_chunk=5)
+
+
+def brute_force_nodes(world, radius_chunks=6):
+    """List every live node within a square of chunks around the origin."""
+    return [
+        node
+        for cx in range(-radius_chunks, radius_chunks + 1)
+        for cy in range(-radius_chunks, radius_chunks + 1)
+        for node in world.load_chunk((cx, cy)).live_nodes()
+    ]
+
+
+def test_chunks_are_deterministic(world):
+    """
+    Test that the same seed and chunk always produce the same nodes.
+    """
+    other = ResourceWorld(generate_nodes, seed=42, chunk_size=10, nodes_per_chunk=5)
+    different = ResourceWorld(generate_nodes, seed=7, chunk_size=10, nodes_per_chunk=5)
+
+    assert (
+        world.load_chunk((3, -2)).live_nodes() == other.load_chunk((3, -2)).live_nodes()
+    )
+    assert (
+        world.load_chunk((0, 0)).live_nodes()
+        != different.load_chunk((0, 0)).live_nodes()
+    )
+    assert all(
+        world.chunk_of(node.x, node.y) == (3, -2)
+        for node in world.load_chunk((3, -2)).live_nodes()
+    )
+
+
+def test_nearest_matches_brute_force(world):
+    """
+    Test that the ring search finds the same node as checking every node.
+    """
+    for x, y in [(0, 0), (13.5, -7.2), (-25, 31), (4.9, 4.9)]:
+        expected = min(
+            (node for node in brute_force_nodes(world) if node.resource_id == "iron"),
+            key=lambda node: math.hypot(node.x - x, node.y - y),
+        )
+        assert world.nearest("iron", x, y) == expected
+
+
+def test_nearest_out_of_range(world):
+    """
+    Test that resources that do not exist or are out of reach are not found.
+    """
+    assert world.nearest("diamond", 0, 0) is None
+    assert world.nearest("iron", 0.5, 0.5, max_distance=0.0001) is None
+
+
+def test_in_radius(world):
+    """
+    Test that radius queries return every node in range, nearest first.
+    """
+    found = world.in_radius(5, 5, 12)
+    distances = [math.hypot(node.x - 5, node.y - 5) for node in found]
+    expected = {
+        node
+        for node in brute_force_nodes(world)
+        if math.hypot(node.x - 5, node.y - 5) <= 12
+    }
+
+    assert set(found) == expected
+    assert distances == sorted(distances)
+    assert all(node.resource_id == "wood" for node in world.in_radius(5, 5, 12, "wood"))
+
+
+def test_gather_nearest_removes_node(world):
+    """
+    Test that gathering removes the nearest node and the next gather finds another.
+    """
+    first = world.gather_nearest("wood", 0, 0)
+    second = world.gather_nearest("wood", 0, 0)
+
+    assert first is not None and second is not None
+    assert first != second
+    assert math.hypot(first.x, first.y) <= math.hypot(second.x, second.y)
+    assert first not in world.in_radius(0, 0, 50)
+    assert not world.remove(first)
+
+
+def test_chunks_stream_and_remember_gathers():
+    """
+    Test that old chunks unload and gathered nodes stay gone when a chunk reloads.
+    """
+    world = ResourceWorld(generate_nodes, chunk_size=10, max_loaded_chunks=4)
+    gathered = world.load_chunk((0, 0)).live_nodes()[0]
+    assert world.remove(gathered)
+
+    for cx in range(10, 20):
+        world.load_chunk((cx, 0))
+
+    assert len(world.loaded_chunks) == 4
+    assert gathered.chunk not in world.loaded_chunks
+    assert gathered not in world.load_chunk(gathered.chunk).live_nodes()
+
+
+def test_concurrent_gathers_never_share_a_node():
+    """
+    Test that threads gathering from one spot each get a different node.
+    """
+    world = ResourceWorld(generate_nodes, seed=3, chunk_size=10, nodes_per_chunk=5)
+    reachable = {
+        (node.chunk, node.index)
+        for node in world.in_radius(0, 0, 20, resource_id="wood")
+    }
+
+    def gather(_):
+        node = world.gather_nearest("wood", 0, 0, max_distance=20)
+        return None if node is None else (node.chunk, node.index)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        gathered = [node for node in executor.map(gather, range(60)) if node]
+
+    assert len(gathered) == len(set(gathered)) == len(reachable)
+    assert set(gathered) == reachable
+
+
+def test_search_fits_in_chunk_cache(mocker):
+    """
+    Test that repeated misses reuse cached chunks instead of regenerating them.
+    """
+    world = ResourceWorld(generate_nodes, chunk_size=10)
+    generate = mocker.spy(world, "_generate_chunk")
+
+    for _ in range(3):
+        assert world.nearest("gold", 0, 0) is None
+    assert generate.call_count == 81
+    assert world.max_loaded_chunks > 81
+
+    small = ResourceWorld(generate_nodes, chunk_size=10, max_loaded_chunks=9)
+    generate = mocker.spy(small, "_generate_chunk")
+    for _ in range(3):
+        assert small.nearest("gold", 0, 0) is None
+    assert small.max_reach == 1
+    assert generate.call_count == 9
+
+
+def test_search_wider_than_cache_is_refused(world):
+    """
+    Test that searches reaching more chunks than the cache holds raise instead of thrashing.
+    """
+    with pytest.raises(ValueError):
+        world.nearest("wood", 0, 0, max_distance=1000)
+    with pytest.raises(ValueError):
+        world.in_radius(0, 0, 1000)
+    assert world.loaded_chunks == []